@@ -0,0 +1,62 @@
+"""
+Where the pipeline scripts send their Overpass and Census API requests.
+
+Both default to the public services and can be pointed elsewhere (e.g. the
+local stand-ins in benchmarks/fake_apis.py) through environment variables:
+
+    OVERPASS_URL     Overpass interpreter URL
+    CENSUS_API_URL   base URL used instead of https://api.census.gov
+
+    OVERPASS_URL=http://localhost:8900/api/interpreter \
+    CENSUS_API_URL=http://localhost:8900 CENSUS_API_KEY=test \
+    python main.py
+
+get_census_client() creates the census.Census client on first use, so
+importing a script that fetches census data has no side effects and does not
+need CENSUS_API_KEY until a request is made.
+"""
+
+import functools
+import os
+
+import requests
+
+DEFAULT_OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+CENSUS_API_BASE = "https://api.census.gov"
+
+
+def overpass_url():
+    return os.getenv("OVERPASS_URL") or DEFAULT_OVERPASS_URL
+
+
+class _CensusSession(requests.Session):
+    """Session that sends requests for api.census.gov to another base URL.
+
+    The census library builds its URLs from hard-coded api.census.gov
+    templates, so the override has to happen at the session.
+    """
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, url, *args, **kwargs):
+        if isinstance(url, str) and url.startswith(CENSUS_API_BASE):
+            url = self.base_url + url[len(CENSUS_API_BASE):]
+        return super().request(method, url, *args, **kwargs)
+
+
+def census_session():
+    """A session for census.Census(key, session=...): redirected if CENSUS_API_URL is set, else None."""
+    base_url = os.getenv("CENSUS_API_URL")
+    return _CensusSession(base_url) if base_url else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_census_client():
+    """The Census API client, created on first use (needs CENSUS_API_KEY)."""
+    key = os.getenv("CENSUS_API_KEY")
+    if not key:
+        raise ValueError("Census API key is missing! Set it as an environment variable.")
+    from census import Census
+    return Census(key, session=census_session())
@@ -0,0 +1,258 @@
+"""
+Local stand-ins for the Overpass API and the Census ACS API.
+
+One HTTP server answers both, so the pipeline can run (and be timed) offline:
+
+    python benchmarks/fake_apis.py --cameras 100000 --latency 0.2
+    OVERPASS_URL=http://localhost:8900/api/interpreter CENSUS_API_URL=http://localhost:8900 \
+        CENSUS_API_KEY=test python data/census/alpr_demographics_by_tract.py
+
+Endpoints:
+- /api/interpreter                      Overpass: ALPR camera nodes, filtered by
+                                        the query's ["operator"="..."] if it has one
+- /data/<year>/acs/<dataset>?get=...    Census: one row per tract of the county in
+                                        `in=state:SS county:CCC`
+- /data/<year>/acs/<dataset>/variables/<field>.json
+                                        the field types the census library asks for
+- /_stats                               requests served per endpoint, as JSON
+
+Responses are synthetic unless --recorded points to a folder of saved ones:
+- overpass.json                         a raw Overpass response
+- acs5_<state>_<county>.json            a raw Census response (header row first)
+Synthetic census tracts reuse the real tract codes of the counties in
+data/shapefiles and data/census/*_race_income_by_tract5.csv, so they join;
+other counties get --tracts made-up tracts. All synthetic data is seeded.
+
+--latency (plus up to --jitter) seconds is added to every response. Requests
+are served on threads, so concurrent clients overlap their waits like they
+would against the real services.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+TRACT_CSVS = REPO_DIR / "data" / "census"
+SHAPEFILES = REPO_DIR / "data" / "shapefiles"
+
+# Bay Area (lon/lat), where the shapefiles in data/shapefiles are
+CAMERA_BOUNDS = (-122.6, 37.1, -121.5, 38.0)
+OPERATORS = [
+    "San Francisco Police Department",
+    "Oakland Police Department",
+    "San Jose Police Department",
+    "Flock Safety",
+]
+# Census "not available" sentinel, sent for a few median incomes like the real API does
+MISSING = -666666666
+
+
+# === RESPONSES ===
+
+def synthetic_overpass(n, seed=0):
+    rng = np.random.default_rng(seed)
+    west, south, east, north = CAMERA_BOUNDS
+    lats = rng.uniform(south, north, n).round(7)
+    lons = rng.uniform(west, east, n).round(7)
+    operators = rng.integers(0, len(OPERATORS), n)
+    return {
+        "version": 0.6,
+        "generator": "fake_apis",
+        "elements": [
+            {
+                "type": "node", "id": 10_000_000_000 + i, "lat": float(lat), "lon": float(lon),
+                "tags": {"man_made": "surveillance", "surveillance:type": "ALPR", "operator": OPERATORS[op]},
+            }
+            for i, (lat, lon, op) in enumerate(zip(lats, lons, operators))
+        ],
+    }
+
+
+def known_tracts():
+    """{(state, county): [tract codes]} from the tract shapefiles and saved tract CSVs."""
+    import geopandas as gpd
+
+    tracts = {}
+    for path in sorted(SHAPEFILES.glob("*.zip")):
+        df = gpd.read_file(path, ignore_geometry=True)
+        df.columns = df.columns.str.lower()
+        if not {"statefp", "countyfp", "tractce"} <= set(df.columns):
+            continue
+        for (state, county), group in df.groupby(["statefp", "countyfp"]):
+            tracts[(state.zfill(2), county.zfill(3))] = sorted(group["tractce"].str.zfill(6))
+    for path in sorted(TRACT_CSVS.glob("*_race_income_by_tract5.csv")):
+        df = pd.read_csv(path, dtype=str, usecols=["state", "county", "tract"])
+        for (state, county), group in df.groupby(["state", "county"]):
+            tracts[(state.zfill(2), county.zfill(3))] = sorted(group["tract"].str.zfill(6))
+    return tracts
+
+
+def synthetic_acs(fields, state, county, tract_codes, n_tracts):
+    """Rows of a Census response (header first) with plausible values per field."""
+    # Seeded by county, so the same county always gets the same numbers
+    rng = np.random.default_rng(zlib.crc32(f"{state}{county}".encode()))
+    tracts = tract_codes or [str(100 * (i + 1)).zfill(6) for i in range(n_tracts)]
+    n = len(tracts)
+    total = rng.integers(1500, 8000, n)
+    values = {}
+    for field in fields:
+        if field.startswith("B19013"):          # median household income
+            income = rng.lognormal(11.6, 0.4, n).round().astype(int)
+            income[rng.random(n) < 0.02] = MISSING
+            values[field] = income
+        elif field.endswith("_001E"):           # table totals
+            values[field] = total
+        elif re.fullmatch(r"B\d{5}_\d{3}E", field):
+            values[field] = (total * rng.uniform(0.0, 0.25, n)).astype(int)
+        else:
+            values[field] = [None] * n
+    rows = [list(fields) + ["state", "county", "tract"]]
+    for i in range(n):
+        row = [None if values[f][i] is None else str(values[f][i]) for f in fields]
+        rows.append(row + [state, county, tracts[i]])
+    return rows
+
+
+class FakeApis:
+    """Response source for the server: recorded files first, synthetic data otherwise."""
+
+    def __init__(self, cameras=1000, tracts=300, recorded=None):
+        self.n_cameras = cameras
+        self.n_tracts = tracts
+        self.recorded = Path(recorded) if recorded else None
+        self.tracts = known_tracts()
+        self._overpass = None
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def overpass(self, query):
+        with self._lock:
+            if self._overpass is None:
+                path = self.recorded / "overpass.json" if self.recorded else None
+                if path and path.exists():
+                    self._overpass = json.loads(path.read_text())
+                else:
+                    self._overpass = synthetic_overpass(self.n_cameras)
+        operator = re.search(r'\["operator"="([^"]*)"\]', query or "")
+        if not operator:
+            return self._overpass
+        elements = [e for e in self._overpass["elements"] if e.get("tags", {}).get("operator") == operator.group(1)]
+        return {**self._overpass, "elements": elements}
+
+    def acs(self, dataset, fields, geo_in):
+        match = re.search(r"state:(\d+)\s+county:(\d+)", geo_in or "")
+        if not match:
+            return None
+        state, county = match.group(1).zfill(2), match.group(2).zfill(3)
+        if self.recorded:
+            path = self.recorded / f"{dataset}_{state}_{county}.json"
+            if path.exists():
+                rows = json.loads(path.read_text())
+                header = rows[0]
+                keep = [header.index(f) for f in fields if f in header] + [
+                    header.index(g) for g in ["state", "county", "tract"] if g in header
+                ]
+                return [[row[i] for i in keep] for row in rows]
+        return synthetic_acs(fields, state, county, self.tracts.get((state, county)), self.n_tracts)
+
+
+# === SERVER ===
+
+def make_handler(apis, latency=0.0, jitter=0.0):
+    rng = np.random.default_rng()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            data = json.dumps(body, separators=(",", ":")).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/_stats":
+                return self._send(200, dict(apis.stats))
+
+            with lock:
+                delay = latency + (rng.uniform(0, jitter) if jitter else 0.0)
+            time.sleep(delay)
+
+            if url.path == "/api/interpreter":
+                apis.stats["overpass"] += 1
+                return self._send(200, apis.overpass(params.get("data")))
+
+            variable = re.fullmatch(r"/data/\d+/acs/(\w+)/variables/(\w+)\.json", url.path)
+            if variable:
+                apis.stats["census_variables"] += 1
+                field = variable.group(2)
+                if re.fullmatch(r"B\d{5}_\d{3}E", field):
+                    return self._send(200, {"name": field, "predicateType": "int"})
+                return self._send(404, {"error": f"unknown variable {field}"})
+
+            data = re.fullmatch(r"/data/\d+/acs/(\w+)", url.path)
+            if data:
+                apis.stats["census"] += 1
+                if not params.get("key"):
+                    return self._send(400, {"error": "missing key"})
+                rows = apis.acs(data.group(1), params.get("get", "").split(","), params.get("in"))
+                if rows is None:
+                    return self._send(400, {"error": "only tract queries within a state and county are supported"})
+                return self._send(200, rows)
+
+            self._send(404, {"error": f"unknown path {url.path}"})
+
+    return Handler
+
+
+def serve(port=8900, cameras=1000, tracts=300, latency=0.0, jitter=0.0, recorded=None, host="127.0.0.1"):
+    """Start the server on a background thread; returns it (call .shutdown() to stop)."""
+    apis = FakeApis(cameras=cameras, tracts=tracts, recorded=recorded)
+    server = ThreadingHTTPServer((host, port), make_handler(apis, latency, jitter))
+    server.daemon_threads = True
+    server.apis = apis
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fake Overpass and Census ACS APIs locally.")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--cameras", type=int, default=1000, help="synthetic ALPR cameras in the Overpass response")
+    parser.add_argument("--tracts", type=int, default=300, help="synthetic tracts for counties without saved tract codes")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra random seconds")
+    parser.add_argument("--recorded", help="folder of recorded responses (overpass.json, acs5_<state>_<county>.json)")
+    args = parser.parse_args(argv)
+
+    server = serve(args.port, args.cameras, args.tracts, args.latency, args.jitter, args.recorded, args.host)
+    base = f"http://{args.host}:{args.port}"
+    print(f"Serving fake APIs on {base}")
+    print(f"  OVERPASS_URL={base}/api/interpreter CENSUS_API_URL={base}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Benchmarks for the census/camera pipeline and the survey analyses, on synthetic
+data (see synthetic.py).
+
+Stages measured:
+- process_alpr_data        main.process_alpr_data (spatial join + counts + merge),
+                           per number of cameras x number of tracts
+- likert_*                 Likert recoding of the awareness/support answers:
+                           row by row (map), per distinct answer (recode_column)
+                           and through a CrosstabCube
+- dashboard_load           CSV -> Arrow file, ColumnStore, RowIndex, CountStore
+- dashboard_filter_count   filter + count for every city preset and question, as
+                           the dashboard does on a rerun, plus one grouped
+                           comparison of all cities; _cold counts every question
+                           on first use, the plain one is a warm session
+- survey_analysis          the per-city summaries of survey_analysis.py, run as is
+
+Every stage is run --repeat times for the timings (min and median seconds) and
+once more under tracemalloc for its peak allocated memory. max_rss_mb is the
+high-water mark of the whole process after the stage.
+
+    python benchmarks/run_benchmarks.py                 # default sizes
+    python benchmarks/run_benchmarks.py --full          # up to 10^7 cameras and 10^6 survey rows
+    python benchmarks/run_benchmarks.py --only likert --rows 1e3 1e6
+    python benchmarks/run_benchmarks.py --out results.json
+
+Results are written as JSON to benchmarks/results/ unless --out is given.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import resource
+import runpy
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import synthetic
+
+REPO_DIR = synthetic.REPO_DIR
+RESULTS_DIR = Path(__file__).parent / "results"
+sys.path[:0] = [str(REPO_DIR), str(REPO_DIR / "survey")]
+
+DEFAULT_SIZES = {
+    "cameras": [1e3, 1e4, 1e5, 1e6],
+    "tracts": [200, 2000, 9000],
+    "rows": [1e3, 1e4, 1e5],
+}
+FULL_SIZES = {
+    "cameras": [1e3, 1e4, 1e5, 1e6, 1e7],
+    "tracts": [200, 2000, 9000],
+    "rows": [1e3, 1e4, 1e5, 1e6],
+}
+BENCHMARKS = ["process_alpr_data", "likert", "dashboard", "survey_analysis"]
+
+LIKERT_IDS = ["6s6r3ex", "zke2ete", "skzr4a8", "y7ka0mc", "uktyzgu"]
+SURVEY_CSV_NAME = "ALPR General Survey Results v2.csv"
+
+
+# === MEASURING ===
+
+def _max_rss_mb():
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def measure(fn, repeat, setup=None):
+    """Time fn() repeat times, then run it once more under tracemalloc; setup() runs untimed before each call."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds_min": round(min(times), 6),
+        "seconds_median": round(statistics.median(times), 6),
+        "repeat": repeat,
+        "peak_traced_mb": round(peak / 1e6, 3),
+        "max_rss_mb": round(_max_rss_mb(), 1),
+    }
+
+
+def _report(results, name, params, stats):
+    results.append({"benchmark": name, "params": params, **stats})
+    sizes = ", ".join(f"{k}={v:,}" for k, v in params.items())
+    print(f"{name:28s} {sizes:30s} {stats['seconds_min']:9.4f}s  {stats['peak_traced_mb']:9.1f} MB")
+
+
+# === BENCHMARKS ===
+
+def bench_process_alpr_data(sizes, repeat, results):
+    from main import process_alpr_data
+
+    for n_tracts in sizes["tracts"]:
+        census_gdf, census_income_df = synthetic.tracts(int(n_tracts))
+        for n_cameras in sizes["cameras"]:
+            alpr_df = synthetic.cameras(int(n_cameras))
+            stats = measure(lambda: process_alpr_data(alpr_df, census_gdf, census_income_df), repeat)
+            _report(results, "process_alpr_data", {"cameras": int(n_cameras), "tracts": len(census_gdf)}, stats)
+            del alpr_df
+
+
+def bench_likert(sizes, repeat, results):
+    from bootstrap import recode_column
+    from crosstab_cube import CrosstabCube, likert_score
+
+    for n_rows in sizes["rows"]:
+        df = synthetic.survey(int(n_rows))
+        cols = [c for c in df.columns if any(i in c for i in LIKERT_IDS)]
+        approaches = {
+            "likert_rowwise": lambda: [df[c].map(likert_score) for c in cols],
+            "likert_recode_column": lambda: [recode_column(df[c], likert_score) for c in cols],
+            "likert_cube": lambda: CrosstabCube.from_frame(df, cols).grouped_means(cols[3:], by=cols[0]),
+        }
+        for name, fn in approaches.items():
+            _report(results, name, {"rows": len(df)}, measure(fn, repeat))
+
+
+def bench_dashboard(sizes, repeat, results):
+    from city_presets import load_city_zip_map
+    from dashboard_columns import ColumnStore, prepare_columnar
+    from dashboard_counts import CountStore
+    from dashboard_index import RowIndex
+
+    city_zip_map = {city: set(zips) for city, zips in load_city_zip_map().items()}
+    for n_rows in sizes["rows"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / SURVEY_CSV_NAME
+            synthetic.survey(int(n_rows)).to_csv(csv_path, index=False)
+            cache_dir = Path(tmp) / "cache"
+
+            def clear_cache():
+                for old in cache_dir.glob("*"):
+                    old.unlink()
+
+            def load():
+                store = ColumnStore(prepare_columnar(csv_path, cache_dir))
+                row_index = RowIndex(store.zip_values, city_zip_map)
+                count_store = CountStore(store.zip_values, column_loader=store.column)
+                return store, row_index, count_store
+
+            _report(results, "dashboard_load", {"rows": int(n_rows)}, measure(load, repeat, setup=clear_cache))
+
+            store, row_index, count_store = load()
+            questions = [c for c in store.columns if "?" in c and c != store.zip_col]
+
+            def filter_count():
+                for city in [None] + sorted(city_zip_map):
+                    row_index.rows(city)
+                    zips = None if city is None else city_zip_map[city]
+                    for question in questions:
+                        count_store.counts(question, zips)
+                count_store.group_counts(questions[0], city_zip_map)
+
+            # Cold: every question is counted on first use; warm: a session after that
+            _report(results, "dashboard_filter_count_cold", {"rows": int(n_rows)},
+                    measure(filter_count, repeat, setup=count_store.questions.clear))
+            filter_count()
+            _report(results, "dashboard_filter_count", {"rows": int(n_rows)}, measure(filter_count, repeat))
+            del store, row_index, count_store
+
+
+def bench_survey_analysis(sizes, repeat, results):
+    script = REPO_DIR / "survey_analysis.py"
+    cwd = os.getcwd()
+    for n_rows in sizes["rows"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            synthetic.survey(int(n_rows)).to_csv(Path(tmp) / SURVEY_CSV_NAME, index=False)
+
+            def run():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    runpy.run_path(str(script), run_name="__main__")
+
+            os.chdir(tmp)
+            try:
+                _report(results, "survey_analysis", {"rows": int(n_rows)}, measure(run, repeat))
+            finally:
+                os.chdir(cwd)
+
+
+RUNNERS = {
+    "process_alpr_data": bench_process_alpr_data,
+    "likert": bench_likert,
+    "dashboard": bench_dashboard,
+    "survey_analysis": bench_survey_analysis,
+}
+
+
+# === MAIN ===
+
+def environment():
+    import geopandas
+    import pyarrow
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "geopandas": geopandas.__version__,
+            "pyarrow": pyarrow.__version__,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipelines on synthetic data.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="benchmarks to run (default: all)")
+    parser.add_argument("--full", action="store_true", help="run the largest sizes too")
+    parser.add_argument("--cameras", type=float, nargs="+", help="camera counts")
+    parser.add_argument("--tracts", type=float, nargs="+", help="tract counts")
+    parser.add_argument("--rows", type=float, nargs="+", help="survey row counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    sizes = dict(FULL_SIZES if args.full else DEFAULT_SIZES)
+    for key in sizes:
+        if getattr(args, key):
+            sizes[key] = getattr(args, key)
+
+    results = []
+    started = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for name in args.only or BENCHMARKS:
+        RUNNERS[name](sizes, args.repeat, results)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"benchmark_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({
+        "started": started,
+        "sizes": {k: [int(v) for v in vs] for k, vs in sizes.items()},
+        "environment": environment(),
+        "results": results,
+    }, indent=2))
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Synthetic inputs for the benchmarks, at any size.
+
+- cameras(n): ALPR camera points (id, latitude, longitude), as returned by
+  fetch_alpr_locations.
+- tracts(n): a grid of square tract polygons with the shapefile columns
+  process_alpr_data reads (tractce, geoid, ...), plus a matching census
+  income table in the tract schema (tract_schema.py). ~9,000 tracts is the
+  size of the whole state.
+- survey(n): a survey export with the real column schema. Every column is
+  resampled from the answers in the real export, so answer formats, missing
+  values and the ZIP mix look like the real thing.
+
+All generators are seeded, so the same size always gives the same data.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+SURVEY_TEMPLATE = REPO_DIR / "ALPR General Survey Results v2.csv"
+
+# Roughly the extent of California (lon/lat)
+CA_BOUNDS = (-124.4, 32.5, -114.1, 42.0)
+
+
+def cameras(n, bounds=CA_BOUNDS, seed=0):
+    rng = np.random.default_rng(seed)
+    west, south, east, north = bounds
+    return pd.DataFrame({
+        "id": np.arange(n, dtype=np.int64),
+        "latitude": rng.uniform(south, north, n),
+        "longitude": rng.uniform(west, east, n),
+    })
+
+
+def tracts(n, bounds=CA_BOUNDS, seed=0):
+    """(tract GeoDataFrame, census income DataFrame) for about n tracts."""
+    import geopandas as gpd
+    import shapely
+    from tract_schema import census_frame
+
+    rng = np.random.default_rng(seed)
+    west, south, east, north = bounds
+    cols = int(np.ceil(np.sqrt(n * (east - west) / (north - south))))
+    rows = int(np.ceil(n / cols))
+    dx, dy = (east - west) / cols, (north - south) / rows
+    i = np.arange(n)
+    x0 = west + (i % cols) * dx
+    y0 = south + (i // cols) * dy
+
+    tractce = pd.Series(i * 100 + 100).astype(str).str.zfill(6)
+    geoid = "06001" + tractce
+    gdf = gpd.GeoDataFrame({
+        "statefp": "06",
+        "countyfp": "001",
+        "tractce": tractce,
+        "geoid": geoid,
+        "name": (i + 1).astype(str),
+    }, geometry=shapely.box(x0, y0, x0 + dx, y0 + dy), crs="EPSG:4326")
+
+    income = pd.DataFrame({
+        "median_income": rng.lognormal(11.3, 0.45, n).round(),
+        "state": "06",
+        "county": "001",
+        "tract": tractce,
+    })
+    # A few tracts without an estimate, as the census reports them
+    income.loc[rng.random(n) < 0.02, "median_income"] = -666666666
+    return gdf, census_frame(income)
+
+
+def survey(n, template=SURVEY_TEMPLATE, seed=0):
+    """n survey rows with the template's columns, each resampled from its real answers."""
+    rng = np.random.default_rng(seed)
+    real = pd.read_csv(template)
+    return pd.DataFrame({
+        col: real[col].to_numpy()[rng.integers(0, len(real), n)]
+        for col in real.columns
+    })
@@ -0,0 +1,180 @@
+"""
+City presets: which ZIP codes belong to which Bay Area city.
+
+The ZIP -> city table is derived offline from polygons instead of typed by
+hand: Census ZIP Code Tabulation Areas (ZCTAs) are intersected with the
+incorporated places (cities and towns) of the nine Bay Area counties, and the
+overlap of every ZIP/city pair is written to data/census/bay_area_zip_city.csv.
+The dashboard and survey_analysis.py only read that small table.
+
+Build (or rebuild) the table, needs geopandas and the Census cartographic
+boundary files (downloaded unless local copies are given):
+    python city_presets.py
+    python city_presets.py --zcta cb_2020_us_zcta520_500k.zip --places cb_2020_06_place_500k.zip
+
+Without the boundary files, the table can be built from the ZIP -> primary
+city crosswalk in the Bay Area survey export instead (one city per ZIP, no
+overlap shares). The checked-in table is this version, because the boundary
+files could not be downloaded when it was built. The crosswalk only lists ZIPs
+some respondent gave, so San Francisco is completed from the city's own ZIP
+polygons (SF_ZIP_SHAPES_CSV):
+    python city_presets.py --crosswalk
+
+Compared with the old hand-typed lists, the San Francisco preset gains 94128
+(SFO) and 94144 (PO boxes). "Oakland" is now the city only (94601-94603,
+94605-94607, 94609-94611, 94618, 94619, 94621), gaining 94606, 94609 and 94610.
+The old list was the Oakland area: its ZIPs in Alameda, Berkeley, Castro
+Valley, Emeryville, San Leandro and San Lorenzo moved to those cities' presets,
+and 94516 (Canyon) and 94705 have no respondents. Oakland ZIPs no respondent
+gave (e.g. 94612) are missing until the polygon table is built.
+"""
+
+import argparse
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+ZIP_CITY_CSV = Path(__file__).parent / "data" / "census" / "bay_area_zip_city.csv"
+SF_ZIP_SHAPES_CSV = Path(__file__).parent / "San_Francisco_ZIP_Codes_20250901.csv"
+# Survey export with a zip -> primary_city column pair
+CROSSWALK_CSV = Path(__file__).parent / "data" / "survey_responses" / "ALPR General Survey Results Bay Area.csv"
+
+GENZ_URL = "https://www2.census.gov/geo/tiger/GENZ2020/shp"
+ZCTA_URL = f"{GENZ_URL}/cb_2020_us_zcta520_500k.zip"
+PLACE_URL = f"{GENZ_URL}/cb_2020_06_place_500k.zip"
+COUNTY_URL = f"{GENZ_URL}/cb_2020_us_county_500k.zip"
+
+BAY_AREA_COUNTIES = {
+    "001": "Alameda",
+    "013": "Contra Costa",
+    "041": "Marin",
+    "055": "Napa",
+    "075": "San Francisco",
+    "081": "San Mateo",
+    "085": "Santa Clara",
+    "095": "Solano",
+    "097": "Sonoma",
+}
+# Place LSAD codes for incorporated cities and towns (CDPs are left out)
+CITY_LSAD = {"25", "43"}
+# California Albers, for areas in square meters
+AREA_CRS = "EPSG:3310"
+
+# A ZIP is part of a city's preset if this share of the ZIP lies in the city,
+# or if this share of the city lies in the ZIP (small cities inside a big ZIP)
+MIN_SHARE = 0.25
+
+# Used until the table is built: the old hand-typed Oakland-area list
+FALLBACK_OAKLAND_ZIPS = [
+    "94552", "94546", "94605", "94621", "94619", "94577", "94501",
+    "94607", "94578", "94602", "94516", "94705", "94708", "94611",
+    "94580", "94601", "94579", "94608", "94603", "94502", "94618"
+]
+
+
+def build_zip_city_table(zcta_path=ZCTA_URL, place_path=PLACE_URL, county_path=COUNTY_URL,
+                         counties=BAY_AREA_COUNTIES):
+    """Overlap of every Bay Area ZIP (ZCTA) with every incorporated city.
+
+    Returns one row per ZIP/city pair with the share of the ZIP's area inside
+    the city (zip_share) and the share of the city's area inside the ZIP
+    (city_share).
+    """
+    import geopandas as gpd
+
+    county_shapes = gpd.read_file(county_path)
+    county_shapes = county_shapes[
+        (county_shapes["STATEFP"] == "06") & county_shapes["COUNTYFP"].isin(list(counties))
+    ].to_crs(AREA_CRS)
+    county_shapes["county"] = county_shapes["COUNTYFP"].map(counties)
+    region = county_shapes.union_all()
+
+    places = gpd.read_file(place_path).to_crs(AREA_CRS)
+    places = places[places["LSAD"].isin(CITY_LSAD)]
+    # A city's county is the one holding its representative point
+    points = places.set_geometry(places.representative_point())
+    points = gpd.sjoin(points, county_shapes[["county", "geometry"]], predicate="within")
+    places = places.loc[points.index].assign(county=points["county"])
+    places = places[["NAME", "county", "geometry"]].rename(columns={"NAME": "city"})
+    places["city_area"] = places.area
+
+    zctas = gpd.read_file(zcta_path, bbox=tuple(county_shapes.to_crs(4269).total_bounds))
+    zctas = zctas.to_crs(AREA_CRS)
+    zctas = zctas[zctas.intersects(region)]
+    zctas = zctas[["ZCTA5CE20", "geometry"]].rename(columns={"ZCTA5CE20": "zip"})
+    zctas["zip_area"] = zctas.area
+
+    pieces = gpd.overlay(zctas, places, how="intersection", keep_geom_type=True)
+    pieces["area"] = pieces.area
+    table = (
+        pieces.groupby(["zip", "city", "county"], as_index=False)
+        .agg(area=("area", "sum"), zip_area=("zip_area", "first"), city_area=("city_area", "first"))
+    )
+    table["zip_share"] = (table["area"] / table["zip_area"]).round(4)
+    table["city_share"] = (table["area"] / table["city_area"]).round(4)
+    table = table[(table["zip_share"] > 0.001) | (table["city_share"] > 0.001)]
+    return table[["zip", "city", "county", "zip_share", "city_share"]].sort_values(["city", "zip"])
+
+
+def _sf_polygon_zips(path=SF_ZIP_SHAPES_CSV):
+    sf_zips = pd.read_csv(path, usecols=["zip_code"])["zip_code"].dropna()
+    return sorted(set(sf_zips.astype(int).astype(str)))
+
+
+def zip_city_table_from_crosswalk(path=CROSSWALK_CSV, sf_zip_shapes=SF_ZIP_SHAPES_CSV):
+    """ZIP -> city table (same columns) from a zip/primary_city crosswalk.
+
+    Every ZIP belongs wholly to its primary city (zip_share 1.0); the city's
+    share and the county are not known. San Francisco ZIPs missing from the
+    crosswalk are added from the city's ZIP polygons.
+    """
+    crosswalk = pd.read_csv(path, dtype=str, usecols=["zip", "primary_city"]).dropna().drop_duplicates()
+    table = crosswalk.rename(columns={"primary_city": "city"})
+    table = table[table["zip"].str.fullmatch(r"\d{5}")]
+    if sf_zip_shapes is not None:
+        sf_zips = [z for z in _sf_polygon_zips(sf_zip_shapes) if z not in set(table["zip"])]
+        table = pd.concat([table, pd.DataFrame({"zip": sf_zips, "city": "San Francisco"})], ignore_index=True)
+    table = table.assign(county=None, zip_share=1.0, city_share=float("nan"))
+    return table[["zip", "city", "county", "zip_share", "city_share"]].sort_values(["city", "zip"])
+
+
+def _fallback_city_zip_map():
+    return {
+        "Oakland": sorted(FALLBACK_OAKLAND_ZIPS),
+        "San Francisco": _sf_polygon_zips(),
+    }
+
+
+def load_city_zip_map(path=ZIP_CITY_CSV, min_share=MIN_SHARE):
+    """{city: sorted list of ZIP strings} for every city in the ZIP -> city table."""
+    path = Path(path)
+    if not path.exists():
+        warnings.warn(f"{path} not found, using fallback presets (run `python city_presets.py` to build it)")
+        return _fallback_city_zip_map()
+    table = pd.read_csv(path, dtype={"zip": str})
+    member = (table["zip_share"] >= min_share) | (table["city_share"] >= min_share)
+    return {
+        city: sorted(zips)
+        for city, zips in table[member].groupby("city")["zip"]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Bay Area ZIP -> city table from Census polygons.")
+    parser.add_argument("--zcta", default=ZCTA_URL, help="ZCTA shapes (path or URL)")
+    parser.add_argument("--places", default=PLACE_URL, help="California place shapes (path or URL)")
+    parser.add_argument("--counties", default=COUNTY_URL, help="County shapes (path or URL)")
+    parser.add_argument("--crosswalk", nargs="?", const=str(CROSSWALK_CSV),
+                        help="build from a zip/primary_city crosswalk CSV instead of polygons")
+    parser.add_argument("--out", default=str(ZIP_CITY_CSV))
+    args = parser.parse_args()
+
+    if args.crosswalk:
+        table = zip_city_table_from_crosswalk(args.crosswalk)
+    else:
+        table = build_zip_city_table(args.zcta, args.places, args.counties)
+    table.to_csv(args.out, index=False)
+    presets = load_city_zip_map(args.out)
+    print(f"Wrote {len(table):,} ZIP/city pairs for {table['city'].nunique()} cities to {args.out}")
+    print(f"{len(presets)} city presets at MIN_SHARE={MIN_SHARE}")
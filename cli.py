@@ -0,0 +1,108 @@
+"""
+Single entry point for the project's scripts.
+
+    python cli.py --help
+    python cli.py tracts                     # ALPR cameras + census demographics per tract
+    python cli.py survey-report Oakland      # arguments after the command go to the script
+    python cli.py results                    # saved result tables
+    python cli.py results alpr_by_income --rows 5
+
+Each command runs its script as if it was started directly (same arguments,
+same working directory), and only that script's imports are loaded, so --help
+and the result lookups start without importing pandas, geopandas or census.
+"""
+
+import argparse
+import csv
+import runpy
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# command: (script, description)
+COMMANDS = {
+    "tracts": ("data/census/alpr_demographics_by_tract.py", "ALPR cameras and census demographics per tract, per county"),
+    "sf-income": ("main.py", "ALPR cameras by tract income in San Francisco"),
+    "san-jose": ("san_jose_race.py", "ALPR cameras by tract race in Santa Clara County"),
+    "race-income": ("race_and_income_by_tract.py", "census race and income tables per county"),
+    "map": ("data/census/alpr_map.py", "tiled camera and tract choropleth map"),
+    "basemap": ("data/census/basemap_cache.py", "local basemap tile store (preload, seed, info)"),
+    "city-presets": ("city_presets.py", "build the ZIP -> city table"),
+    "survey-summary": ("survey_analysis.py", "per-city survey summaries"),
+    "survey-report": ("survey/report.py", "HTML survey reports"),
+    "survey-charts": ("survey/render_charts.py", "render the survey charts that changed"),
+    "survey-store": ("survey/survey_store.py", "ingest survey exports"),
+    "bench": ("benchmarks/run_benchmarks.py", "benchmarks on synthetic data"),
+    "fake-apis": ("benchmarks/fake_apis.py", "local fake Overpass and Census APIs"),
+}
+
+# Where scripts save their result tables (relative to the working directory and the repository)
+RESULT_PATTERNS = ["*_alpr_race_income.csv", "alpr_by_income.csv", "*_race_income_by_tract.csv", "data/census/*.csv",
+                   "alpr_statewide/*.csv"]
+
+
+def run_script(script, argv):
+    """Run a script as __main__ with its own folder importable, as `python script ...` would."""
+    path = REPO_DIR / script
+    sys.argv = [str(path)] + list(argv)
+    sys.path[:0] = [str(path.parent), str(REPO_DIR)]
+    runpy.run_path(str(path), run_name="__main__")
+
+
+def find_results():
+    """{name: path} of saved result tables, the working directory first."""
+    found = {}
+    for root in [Path.cwd(), REPO_DIR]:
+        for pattern in RESULT_PATTERNS:
+            for path in sorted(root.glob(pattern)):
+                found.setdefault(path.stem, path)
+    return found
+
+
+def show_results(name=None, rows=10):
+    results = find_results()
+    if name is None:
+        for stem, path in results.items():
+            modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(path.stat().st_mtime))
+            print(f"{stem:45s} {path.stat().st_size / 1e3:9.1f} KB  {modified}  {path}")
+        return
+    if name not in results:
+        sys.exit(f"No saved result named {name!r}; run `python cli.py results` to list them")
+    with open(results[name], newline="") as f:
+        reader = csv.reader(f)
+        table = [row for _, row in zip(range(rows + 1), reader)]
+    widths = [max(len(row[i]) for row in table if i < len(row)) for i in range(len(table[0]))]
+    for row in table:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Script commands take everything after them, --help included
+    if argv and (argv[0] in COMMANDS or argv[0] == "dashboard"):
+        command, rest = argv[0], argv[1:]
+        if command == "dashboard":
+            app = REPO_DIR / "streamlit_survey_dashboard.py"
+            sys.exit(subprocess.call([sys.executable, "-m", "streamlit", "run", str(app)] + rest))
+        return run_script(COMMANDS[command][0], rest)
+
+    parser = argparse.ArgumentParser(
+        description="ALPR data analysis: run any of the project's scripts.",
+        epilog="Arguments after a command are passed to its script (e.g. `cli.py map --help`).",
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (script, description) in COMMANDS.items():
+        commands.add_parser(name, help=description)
+    commands.add_parser("dashboard", help="start the survey dashboard (streamlit)")
+    results = commands.add_parser("results", help="list saved result tables, or show one")
+    results.add_argument("name", nargs="?", help="result to show (file name without .csv)")
+    results.add_argument("--rows", type=int, default=10)
+    args = parser.parse_args(argv)
+    show_results(args.name, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Column-on-demand data loading for the ALPR Survey Explorer.
+
+The survey CSV is converted once into an uncompressed Arrow IPC file holding the
+cleaned column names and the normalized ZIP column. The file is memory-mapped
+into an immutable Arrow table, and one ColumnStore per process is shared by all
+sessions (st.cache_resource), so the data lives once in the OS page cache
+instead of once per session.
+
+Columns are only paged in when touched. Sessions get read-only pandas views of
+a column (memoized in a small LRU); numeric columns without missing values
+point straight into the mapped file. Row subsets are taken on the Arrow table,
+so only the selected rows are ever decoded.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+CACHE_DIR = Path(".dashboard_cache")
+
+ZIP_NORM_COL = "_ZIP_NORM_"
+ZIP_FALLBACK_COL = "_ZIP_FALLBACK_"
+ZIP_COL_CANDIDATES = [
+    "What is your ZIP code? (7bepp7b)",
+    "ZIP",
+    "Zip",
+    "Zip Code",
+    "ZIP Code",
+]
+
+# Metadata key for the name of the original ZIP column
+META_KEY = b"alpr_dashboard"
+
+
+def normalize_zip(values):
+    """Normalize ZIP values as strings (same rules the dashboard always used)."""
+    return (
+        values
+        .astype(str)
+        .str.strip()
+        .str.replace(r"[^0-9A-Za-z\- ]", "", regex=True)
+        .replace({"nan": np.nan})
+    )
+
+
+def prepare_columnar(csv_path, cache_dir=CACHE_DIR):
+    """Convert the survey CSV to an Arrow IPC file if it is missing or older than the CSV."""
+    csv_path = Path(csv_path)
+    out_path = Path(cache_dir) / f"{csv_path.stem}.arrow"
+    if out_path.exists() and out_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        return out_path
+
+    df = pd.read_csv(csv_path)
+    # Standardize column names (strip whitespace)
+    df.columns = [c.strip() for c in df.columns]
+    zip_col = next((c for c in ZIP_COL_CANDIDATES if c in df.columns), None)
+    if zip_col is None:
+        # Create an empty placeholder to avoid downstream errors
+        df[ZIP_FALLBACK_COL] = np.nan
+        zip_col = ZIP_FALLBACK_COL
+    df[ZIP_NORM_COL] = normalize_zip(df[zip_col])
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[META_KEY] = json.dumps({"zip_col": zip_col}).encode()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    table = table.replace_schema_metadata(meta)
+    tmp_path = out_path.with_suffix(".tmp")
+    # Uncompressed, single record batch: columns can be mapped without decoding
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max(len(table), 1))
+    tmp_path.replace(out_path)
+    return out_path
+
+
+def read_only_series(chunked, name):
+    """A pandas Series over an Arrow column that cannot be modified in place.
+
+    Primitive columns without nulls are zero-copy views of the mapped file;
+    other columns are converted once and the copy is frozen.
+    """
+    array = chunked.combine_chunks() if chunked.num_chunks != 1 else chunked.chunk(0)
+    values = array.to_numpy(zero_copy_only=False)
+    if values.flags.writeable:
+        values.flags.writeable = False
+    return pd.Series(values, name=name, copy=False)
+
+
+class ColumnStore:
+    """Memory-mapped survey table with lazily converted, read-only columns."""
+
+    def __init__(self, path, max_columns=16):
+        self.path = Path(path)
+        self.max_columns = max_columns
+        self.table = pa.ipc.open_file(pa.memory_map(str(self.path), "r")).read_all()
+        self.columns = list(self.table.column_names)
+        self.types = {field.name: field.type for field in self.table.schema}
+        self.zip_col = json.loads(self.table.schema.metadata[META_KEY])["zip_col"]
+        self.n_rows = self.table.num_rows
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # The ZIP column drives every filter, so it is converted up front and never evicted
+        self.zip_values = read_only_series(self.table.column(ZIP_NORM_COL), ZIP_NORM_COL)
+
+    def is_text(self, name):
+        return pa.types.is_string(self.types[name]) or pa.types.is_large_string(self.types[name])
+
+    def column(self, name):
+        """One column as a read-only Series, converted on first use and memoized (LRU)."""
+        if name == ZIP_NORM_COL:
+            return self.zip_values
+        with self._lock:
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                return self._cache[name]
+        series = read_only_series(self.table.column(name), name)
+        with self._lock:
+            self._cache[name] = series
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.max_columns:
+                self._cache.popitem(last=False)
+        return series
+
+    def select(self, columns=None, rows=None):
+        """Arrow table of some (default: all) columns for some (default: all) row positions."""
+        table = self.table if columns is None else self.table.select(columns)
+        if rows is not None:
+            table = table.take(pa.array(rows, type=pa.int32()))
+        return table
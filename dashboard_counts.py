@@ -0,0 +1,148 @@
+"""
+Pre-aggregated answer counts for the ALPR Survey Explorer.
+
+The dashboard used to copy and refilter the whole survey on every widget change
+and then re-split and count the selected question. Here every question is
+counted once at load time into a (ZIP x answer) count matrix, both as-is and
+with multi-select answers split into their options. A City/ZIP/question
+selection is then answered by summing the rows of the selected ZIPs, so the
+cost of an interaction depends on the number of ZIPs and answers, not on the
+number of responses.
+
+With a `column_loader`, a question is counted the first time it is asked for
+instead of up front, so only the questions people look at are ever loaded.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Delimiters used by multi-select answers (same as the dashboard checkbox)
+SPLIT_SEPS = r";|\||,"
+
+
+def clean_answers(series):
+    """Answers as the dashboard shows them: stripped strings, missing dropped."""
+    return series.dropna().astype(str).str.strip()
+
+
+def split_answers(series):
+    """Explode multi-select answers into one row per selected option."""
+    return (
+        series.str.split(SPLIT_SEPS)
+        .explode()
+        .str.strip()
+        .replace("", np.nan)
+        .dropna()
+    )
+
+
+class QuestionCounts:
+    """Counts of one question's answers per ZIP key."""
+
+    def __init__(self, answers, matrix):
+        self.answers = answers      # pd.Index of answer labels
+        self.matrix = matrix        # (n_zip_keys x n_answers) int array
+
+    @classmethod
+    def from_answers(cls, answers, zip_codes, n_keys):
+        """Build from a Series of answers whose index holds the row position."""
+        answer_codes, labels = pd.factorize(answers)
+        rows = zip_codes[answers.index.to_numpy()]
+        flat = rows * len(labels) + answer_codes
+        matrix = np.bincount(flat, minlength=n_keys * len(labels)).reshape(n_keys, len(labels))
+        return cls(pd.Index(labels), matrix.astype(np.int32))
+
+    def counts(self, key_rows=None):
+        """Answer counts summed over the given ZIP key rows (None = every row)."""
+        summed = self.matrix.sum(axis=0) if key_rows is None else self.matrix[key_rows].sum(axis=0)
+        counts = pd.Series(summed, index=self.answers, name="count")
+        counts = counts[counts > 0]
+        return counts.sort_values(ascending=False, kind="stable")
+
+
+class CountStore:
+    """Answer counts per question and normalized ZIP, with and without splitting."""
+
+    def __init__(self, zip_values, column_loader=None):
+        # One key per normalized ZIP, plus a last key for rows without a ZIP
+        zip_codes, zip_keys = pd.factorize(zip_values)
+        self.zip_keys = pd.Index(zip_keys)
+        self.zip_codes = np.where(zip_codes < 0, len(zip_keys), zip_codes)
+        self.n_keys = len(zip_keys) + 1
+        self.questions = {}
+        self.column_loader = column_loader
+
+    def add_question(self, question, column):
+        # Row positions as the index, so counts can be mapped back to ZIP keys
+        answers = clean_answers(column.reset_index(drop=True))
+        self.questions[question] = {
+            False: QuestionCounts.from_answers(answers, self.zip_codes, self.n_keys),
+            True: QuestionCounts.from_answers(split_answers(answers), self.zip_codes, self.n_keys),
+        }
+
+    def key_rows(self, zips):
+        """Matrix rows for a collection of ZIPs (None = all rows, including no-ZIP)."""
+        if zips is None:
+            return None
+        rows = self.zip_keys.get_indexer(list(zips))
+        return rows[rows >= 0]
+
+    def question_counts(self, question, split=True):
+        """The QuestionCounts of a question, counting it first if it has a column_loader."""
+        if question not in self.questions:
+            if self.column_loader is None:
+                raise KeyError(f"Question was not counted: {question}")
+            self.add_question(question, self.column_loader(question))
+        return self.questions[question][split]
+
+    def counts(self, question, zips=None, split=True):
+        """Answer counts for a question, restricted to the given ZIPs.
+
+        Matches `df[question].dropna().astype(str).str.strip()` (split or not)
+        followed by `value_counts()` on the filtered rows.
+        """
+        return self.question_counts(question, split).counts(self.key_rows(zips))
+
+    def zip_shares(self, question, answer, split=True):
+        """Per ZIP: how often `answer` was given, out of all answers to the question.
+
+        Only ZIPs with at least one answer are returned (rows without a ZIP are left out).
+        """
+        question_counts = self.question_counts(question, split)
+        matrix = question_counts.matrix[:len(self.zip_keys)]
+        answered = matrix.sum(axis=1)
+        col = question_counts.answers.get_indexer([answer])[0]
+        count = matrix[:, col] if col >= 0 else np.zeros_like(answered)
+        shares = pd.DataFrame({
+            "zip": self.zip_keys.astype(str),
+            "count": count,
+            "answered": answered,
+            "share": (count / np.maximum(answered, 1) * 100).round(1),
+        })
+        return shares[shares["answered"] > 0].reset_index(drop=True)
+
+    def group_counts(self, question, groups, split=True):
+        """Answer counts and percentages for several groups of ZIPs at once.
+
+        `groups` maps a label (a city, a ZIP, ...) to its ZIPs; groups may
+        overlap. Every group is summed in one product of a (group x ZIP key)
+        membership matrix with the question's count matrix, so comparing more
+        groups adds no pass over the data. Returns a long frame with Group,
+        Response, Count and Percent (of the group's answers).
+        """
+        question_counts = self.question_counts(question, split)
+        labels = list(groups)
+        membership = np.zeros((len(labels), self.n_keys), dtype=np.int32)
+        for i, label in enumerate(labels):
+            membership[i, self.key_rows(groups[label])] = 1
+        summed = membership @ question_counts.matrix
+
+        totals = summed.sum(axis=1, keepdims=True)
+        percent = np.round(summed / np.maximum(totals, 1) * 100, 1)
+        long = pd.DataFrame({
+            "Group": np.repeat(labels, len(question_counts.answers)),
+            "Response": np.tile(question_counts.answers.astype(str), len(labels)),
+            "Count": summed.ravel(),
+            "Percent": percent.ravel(),
+        })
+        return long[long["Count"] > 0].reset_index(drop=True)
@@ -0,0 +1,70 @@
+"""
+Deferred downloads for the ALPR Survey Explorer.
+
+Exports are only built when a download button is clicked (st.download_button
+accepts a callable since Streamlit 1.52). The table is written chunk by chunk
+into a temporary file and read back as bytes, so only the encoded export is
+held in memory, never the whole CSV text next to its encoded copy. CSV,
+gzip-compressed CSV and compressed Parquet are supported.
+"""
+
+import gzip
+import io
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows per chunk written to the temporary file
+CHUNK_ROWS = 50_000
+
+# label: (file extension, MIME type)
+FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _write_csv(table, binary_file):
+    text = io.TextIOWrapper(binary_file, encoding="utf-8", newline="", write_through=True)
+    for i, batch in enumerate(table.to_batches(max_chunksize=CHUNK_ROWS)):
+        batch.to_pandas().to_csv(text, header=(i == 0), index=False)
+    if table.num_rows == 0:
+        table.to_pandas().to_csv(text, index=False)
+    text.flush()
+    text.detach()
+
+
+def write_export(table, fmt):
+    """Return the bytes of a table exported in the given format.
+
+    The export is written to a temporary file, which is removed before returning.
+    """
+    if not isinstance(table, pa.Table):
+        table = pa.Table.from_pandas(table, preserve_index=False)
+    with tempfile.TemporaryFile() as out:
+        if fmt == "CSV":
+            _write_csv(table, out)
+        elif fmt == "CSV (gzip)":
+            with gzip.GzipFile(fileobj=out, mode="wb") as compressed:
+                _write_csv(table, compressed)
+        elif fmt == "Parquet":
+            pq.write_table(table, out, compression="zstd")
+        else:
+            raise ValueError(f"Unknown download format: {fmt}")
+        out.seek(0)
+        return out.read()
+
+
+def deferred_export(make_table, fmt):
+    """Zero-argument callable for st.download_button that builds the export on click."""
+    return lambda: write_export(make_table(), fmt)
+
+
+def file_name(stem, fmt):
+    return stem + FORMATS[fmt][0]
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][1]
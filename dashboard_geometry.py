@@ -0,0 +1,109 @@
+"""
+Pre-simplified ZIP geometries for the ALPR Survey Explorer map.
+
+The ZIP polygons in San_Francisco_ZIP_Codes_20250901.csv are simplified offline
+at a few tolerances and written as compact GeoJSON (rounded coordinates, ZIP as
+the only property) into static/, which Streamlit serves as plain files. The map
+chart only references a file by URL, so the browser downloads and caches the
+geometry once; a rerun sends the per-ZIP values and nothing else.
+
+Rebuild the files after the ZIP CSV changes (needs shapely):
+    python dashboard_geometry.py
+"""
+
+import json
+from pathlib import Path
+
+import pandas as pd
+
+ZIP_SHAPES_CSV = "San_Francisco_ZIP_Codes_20250901.csv"
+STATIC_DIR = Path(__file__).parent / "static"
+MANIFEST = "sf_zip_levels.json"
+# Served by Streamlit at this path when server.enableStaticServing is on
+STATIC_URL = "app/static"
+
+# Detail level: simplification tolerance in degrees (1e-4 deg is roughly 10 m)
+LEVELS = {
+    "coarse": 0.0004,
+    "medium": 0.0002,
+    "fine": 0.00005,
+}
+# Coordinate decimals kept in the files (5 decimals is roughly 1 m)
+DECIMALS = 5
+
+
+def simplified_features(shapes, tolerance, decimals=DECIMALS):
+    """GeoJSON features, one per ZIP, simplified to the given tolerance."""
+    import shapely
+    from shapely.geometry import mapping
+    from shapely.geometry.polygon import orient
+
+    features = []
+    for zip_code, group in shapes.groupby("zip_code"):
+        geom = shapely.union_all(shapely.from_wkt(group["geometry"]))
+        geom = geom.simplify(tolerance, preserve_topology=True)
+        geom = shapely.set_precision(geom, 10 ** -decimals)
+        # Vega/d3 expects clockwise exterior rings
+        if geom.geom_type == "Polygon":
+            geom = orient(geom, sign=-1.0)
+        else:
+            geom = shapely.MultiPolygon([orient(p, sign=-1.0) for p in geom.geoms])
+        features.append({
+            "type": "Feature",
+            "properties": {"zip": str(zip_code)},
+            "geometry": mapping(geom),
+        })
+    return features
+
+
+def build(csv_path=ZIP_SHAPES_CSV, out_dir=STATIC_DIR):
+    """Write one GeoJSON file per detail level plus a manifest describing them."""
+    import shapely
+
+    shapes = pd.read_csv(csv_path, usecols=["geometry", "zip_code"]).dropna()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        "bounds": shapely.total_bounds(shapely.from_wkt(shapes["geometry"])).round(DECIMALS).tolist(),
+        "levels": {},
+    }
+    for level, tolerance in LEVELS.items():
+        collection = {"type": "FeatureCollection", "features": simplified_features(shapes, tolerance)}
+        path = out_dir / f"sf_zip_{level}.geojson"
+        path.write_text(json.dumps(collection, separators=(",", ":")))
+        manifest["levels"][level] = {
+            "file": path.name,
+            "tolerance": tolerance,
+            "bytes": path.stat().st_size,
+        }
+        print(f"{level}: tolerance {tolerance}, {path.stat().st_size:,} bytes -> {path}")
+    (out_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """The manifest written by build(), or None if the files were never built."""
+    path = Path(static_dir) / MANIFEST
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def level_for_height(manifest, height_px):
+    """Coarsest level whose tolerance is still below one pixel at this map height."""
+    south, north = manifest["bounds"][1], manifest["bounds"][3]
+    degrees_per_pixel = (north - south) / height_px
+    levels = sorted(manifest["levels"].items(), key=lambda item: item[1]["tolerance"], reverse=True)
+    for level, info in levels:
+        if info["tolerance"] <= degrees_per_pixel:
+            return level
+    return levels[-1][0]
+
+
+def geometry_url(manifest, level):
+    return f"{STATIC_URL}/{manifest['levels'][level]['file']}"
+
+
+if __name__ == "__main__":
+    build()
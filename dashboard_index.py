@@ -0,0 +1,46 @@
+"""
+Row-index bitmaps for the ALPR Survey Explorer filters.
+
+Rather than copying the survey and masking it with isin()/== on every rerun,
+the row positions of each normalized ZIP and each city preset are computed once
+(sorted int32 arrays, shared by all sessions). A filter is then a dictionary
+lookup, and slicing a column through the positions costs time proportional to
+the number of matching rows, not the size of the dataset.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class RowIndex:
+    """Sorted row positions per ZIP and per city preset."""
+
+    def __init__(self, zip_values, city_zip_map):
+        zip_codes, zip_keys = pd.factorize(zip_values)
+
+        # One stable argsort groups the rows of every ZIP into contiguous runs
+        order = np.argsort(zip_codes, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(zip_codes[order], np.arange(len(zip_keys) + 1))
+        self.by_zip = {key: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(zip_keys)}
+
+        empty = np.array([], dtype=np.int32)
+        self.by_city = {
+            city: np.sort(np.concatenate([self.by_zip.get(z, empty) for z in zips] or [empty]))
+            for city, zips in city_zip_map.items()
+        }
+
+    def rows(self, city=None, zip_code=None):
+        """Row positions for a city and/or ZIP selection (None = no filter = all rows).
+
+        As in the dashboard, a ZIP narrows the city; a ZIP outside the city
+        matches nothing.
+        """
+        empty = np.array([], dtype=np.int32)
+        if zip_code is not None:
+            rows = self.by_zip.get(zip_code, empty)
+            if city is not None:
+                rows = rows[np.isin(rows, self.by_city.get(city, empty), assume_unique=True)]
+            return rows
+        if city is not None:
+            return self.by_city.get(city, empty)
+        return None
@@ -0,0 +1,145 @@
+"""
+Per-rerun timing and cache diagnostics for the ALPR Survey Explorer.
+
+Every rerun gets a RerunTimer. Stages are timed with `with timer.stage(...)`,
+and cached loaders are called through `timer.cached(...)`: a cached function
+calls note_miss() first thing in its body, which only runs on a cache miss,
+so anything not marked is a hit. The size of a cached object is measured once,
+when it is first cached, from its buffer sizes (object columns count only
+their pointers), and kept per loader name; lazy work done on it later (such as
+the answer counts a CountStore builds on first use) is not included.
+
+Records are plain dicts, one per rerun; the dashboard keeps the last
+MAX_RECORDS of each session and can export them as JSON lines. With
+DASHBOARD_TIMINGS_LOG set, every record is also appended to that file, so
+timings from many sessions can be collected while the app is under load.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+TIMINGS_LOG_ENV = "DASHBOARD_TIMINGS_LOG"
+# Rerun records kept per session
+MAX_RECORDS = 200
+
+# Size in bytes of each cached object, measured when it was cached
+CACHE_SIZES = {}
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def note_miss(name):
+    """Mark a cached loader as missed; call first thing inside the cached function."""
+    misses = getattr(_local, "misses", None)
+    if misses is not None:
+        misses.add(name)
+
+
+def deep_size(obj, _seen=None):
+    """Approximate memory held by an object, following containers and attributes.
+
+    Arrays, pandas and Arrow objects count their buffers only, so the cost
+    does not grow with the number of rows.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Views share their base's memory; only count owned buffers
+        return obj.nbytes if obj.base is None else 0
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=False))
+    if isinstance(obj, (pa.Table, pa.ChunkedArray, pa.Array)):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_size(k, _seen) + deep_size(v, _seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(deep_size(item, _seen) for item in obj)
+    if hasattr(obj, "__dict__") and not isinstance(obj, type):
+        return sys.getsizeof(obj) + deep_size(vars(obj), _seen)
+    return sys.getsizeof(obj)
+
+
+class RerunTimer:
+    """Stage timings and cache hits/misses of one script rerun."""
+
+    def __init__(self, session_id, rerun):
+        self.start = time.perf_counter()
+        self.record = {
+            "session": session_id,
+            "rerun": rerun,
+            "time": time.time(),
+            "stages_ms": {},
+            "cache": {},
+        }
+        _local.misses = set()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block; repeated stages of the same name add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            stages = self.record["stages_ms"]
+            stages[name] = stages.get(name, 0.0) + elapsed
+
+    def cached(self, name, fn, *args, **kwargs):
+        """Call a st.cache_* function and record whether it was a hit."""
+        _local.misses.discard(name)
+        result = fn(*args, **kwargs)
+        missed = name in _local.misses
+        self.record["cache"][name] = "miss" if missed else "hit"
+        if missed or name not in CACHE_SIZES:
+            CACHE_SIZES[name] = deep_size(result)
+        return result
+
+    def finish(self):
+        """Close the record (total time, cached sizes) and append it to the log file if one is set."""
+        self.record["total_ms"] = (time.perf_counter() - self.start) * 1000
+        self.record["cache_bytes"] = {name: CACHE_SIZES.get(name) for name in self.record["cache"]}
+        log_path = os.environ.get(TIMINGS_LOG_ENV)
+        if log_path:
+            line = json.dumps(self.record)
+            with _log_lock, open(log_path, "a") as f:
+                f.write(line + "\n")
+        return self.record
+
+
+def to_jsonl(records):
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def stage_summary(records):
+    """Per stage: reruns seen, mean/median/max milliseconds."""
+    stages = pd.DataFrame([r["stages_ms"] for r in records])
+    stages["total"] = pd.Series([r.get("total_ms") for r in records], dtype=float)
+    summary = stages.agg(["count", "mean", "median", "max"]).T
+    return summary.rename(columns={"count": "reruns"}).round(2)
+
+
+def cache_summary(records):
+    """Per cached loader: hits, misses and the size of the cached object."""
+    rows = {}
+    for record in records:
+        for name, outcome in record["cache"].items():
+            row = rows.setdefault(name, {"hits": 0, "misses": 0})
+            row["hits" if outcome == "hit" else "misses"] += 1
+    summary = pd.DataFrame.from_dict(rows, orient="index")
+    summary["size (MB)"] = [round((CACHE_SIZES.get(name) or 0) / 1e6, 3) for name in summary.index]
+    return summary
@@ -2,8 +2,18 @@ import requests
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
+import argparse
 import os
-from census import Census
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# api_endpoints.py and tract_schema.py live in the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from api_endpoints import get_census_client, overpass_url
+from tract_schema import census_frame, conform, to_csv, tract_geoids
+from pipeline_trace import PipelineTrace
 
 """
 This script pulls the distribution of Automated License Plate Reader (ALPR) cameras 
@@ -22,27 +32,37 @@ For each county, it:
 - Saves a CSV file per county containing ALPR counts and demographic context
 
 Output files are named like: 'san_francisco_alpr_race_income.csv'
-"""
 
-# Load Census API Key
-CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
-if not CENSUS_API_KEY:
-    raise ValueError("Census API key is missing! Set it as an environment variable.")
-c = Census(CENSUS_API_KEY)
+Each stage (fetch cameras, fetch census, load shapefile, spatial join, merge,
+write) is traced per county; the trace is saved to alpr_demographics_trace.json
+and summarized at the end (see pipeline_trace.py).
+
+--statewide runs all 58 California counties (or --counties 001,075,...) from
+one statewide TIGER/Line tract shapefile, e.g.
+https://www2.census.gov/geo/tiger/TIGER2021/TRACT/tl_2021_06_tract.zip.
+Counties are processed in a pool of --jobs worker processes, each reading only
+its own county's tracts, and each county's result is written to its own
+partition (alpr_statewide/075_san_francisco.csv, ...) as soon as it finishes.
+A rerun skips the counties that already have a partition, so an interrupted
+run picks up where it stopped. Once every county is done, the partitions are
+concatenated into alpr_statewide/california_alpr_race_income.csv.
+
+    python data/census/alpr_demographics_by_tract.py --statewide --jobs 4
+"""
 
 # === DATA FETCH FUNCTIONS ===
 
 def fetch_census_income(county_fips):
     """Fetch median income data for Census Tracts from the Census API."""
     try:
-        data = c.acs5.state_county_tract(
+        data = get_census_client().acs5.state_county_tract(
             fields=["B19013_001E"],  # Median household income
             state_fips="06",  # California
             county_fips=county_fips,
             tract="*",
             year=2021
         )
-        return pd.DataFrame(data).rename(columns={"B19013_001E": "median_income"})
+        return census_frame(pd.DataFrame(data).rename(columns={"B19013_001E": "median_income"}))
     except Exception as e:
         print(f"Error fetching Census income data for county {county_fips}: {e}")
         return pd.DataFrame()
@@ -50,7 +70,7 @@ def fetch_census_income(county_fips):
 def fetch_census_race_data(county_fips):
     """Fetch racial composition + Hispanic origin for Census Tracts."""
     try:
-        data = c.acs5.state_county_tract(
+        data = get_census_client().acs5.state_county_tract(
             fields=[
                 "B03002_001E",  # Total Population
                 "B03002_003E",  # Non-Hispanic White
@@ -70,7 +90,7 @@ def fetch_census_race_data(county_fips):
             "B03002_006E": "asian_pop",
             "B03002_012E": "hispanic_pop"
         })
-        return df
+        return census_frame(df)
     except Exception as e:
         print(f"Error fetching extended race data: {e}")
         return pd.DataFrame()
@@ -82,8 +102,7 @@ def fetch_alpr_locations():
     node["man_made"="surveillance"]["surveillance:type"="ALPR"];
     out body;
     """
-    overpass_url = "http://overpass-api.de/api/interpreter"
-    response = requests.get(overpass_url, params={"data": query})
+    response = requests.get(overpass_url(), params={"data": query})
     if response.status_code != 200:
         print(f"Overpass API request failed: {response.status_code}")
         return None
@@ -96,10 +115,11 @@ def fetch_alpr_locations():
     print(f"Found {len(locations)} ALPR cameras.")
     return pd.DataFrame(locations)
 
-def load_census_shapefile(file_path):
-    """Load Census Tracts shapefile for a county."""
+def load_census_shapefile(file_path, county_fips=None):
+    """Load Census Tracts shapefile for a county (or one county's tracts from a statewide file)."""
     try:
-        census_gdf = gpd.read_file(file_path)
+        where = f"COUNTYFP = '{county_fips}'" if county_fips else None
+        census_gdf = gpd.read_file(file_path, where=where)
         census_gdf = census_gdf.to_crs("EPSG:4326")
         return census_gdf
     except Exception as e:
@@ -116,26 +136,16 @@ def process_alpr_data(alpr_df, census_gdf, census_income_df):
         crs="EPSG:4326"
     )
     census_gdf = census_gdf.to_crs(alpr_gdf.crs)
-    alpr_with_tracts = gpd.sjoin(alpr_gdf, census_gdf, how="left", predicate="within")
-
-    # Identify tract column
-    possible_tract_columns = ["tractce", "TRACT", "TRACTCE10", "GEOID", "tract"]
-    for col in possible_tract_columns:
-        if col in alpr_with_tracts.columns:
-            tract_column = col
-            break
-    else:
-        raise KeyError("No valid 'tract' column found in the Census shapefile!")
-
-    alpr_with_tracts = alpr_with_tracts.rename(columns={tract_column: "tract"})
-    alpr_with_tracts["tract"] = alpr_with_tracts["tract"].astype(str).str.zfill(6)
-
-    alpr_counts = (
-        alpr_with_tracts.groupby("tract").size()
-        .reset_index(name="num_alpr_cameras")
-    )
-    merged_df = pd.merge(alpr_counts, census_income_df, on="tract", how="left")
-    return merged_df
+    # Cameras outside the county's tracts have no tract to count toward
+    alpr_with_tracts = gpd.sjoin(alpr_gdf, census_gdf, how="inner", predicate="within")
+
+    # Integer tract GEOIDs; shapefiles with only a tract code take the county's FIPS from the census data
+    state, county = census_income_df[["state", "county"]].iloc[0]
+    geoids = tract_geoids(alpr_with_tracts, state=state, county=county)
+
+    alpr_counts = geoids.value_counts(sort=False).rename_axis("GEOID").reset_index(name="num_alpr_cameras")
+    merged_df = pd.merge(alpr_counts, census_income_df, on="GEOID", how="left")
+    return conform(merged_df)
 
 # === MAIN PROCESSING LOOP ===
 
@@ -145,47 +155,198 @@ counties = {
     # "001": ("Alameda", "shapefiles/Alameda_Census_Tracts.zip")  # Optional
 }
 
-def main():
+TRACE_PATH = "alpr_demographics_trace.json"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ALPR camera counts and census demographics per census tract.")
+    parser.add_argument("--statewide", action="store_true", help="all California counties, one output partition per county")
+    parser.add_argument("--counties", help="comma-separated county FIPS codes for --statewide (default: all 58)")
+    parser.add_argument("--shapefile", default=STATEWIDE_SHAPEFILE, help="statewide tract shapefile for --statewide")
+    parser.add_argument("--out", default=STATEWIDE_DIR, help="partition folder for --statewide")
+    parser.add_argument("--jobs", type=int, default=4, help="counties processed at once for --statewide")
+    parser.add_argument("--trace", default=TRACE_PATH, help="where to save the stage trace")
+    args = parser.parse_args(argv)
+    county_fips = [c.strip().zfill(3) for c in args.counties.split(",")] if args.counties else None
+    unknown = [c for c in county_fips or [] if c not in CA_COUNTIES]
+    if unknown:
+        parser.error(f"not California county FIPS codes: {', '.join(unknown)}")
+
+    trace = PipelineTrace()
+    try:
+        if args.statewide:
+            run_statewide(trace, args.shapefile, args.out, args.jobs, county_fips)
+        else:
+            run(trace)
+    finally:
+        trace.write(args.trace)
+        print(f"\n=== STAGE SUMMARY ===\n{trace.summary().to_string()}")
+        print(f"Trace saved to {args.trace}")
+
+def run(trace):
     print("Fetching ALPR camera locations...")
-    alpr_df = fetch_alpr_locations()
+    with trace.stage("fetch_cameras") as span:
+        alpr_df = fetch_alpr_locations()
+        span["rows_out"] = 0 if alpr_df is None else len(alpr_df)
     if alpr_df is None or alpr_df.empty:
         print("No ALPR data retrieved. Exiting.")
         return
 
     for county_fips, (county_name, shapefile) in counties.items():
-        print(f"\nProcessing {county_name} County...")
+        file_path = f"{county_name.lower()}_alpr_race_income.csv"
+        if process_county(county_fips, county_name, shapefile, alpr_df, trace, file_path) is not None:
+            print(f"Saved {county_name} ALPR + Census data to {file_path}")
 
-        census_income_df = fetch_census_income(county_fips)
-        if census_income_df.empty:
-            print(f"Failed to retrieve Census income data for {county_name}. Skipping.")
-            continue
+# === PER-COUNTY PIPELINE ===
 
-        race_df = fetch_census_race_data(county_fips)
-        if race_df.empty:
-            print(f"Failed to retrieve Census race data for {county_name}. Skipping.")
-            continue
+def process_county(county_fips, county_name, shapefile, alpr_df, trace, file_path, statewide=False):
+    """Fetch, join, merge and save one county; returns its result, or None if it was skipped.
+
+    With statewide=True the shapefile covers the whole state and only the
+    county's tracts are read from it.
+    """
+    print(f"\nProcessing {county_name} County...")
+
+    with trace.stage("fetch_census", county=county_name) as span:
+        census_income_df = fetch_census_income(county_fips)
+        race_df = fetch_census_race_data(county_fips) if not census_income_df.empty else pd.DataFrame()
+        span["rows_out"] = len(census_income_df)
+    if census_income_df.empty:
+        print(f"Failed to retrieve Census income data for {county_name}. Skipping.")
+        return None
+    if race_df.empty:
+        print(f"Failed to retrieve Census race data for {county_name}. Skipping.")
+        return None
 
-        census_gdf = load_census_shapefile(shapefile)
-        if census_gdf is None or census_gdf.empty:
-            print(f"Failed to load Census shapefile for {county_name}. Skipping.")
-            continue
+    with trace.stage("load_shapefile", county=county_name) as span:
+        census_gdf = load_census_shapefile(shapefile, county_fips if statewide else None)
+        span["rows_out"] = 0 if census_gdf is None else len(census_gdf)
+    if census_gdf is None or census_gdf.empty:
+        print(f"Failed to load Census shapefile for {county_name}. Skipping.")
+        return None
 
+    with trace.stage("spatial_join", county=county_name, rows_in=len(alpr_df)) as span:
+        # Only cameras within the county's extent can fall in one of its tracts
+        west, south, east, north = census_gdf.total_bounds
+        alpr_df = alpr_df[alpr_df.longitude.between(west, east) & alpr_df.latitude.between(south, north)]
         alpr_result_df = process_alpr_data(alpr_df, census_gdf, census_income_df)
+        span["rows_out"] = len(alpr_result_df)
 
-        # Merge race data
-        alpr_result_df = alpr_result_df.merge(race_df, on="tract", how="left")
+    with trace.stage("merge", county=county_name, rows_in=len(alpr_result_df)) as span:
+        # Merge race data (state/county/tract are already in the GEOID key)
+        race_df = race_df.drop(columns=["state", "county", "tract"])
+        alpr_result_df = alpr_result_df.merge(race_df, on="GEOID", how="left")
         alpr_result_df = alpr_result_df.rename(columns={"white_non_hispanic": "white_pop"})
 
         # Compute percentages
-        alpr_result_df["white_pct"] = alpr_result_df["white_pop"] / alpr_result_df["total_pop"]
-        alpr_result_df["black_pct"] = alpr_result_df["black_pop"] / alpr_result_df["total_pop"]
-        alpr_result_df["asian_pct"] = alpr_result_df["asian_pop"] / alpr_result_df["total_pop"]
-        alpr_result_df["hispanic_pct"] = alpr_result_df["hispanic_pop"] / alpr_result_df["total_pop"]
+        total_pop = alpr_result_df["total_pop"].astype("float32")
+        for group in ["white", "black", "asian", "hispanic"]:
+            alpr_result_df[f"{group}_pct"] = alpr_result_df[f"{group}_pop"] / total_pop
+        alpr_result_df = conform(alpr_result_df)
+        span["rows_out"] = len(alpr_result_df)
 
-        # Save results
-        file_path = f"{county_name.lower()}_alpr_race_income.csv"
-        alpr_result_df.to_csv(file_path, index=False)
-        print(f"Saved {county_name} ALPR + Census data to {file_path}")
+    # Save results (to a temporary file first, so a partial file never looks finished)
+    with trace.stage("write", county=county_name, rows_in=len(alpr_result_df)) as span:
+        tmp_path = f"{file_path}.tmp"
+        to_csv(alpr_result_df, tmp_path)
+        os.replace(tmp_path, file_path)
+        span["rows_out"] = len(alpr_result_df)
+    return alpr_result_df
+
+# === STATEWIDE ===
+
+CA_COUNTIES = {
+    "001": "Alameda", "003": "Alpine", "005": "Amador", "007": "Butte", "009": "Calaveras",
+    "011": "Colusa", "013": "Contra_Costa", "015": "Del_Norte", "017": "El_Dorado", "019": "Fresno",
+    "021": "Glenn", "023": "Humboldt", "025": "Imperial", "027": "Inyo", "029": "Kern",
+    "031": "Kings", "033": "Lake", "035": "Lassen", "037": "Los_Angeles", "039": "Madera",
+    "041": "Marin", "043": "Mariposa", "045": "Mendocino", "047": "Merced", "049": "Modoc",
+    "051": "Mono", "053": "Monterey", "055": "Napa", "057": "Nevada", "059": "Orange",
+    "061": "Placer", "063": "Plumas", "065": "Riverside", "067": "Sacramento", "069": "San_Benito",
+    "071": "San_Bernardino", "073": "San_Diego", "075": "San_Francisco", "077": "San_Joaquin",
+    "079": "San_Luis_Obispo", "081": "San_Mateo", "083": "Santa_Barbara", "085": "Santa_Clara",
+    "087": "Santa_Cruz", "089": "Shasta", "091": "Sierra", "093": "Siskiyou", "095": "Solano",
+    "097": "Sonoma", "099": "Stanislaus", "101": "Sutter", "103": "Tehama", "105": "Trinity",
+    "107": "Tulare", "109": "Tuolumne", "111": "Ventura", "113": "Yolo", "115": "Yuba",
+}
+STATEWIDE_SHAPEFILE = "shapefiles/tl_2021_06_tract.zip"
+STATEWIDE_DIR = "alpr_statewide"
+STATEWIDE_FILE = "california_alpr_race_income.csv"
+
+# Camera locations of a worker process, set once when the pool starts it
+_worker_cameras = None
+
+def _init_worker(alpr_df):
+    global _worker_cameras
+    _worker_cameras = alpr_df
+
+def _run_partition(county_fips, county_name, shapefile, file_path):
+    """Pool task: one county into its partition; returns (rows or None, the county's stage records)."""
+    trace = PipelineTrace()
+    result = process_county(county_fips, county_name, shapefile, _worker_cameras, trace, file_path, statewide=True)
+    return (None if result is None else len(result)), trace.records
+
+def partition_path(out_dir, county_fips):
+    return Path(out_dir) / f"{county_fips}_{CA_COUNTIES[county_fips].lower()}.csv"
+
+def combine_partitions(paths, file_path):
+    """Concatenate partition CSVs (same columns) into one file, a partition at a time."""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w") as out:
+        for i, path in enumerate(paths):
+            with open(path) as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+    os.replace(tmp_path, file_path)
+
+def run_statewide(trace, shapefile=STATEWIDE_SHAPEFILE, out_dir=STATEWIDE_DIR, jobs=4, county_fips=None):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    selected = county_fips or list(CA_COUNTIES)
+
+    # Counties with a partition from an earlier run are done
+    todo = []
+    for fips in selected:
+        if partition_path(out_dir, fips).exists():
+            with trace.stage("resume", county=CA_COUNTIES[fips]) as span:
+                span["cache_hits"] = 1
+        else:
+            todo.append(fips)
+    print(f"{len(selected) - len(todo)} of {len(selected)} counties already in {out_dir}, {len(todo)} to process")
+
+    if todo:
+        print("Fetching ALPR camera locations...")
+        with trace.stage("fetch_cameras") as span:
+            alpr_df = fetch_alpr_locations()
+            span["rows_out"] = 0 if alpr_df is None else len(alpr_df)
+        if alpr_df is None or alpr_df.empty:
+            print("No ALPR data retrieved. Exiting.")
+            return
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(alpr_df,)) as pool:
+            futures = {
+                pool.submit(_run_partition, fips, CA_COUNTIES[fips], shapefile, str(partition_path(out_dir, fips))): fips
+                for fips in todo
+            }
+            for future in as_completed(futures):
+                fips = futures[future]
+                try:
+                    rows, records = future.result()
+                except Exception as e:
+                    print(f"{CA_COUNTIES[fips]} failed ({type(e).__name__}: {e}); rerun to retry it")
+                    continue
+                trace.records.extend(records)
+                if rows is not None:
+                    print(f"Saved {CA_COUNTIES[fips]} ({rows} tracts with cameras) to {partition_path(out_dir, fips)}")
+
+    missing = [CA_COUNTIES[fips] for fips in selected if not partition_path(out_dir, fips).exists()]
+    if missing:
+        print(f"{len(missing)} counties not done yet ({', '.join(missing)}); rerun to retry them")
+        return
+    file_path = out_dir / STATEWIDE_FILE
+    combine_partitions([partition_path(out_dir, fips) for fips in selected], file_path)
+    print(f"Saved statewide ALPR + Census data to {file_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,372 @@
+import argparse
+import json
+import math
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+"""
+This script exports an interactive map of ALPR cameras with census tract
+choropleths (cameras per 1,000 residents, median income, race), built to stay
+fast with tens of thousands of cameras.
+
+Instead of one marker per camera, the cameras and tracts are cut offline into
+web-map tiles (z/x/y, the same grid as the basemap) saved as small GeoJSON
+files:
+- Cameras: below CLUSTER_UNTIL_ZOOM every tile holds pre-computed clusters
+  (a grid of CLUSTER_CELLS x CLUSTER_CELLS cells per tile, one point with a
+  count per non-empty cell); from that zoom on it holds the cameras themselves.
+- Tracts: polygons simplified to about one pixel at each zoom, with the
+  choropleth values as properties.
+
+The page (folium/Leaflet) only requests the tiles that are in view at the
+current zoom and keeps the ones it has already loaded.
+
+Usage:
+    python alpr_map.py --cameras cameras.csv \
+        --tracts ../shapefiles/San_Francisco_Census_Tracts.zip \
+        --demographics san_francisco_race_income_by_tract5.csv \
+        --out maps/san_francisco
+    python -m http.server -d maps/san_francisco   # then open http://localhost:8000
+
+--cameras is a CSV with latitude/longitude columns (e.g. the output of
+fetch_alpr_locations); without it the cameras are fetched from Overpass.
+"""
+
+MIN_ZOOM = 9
+MAX_ZOOM = 16
+# Cameras are clustered below this zoom and drawn one by one from it on
+CLUSTER_UNTIL_ZOOM = 14
+CLUSTER_CELLS = 8
+# Tract tiles stop here; deeper zooms reuse these tiles
+TRACT_MAX_ZOOM = 13
+# Coordinate decimals in the tiles (5 decimals is roughly 1 m)
+DECIMALS = 5
+# Census "not available" sentinel values
+CENSUS_MISSING = [-666666666, -999999999, -888888888, -222222222]
+
+METRICS = {
+    "cameras_per_1k": "ALPR cameras per 1,000 residents",
+    "median_income": "Median household income ($)",
+    "poc_pct": "People of color (%)",
+    "white_pct": "White, non-Hispanic (%)",
+    "black_pct": "Black (%)",
+    "asian_pct": "Asian (%)",
+    "hispanic_pct": "Hispanic/Latino (%)",
+}
+
+
+# === TILE MATH ===
+
+def tile_coords(lon, lat, zoom):
+    """Fractional web-mercator tile coordinates of lon/lat arrays at a zoom."""
+    n = 2 ** zoom
+    lat = np.clip(lat, -85.0511, 85.0511)
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - np.arcsinh(np.tan(np.radians(lat))) / math.pi) / 2.0 * n
+    return x, y
+
+
+def degrees_per_pixel(zoom):
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def write_tile(out_dir, layer, z, x, y, features):
+    path = out_dir / layer / str(z) / str(x) / f"{y}.geojson"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # allow_nan=False: NaN is not JSON, and the browser's JSON parser rejects the whole tile
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features},
+                               separators=(",", ":"), allow_nan=False))
+
+
+# === CAMERA TILES ===
+
+def camera_tiles(cameras, out_dir, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """Write clustered (low zoom) and individual (high zoom) camera tiles; returns tiles written."""
+    lon = cameras["longitude"].to_numpy(dtype=float)
+    lat = cameras["latitude"].to_numpy(dtype=float)
+    written = 0
+    for z in range(min_zoom, max_zoom + 1):
+        fx, fy = tile_coords(lon, lat, z)
+        tx, ty = fx.astype(np.int64), fy.astype(np.int64)
+        if z < CLUSTER_UNTIL_ZOOM:
+            # One cluster per grid cell: group all cameras by (tile, cell) at once
+            cx = ((fx - tx) * CLUSTER_CELLS).astype(np.int64)
+            cy = ((fy - ty) * CLUSTER_CELLS).astype(np.int64)
+            keys = np.stack([tx, ty, cx, cy], axis=1)
+            cells, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+            inverse = inverse.ravel()
+            mean_lon = np.bincount(inverse, weights=lon) / counts
+            mean_lat = np.bincount(inverse, weights=lat) / counts
+            points = pd.DataFrame({"tx": cells[:, 0], "ty": cells[:, 1], "lon": mean_lon, "lat": mean_lat, "count": counts})
+        else:
+            points = pd.DataFrame({"tx": tx, "ty": ty, "lon": lon, "lat": lat, "count": 1})
+        points[["lon", "lat"]] = points[["lon", "lat"]].round(DECIMALS)
+
+        for (x, y), tile in points.groupby(["tx", "ty"], sort=False):
+            features = [
+                {"type": "Feature", "geometry": {"type": "Point", "coordinates": [p_lon, p_lat]},
+                 "properties": {"count": int(count)}}
+                for p_lon, p_lat, count in zip(tile["lon"], tile["lat"], tile["count"])
+            ]
+            write_tile(out_dir, "cameras", z, x, y, features)
+            written += 1
+    return written
+
+
+# === TRACT TILES ===
+
+def tract_choropleth(tracts, demographics, cameras):
+    """Tract polygons with camera counts and the choropleth metrics as columns."""
+    points = gpd.GeoDataFrame(
+        geometry=gpd.points_from_xy(cameras["longitude"], cameras["latitude"]), crs="EPSG:4326"
+    )
+    joined = gpd.sjoin(points, tracts[["GEOID", "geometry"]], how="inner", predicate="within")
+    counts = joined.groupby("GEOID").size().rename("cameras")
+
+    demo = demographics.copy()
+    demo = demo.replace(CENSUS_MISSING, np.nan)
+    out = tracts[["GEOID", "geometry"]].merge(demo, on="GEOID", how="left")
+    out["cameras"] = out["GEOID"].map(counts).fillna(0).astype(int)
+    pop = out["total_pop"].where(out["total_pop"] > 0)
+    out["cameras_per_1k"] = out["cameras"] / pop * 1000
+    for group in ["white", "black", "asian", "hispanic"]:
+        out[f"{group}_pct"] = out[f"{group}_pop"] / pop * 100
+    out["poc_pct"] = 100 - out["white_pct"]
+    return out
+
+
+def tract_tiles(choropleth, out_dir, min_zoom=MIN_ZOOM, max_zoom=TRACT_MAX_ZOOM):
+    """Write per-zoom tract tiles, simplified to about a pixel at each zoom; returns tiles written."""
+    import mercantile
+
+    # Built in plain Python: pandas turns None back into NaN in float columns
+    metrics = list(METRICS)
+    records = [
+        {"GEOID": geoid, "cameras": int(cameras),
+         **{k: None if pd.isna(v) else round(float(v), 2) for k, v in zip(metrics, row)}}
+        for geoid, cameras, row in zip(choropleth["GEOID"], choropleth["cameras"],
+                                       choropleth[metrics].itertuples(index=False, name=None))
+    ]
+
+    west, south, east, north = choropleth.total_bounds
+    written = 0
+    for z in range(min_zoom, max_zoom + 1):
+        geoms = shapely.set_precision(
+            choropleth.geometry.simplify(degrees_per_pixel(z), preserve_topology=True).values,
+            10 ** -DECIMALS
+        )
+        tree = shapely.STRtree(geoms)
+        for tile in mercantile.tiles(west, south, east, north, [z]):
+            hits = tree.query(shapely.box(*mercantile.bounds(tile)), predicate="intersects")
+            if len(hits) == 0:
+                continue
+            features = [
+                {"type": "Feature", "geometry": shapely.geometry.mapping(geoms[i]), "properties": records[i]}
+                for i in hits
+            ]
+            write_tile(out_dir, "tracts", z, tile.x, tile.y, features)
+            written += 1
+    return written
+
+
+def metric_breaks(choropleth, n_classes=5):
+    """Quantile class breaks per metric, for the browser's color scale."""
+    breaks = {}
+    for metric in METRICS:
+        values = choropleth[metric].dropna()
+        qs = np.quantile(values, np.linspace(0, 1, n_classes + 1)[1:-1]) if len(values) else []
+        breaks[metric] = [round(float(q), 2) for q in qs]
+    return breaks
+
+
+# === MAP PAGE ===
+
+LOADER_JS = """
+{% macro script(this, kwargs) %}
+(function() {
+    var map = {{ this._parent.get_name() }};
+    var manifest = {{ this.manifest }};
+    var colors = ["#ffffb2", "#fecc5c", "#fd8d3c", "#f03b20", "#bd0026"];
+    var metric = Object.keys(manifest.metrics)[0];
+    var cameraLayer = L.layerGroup().addTo(map);
+    var tractLayer = L.layerGroup().addTo(map);
+    var cache = {};
+
+    function color(value) {
+        if (value === null || value === undefined) { return "#cccccc"; }
+        var breaks = manifest.breaks[metric], i = 0;
+        while (i < breaks.length && value > breaks[i]) { i++; }
+        return colors[i];
+    }
+    function tractStyle(feature) {
+        return {color: "#666", weight: 0.5, fillOpacity: 0.6, fillColor: color(feature.properties[metric])};
+    }
+    function tractPopup(feature) {
+        var p = feature.properties, rows = ["<b>Tract " + p.GEOID + "</b>", "Cameras: " + p.cameras];
+        for (var key in manifest.metrics) { rows.push(manifest.metrics[key] + ": " + (p[key] === null ? "n/a" : p[key])); }
+        return rows.join("<br>");
+    }
+    function cameraMarker(feature, latlng) {
+        var n = feature.properties.count;
+        if (n === 1) { return L.circleMarker(latlng, {radius: 4, color: "#08306b", weight: 1, fillOpacity: 0.9}); }
+        var size = 18 + 6 * Math.log10(n);
+        return L.marker(latlng, {icon: L.divIcon({
+            html: "<div>" + n + "</div>", className: "camera-cluster", iconSize: [size, size]
+        })});
+    }
+    function makeLayer(kind, data) {
+        if (kind === "tracts") {
+            return L.geoJSON(data, {style: tractStyle, onEachFeature: function(f, l) { l.bindPopup(tractPopup(f)); }});
+        }
+        return L.geoJSON(data, {pointToLayer: cameraMarker});
+    }
+    function tileRange(z) {
+        var b = map.getBounds(), n = Math.pow(2, z);
+        function tx(lon) { return Math.floor((lon + 180) / 360 * n); }
+        function ty(lat) {
+            var r = Math.max(Math.min(lat, 85.0511), -85.0511) * Math.PI / 180;
+            return Math.floor((1 - Math.log(Math.tan(r) + 1 / Math.cos(r)) / Math.PI) / 2 * n);
+        }
+        return {x0: tx(b.getWest()), x1: tx(b.getEast()), y0: ty(b.getNorth()), y1: ty(b.getSouth())};
+    }
+    function show(kind, group, maxZoom) {
+        group.clearLayers();
+        var z = Math.max(manifest.min_zoom, Math.min(map.getZoom(), maxZoom)), r = tileRange(z);
+        for (var x = r.x0; x <= r.x1; x++) {
+            for (var y = r.y0; y <= r.y1; y++) {
+                var url = kind + "/" + z + "/" + x + "/" + y + ".geojson";
+                if (url in cache) {
+                    if (cache[url]) { group.addLayer(cache[url]); }
+                    continue;
+                }
+                cache[url] = null;
+                (function(url) {
+                    fetch(url).then(function(r) { return r.ok ? r.json() : null; }).then(function(data) {
+                        if (!data) { return; }
+                        cache[url] = makeLayer(kind, data);
+                        if (url.split("/")[1] == Math.max(manifest.min_zoom, Math.min(map.getZoom(), maxZoom))) {
+                            group.addLayer(cache[url]);
+                        }
+                    });
+                })(url);
+            }
+        }
+    }
+    function refresh() {
+        show("tracts", tractLayer, manifest.tract_max_zoom);
+        show("cameras", cameraLayer, manifest.max_zoom);
+    }
+
+    var picker = L.control({position: "topright"});
+    picker.onAdd = function() {
+        var div = L.DomUtil.create("div", "leaflet-bar metric-picker"), select = L.DomUtil.create("select", "", div);
+        for (var key in manifest.metrics) {
+            var option = L.DomUtil.create("option", "", select);
+            option.value = key;
+            option.text = manifest.metrics[key];
+        }
+        L.DomEvent.disableClickPropagation(div);
+        select.onchange = function() {
+            metric = select.value;
+            tractLayer.eachLayer(function(layer) { layer.setStyle(tractStyle); });
+            for (var url in cache) { if (cache[url] && url.indexOf("tracts/") === 0) { cache[url].setStyle(tractStyle); } }
+        };
+        return div;
+    };
+    picker.addTo(map);
+    L.control.layers(null, {"ALPR cameras": cameraLayer, "Census tracts": tractLayer}).addTo(map);
+    map.on("moveend", refresh);
+    refresh();
+})();
+{% endmacro %}
+"""
+
+PAGE_CSS = """
+<style>
+.camera-cluster { background: rgba(8, 48, 107, 0.75); color: white; border-radius: 50%;
+                  display: flex; align-items: center; justify-content: center; font: bold 11px sans-serif; }
+.camera-cluster div { line-height: 1; }
+.metric-picker select { font-size: 13px; padding: 4px; }
+</style>
+"""
+
+
+def write_map(out_dir, manifest, center, zoom_start=12):
+    import folium
+    from branca.element import Element, MacroElement, Template
+
+    class TileLoader(MacroElement):
+        _template = Template(LOADER_JS)
+
+        def __init__(self, manifest):
+            super().__init__()
+            self._name = "TileLoader"
+            self.manifest = json.dumps(manifest)
+
+    fmap = folium.Map(location=center, zoom_start=zoom_start, min_zoom=MIN_ZOOM, tiles="OpenStreetMap")
+    fmap.get_root().header.add_child(Element(PAGE_CSS))
+    fmap.add_child(TileLoader(manifest))
+    fmap.save(str(out_dir / "index.html"))
+
+
+# === MAIN ===
+
+def load_tracts(path):
+    tracts = gpd.read_file(path).to_crs("EPSG:4326")
+    for col in ["GEOID", "geoid", "GEOID20", "GEOID10"]:
+        if col in tracts.columns:
+            return tracts.rename(columns={col: "GEOID"})
+    raise KeyError("No GEOID column found in the tract shapefile!")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a tiled ALPR camera + tract choropleth map.")
+    parser.add_argument("--cameras", help="CSV with latitude/longitude columns (default: fetch from Overpass)")
+    parser.add_argument("--tracts", required=True, help="tract shapefile (zip)")
+    parser.add_argument("--demographics", required=True, help="*_race_income_by_tract5.csv")
+    parser.add_argument("--out", default="maps/alpr")
+    args = parser.parse_args(argv)
+
+    if args.cameras:
+        cameras = pd.read_csv(args.cameras)
+    else:
+        from alpr_demographics_by_tract import fetch_alpr_locations
+        cameras = fetch_alpr_locations()
+    cameras = cameras.dropna(subset=["latitude", "longitude"])
+
+    tracts = load_tracts(args.tracts)
+    demographics = pd.read_csv(args.demographics, dtype={"GEOID": str, "state": str, "county": str, "tract": str})
+    choropleth = tract_choropleth(tracts, demographics, cameras)
+
+    # Only keep cameras near the tracts (Overpass returns the whole world)
+    west, south, east, north = choropleth.total_bounds
+    cameras = cameras[cameras["longitude"].between(west, east) & cameras["latitude"].between(south, north)]
+
+    out_dir = Path(args.out)
+    for layer in ["cameras", "tracts"]:
+        shutil.rmtree(out_dir / layer, ignore_errors=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    n_camera_tiles = camera_tiles(cameras, out_dir)
+    n_tract_tiles = tract_tiles(choropleth, out_dir)
+    manifest = {
+        "min_zoom": MIN_ZOOM,
+        "max_zoom": MAX_ZOOM,
+        "tract_max_zoom": TRACT_MAX_ZOOM,
+        "metrics": METRICS,
+        "breaks": metric_breaks(choropleth),
+    }
+    center = [(south + north) / 2, (west + east) / 2]
+    write_map(out_dir, manifest, center)
+    print(f"{len(cameras):,} cameras, {len(choropleth)} tracts -> "
+          f"{n_camera_tiles} camera tiles, {n_tract_tiles} tract tiles in {out_dir}")
+    print(f"Serve it with: python -m http.server -d {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
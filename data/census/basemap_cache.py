@@ -0,0 +1,315 @@
+import argparse
+import io
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import requests
+
+"""
+Local basemap tile store for the static tract and camera maps.
+
+contextily.add_basemap downloads every tile again on each render (its joblib
+cache lives in a temp folder per process). add_basemap() here draws the same
+basemap from a local tile store instead, and only goes to the network for
+tiles the store does not have yet:
+
+    fig, ax = plt.subplots()
+    tracts.to_crs(epsg=3857).plot(ax=ax, column="alpr_count")
+    add_basemap(ax)                      # same call as contextily.add_basemap
+
+The store is one SQLite file per tile provider in MBTiles layout
+(data/basemap_tiles/<provider>.mbtiles), so it can be opened by any MBTiles
+reader and preloaded from one:
+- Fetched tiles are kept up to max_mb and evicted least-recently-used first.
+  Preloaded tiles are pinned and never evicted.
+- With offline=True (or BASEMAP_OFFLINE=1) the store is opened read-only and
+  nothing is fetched; a missing tile is an error instead of a download.
+
+    python basemap_cache.py preload bay_area.mbtiles
+    python basemap_cache.py seed --shapefile ../shapefiles/San_Francisco_Census_Tracts.zip --zooms 10 14
+    python basemap_cache.py info
+"""
+
+STORE_DIR = Path(__file__).resolve().parent.parent / "basemap_tiles"
+OFFLINE_ENV = "BASEMAP_OFFLINE"
+DEFAULT_MAX_MB = 512
+USER_AGENT = "alpr-data-analysis basemap cache"
+# Tile servers such as OpenStreetMap allow at most 2 connections
+FETCH_CONNECTIONS = 2
+
+
+class OfflineTileMissing(LookupError):
+    """Raised in offline mode when a tile is not in the store."""
+
+
+def _default_source():
+    import contextily as ctx
+    return ctx.providers.OpenStreetMap.HOT
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+# === TILE STORE ===
+
+class TileStore:
+    """Tiles of one provider in an MBTiles file, with LRU eviction of fetched tiles."""
+
+    def __init__(self, path, max_mb=DEFAULT_MAX_MB, offline=None):
+        self.path = Path(path)
+        self.max_bytes = int(max_mb * 1e6)
+        self.offline = os.getenv(OFFLINE_ENV, "") not in ("", "0") if offline is None else offline
+        if self.offline:
+            if not self.path.exists():
+                raise OfflineTileMissing(f"No basemap tile store at {self.path} (offline mode)")
+            self.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Renders running in parallel processes share the file; wait for each other's writes
+            self.db = sqlite3.connect(self.path, timeout=60)
+            self._create()
+        self.hits = self.misses = 0
+
+    @classmethod
+    def for_source(cls, source, root=STORE_DIR, **kwargs):
+        return cls(Path(root) / f"{_slug(source.name)}.mbtiles", **kwargs)
+
+    def _create(self):
+        with self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS tiles (
+                    zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+                    PRIMARY KEY (zoom_level, tile_column, tile_row)
+                );
+                -- Not part of MBTiles: last use of each tile, for LRU eviction
+                CREATE TABLE IF NOT EXISTS tile_usage (
+                    zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                    last_used REAL, size INTEGER, pinned INTEGER DEFAULT 0,
+                    PRIMARY KEY (zoom_level, tile_column, tile_row)
+                );
+                CREATE INDEX IF NOT EXISTS tile_usage_lru ON tile_usage (pinned, last_used);
+            """)
+
+    @staticmethod
+    def _key(z, x, y):
+        # MBTiles rows count from the bottom (TMS), XYZ tile y from the top
+        return z, x, (1 << z) - 1 - y
+
+    def get_many(self, tiles):
+        """{(z, x, y): tile bytes} for the tiles that are in the store."""
+        found = {}
+        for z, x, y in tiles:
+            row = self.db.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                self._key(z, x, y)
+            ).fetchone()
+            if row is not None:
+                found[(z, x, y)] = row[0]
+        self.hits += len(found)
+        if found and not self.offline:
+            now = time.time()
+            with self.db:
+                self.db.executemany(
+                    "UPDATE tile_usage SET last_used=? WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                    [(now, *self._key(*tile)) for tile in found]
+                )
+        return found
+
+    def put_many(self, tiles):
+        """Store {(z, x, y): tile bytes}, then evict down to max_mb."""
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                [(*self._key(*tile), data) for tile, data in tiles.items()]
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO tile_usage VALUES (?, ?, ?, ?, ?, 0)",
+                [(*self._key(*tile), now, len(data)) for tile, data in tiles.items()]
+            )
+        self.evict()
+
+    def evict(self):
+        """Drop least-recently-used unpinned tiles until the unpinned ones fit in max_mb."""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM tile_usage WHERE pinned=0").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        victims, freed = [], 0
+        for z, x, row, size in self.db.execute(
+            "SELECT zoom_level, tile_column, tile_row, size FROM tile_usage WHERE pinned=0 ORDER BY last_used"
+        ):
+            victims.append((z, x, row))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        with self.db:
+            for table in ["tiles", "tile_usage"]:
+                self.db.executemany(
+                    f"DELETE FROM {table} WHERE zoom_level=? AND tile_column=? AND tile_row=?", victims
+                )
+        return len(victims)
+
+    def preload(self, mbtiles_path):
+        """Copy every tile of an MBTiles file into the store, pinned. Returns the number of tiles."""
+        with self.db:
+            self.db.execute("ATTACH DATABASE ? AS src", (str(mbtiles_path),))
+            try:
+                self.db.execute("INSERT OR REPLACE INTO tiles SELECT zoom_level, tile_column, tile_row, tile_data FROM src.tiles")
+                count = self.db.execute(
+                    "INSERT OR REPLACE INTO tile_usage "
+                    "SELECT zoom_level, tile_column, tile_row, ?, length(tile_data), 1 FROM src.tiles",
+                    (time.time(),)
+                ).rowcount
+                self.db.execute("INSERT OR IGNORE INTO metadata SELECT name, value FROM src.metadata")
+            finally:
+                self.db.commit()
+                self.db.execute("DETACH DATABASE src")
+        return count
+
+    def info(self):
+        rows = self.db.execute("""
+            SELECT t.zoom_level, COUNT(*), SUM(length(t.tile_data)), COALESCE(SUM(u.pinned), 0)
+            FROM tiles t LEFT JOIN tile_usage u USING (zoom_level, tile_column, tile_row)
+            GROUP BY t.zoom_level ORDER BY t.zoom_level
+        """).fetchall()
+        return [{"zoom": z, "tiles": n, "mb": round(size / 1e6, 2), "pinned": pinned} for z, n, size, pinned in rows]
+
+    def close(self):
+        self.db.close()
+
+
+# === FETCHING ===
+
+def _download(url):
+    response = requests.get(url, headers={"user-agent": USER_AGENT}, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+def fetch_tiles(store, source, tiles, connections=FETCH_CONNECTIONS):
+    """{(z, x, y): tile bytes} for all tiles, downloading (and storing) only the missing ones."""
+    tiles = list(tiles)
+    found = store.get_many(tiles)
+    missing = [tile for tile in tiles if tile not in found]
+    if not missing:
+        return found
+    if store.offline:
+        raise OfflineTileMissing(
+            f"{len(missing)} of {len(tiles)} basemap tiles are not in {store.path} (offline mode), "
+            f"e.g. z/x/y {'/'.join(map(str, missing[0]))}"
+        )
+    urls = [source.build_url(x=x, y=y, z=z) for z, x, y in missing]
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        fetched = dict(zip(missing, pool.map(_download, urls)))
+    store.misses += len(fetched)
+    store.put_many(fetched)
+    return {**found, **fetched}
+
+
+# === BASEMAP ===
+
+def auto_zoom(w, s, e, n):
+    """Same zoom contextily picks for a lon/lat box."""
+    zoom_lon = np.ceil(np.log2(360 * 2.0 / (e - w)))
+    zoom_lat = np.ceil(np.log2(360 * 2.0 / (n - s)))
+    return int(min(zoom_lon, zoom_lat))
+
+
+def bounds2img(w, s, e, n, zoom="auto", source=None, store=None):
+    """Mosaic of the tiles covering a lon/lat box, and its Web Mercator extent (left, right, bottom, top)."""
+    import mercantile
+    from PIL import Image
+
+    source = source or _default_source()
+    store = store or TileStore.for_source(source)
+    if zoom == "auto":
+        zoom = auto_zoom(w, s, e, n)
+    zoom = int(np.clip(zoom, source.get("min_zoom", 0), source.get("max_zoom", 22)))
+
+    tiles = [(t.z, t.x, t.y) for t in mercantile.tiles(w, s, e, n, [zoom])]
+    data = fetch_tiles(store, source, tiles)
+
+    xs = sorted({x for _, x, _ in tiles})
+    ys = sorted({y for _, _, y in tiles})
+    mosaic = None
+    for (z, x, y), blob in data.items():
+        tile = np.asarray(Image.open(io.BytesIO(blob)).convert("RGBA"))
+        if mosaic is None:
+            size = tile.shape[0]
+            mosaic = np.zeros((len(ys) * size, len(xs) * size, 4), dtype=np.uint8)
+        row, col = ys.index(y) * size, xs.index(x) * size
+        mosaic[row:row + size, col:col + size] = tile
+
+    left, top = mercantile.xy(*mercantile.ul(xs[0], ys[0], zoom))
+    right, bottom = mercantile.xy(*mercantile.ul(xs[-1] + 1, ys[-1] + 1, zoom))
+    return mosaic, (left, right, bottom, top)
+
+
+def add_basemap(ax, zoom="auto", source=None, store=None, attribution=None, **imshow_kwargs):
+    """Draw a basemap under an Axes whose data is in Web Mercator (EPSG:3857), from the local store."""
+    import contextily as ctx
+    import mercantile
+
+    source = source or _default_source()
+    xmin, xmax, ymin, ymax = ax.axis()
+    w, s = mercantile.lnglat(xmin, ymin)
+    e, n = mercantile.lnglat(xmax, ymax)
+    img, extent = bounds2img(w, s, e, n, zoom=zoom, source=source, store=store)
+    ax.imshow(img, extent=extent, interpolation=imshow_kwargs.pop("interpolation", "bilinear"),
+              zorder=imshow_kwargs.pop("zorder", 0), **imshow_kwargs)
+    ax.axis((xmin, xmax, ymin, ymax))
+    ctx.add_attribution(ax, attribution if attribution is not None else source.get("attribution", ""))
+    return ax
+
+
+# === MAIN ===
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local basemap tile store.")
+    parser.add_argument("--provider", default="OpenStreetMap.HOT", help="contextily provider, e.g. CartoDB.Positron")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB, help="size limit for fetched tiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    preload = commands.add_parser("preload", help="copy an MBTiles file into the store (pinned)")
+    preload.add_argument("mbtiles")
+    seed = commands.add_parser("seed", help="download the tiles covering a shapefile or box ahead of time")
+    seed.add_argument("--shapefile")
+    seed.add_argument("--bounds", type=float, nargs=4, metavar=("W", "S", "E", "N"))
+    seed.add_argument("--zooms", type=int, nargs=2, default=[10, 14], metavar=("MIN", "MAX"))
+    commands.add_parser("info", help="tiles per zoom level")
+    args = parser.parse_args(argv)
+
+    import contextily as ctx
+    source = ctx.providers.query_name(args.provider)
+    store = TileStore.for_source(source, max_mb=args.max_mb, offline=args.command == "info" or None)
+
+    if args.command == "preload":
+        print(f"Preloaded {store.preload(args.mbtiles):,} tiles into {store.path}")
+    elif args.command == "seed":
+        import mercantile
+        if args.shapefile:
+            import geopandas as gpd
+            w, s, e, n = gpd.read_file(args.shapefile).to_crs("EPSG:4326").total_bounds
+        elif args.bounds:
+            w, s, e, n = args.bounds
+        else:
+            parser.error("seed needs --shapefile or --bounds")
+        for zoom in range(args.zooms[0], args.zooms[1] + 1):
+            tiles = [(t.z, t.x, t.y) for t in mercantile.tiles(w, s, e, n, [zoom])]
+            fetch_tiles(store, source, tiles)
+            print(f"zoom {zoom}: {len(tiles)} tiles")
+        print(f"{store.misses} downloaded, {store.hits} already in {store.path}")
+    else:
+        for row in store.info():
+            print(f"zoom {row['zoom']:2d}: {row['tiles']:6,} tiles, {row['mb']:8.2f} MB, {row['pinned']:6,} pinned")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
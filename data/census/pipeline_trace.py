@@ -0,0 +1,130 @@
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+"""
+Stage tracing for the tract pipeline (alpr_demographics_by_tract.main).
+
+Each stage of a run is wrapped in `with trace.stage(name, county=...) as span:`
+and becomes one record with its wall time, memory, row counts and cache hits:
+
+    with trace.stage("spatial_join", county="San_Francisco", rows_in=len(alpr_df)) as span:
+        result = process_alpr_data(alpr_df, census_gdf, census_income_df)
+        span["rows_out"] = len(result)
+
+Memory is the stage's peak RSS minus the RSS it started with. On Linux the
+kernel's peak counter is reset at the start of every stage, so the peak is the
+stage's own; elsewhere only the process-wide peak is available, and a stage
+shows growth only when it pushes that peak higher.
+
+At the end, write() saves the records as a JSON trace and summary() gives one
+row per stage (totals over counties) to print. Records from worker processes
+(the statewide run) can be added to the parent's trace with
+trace.records.extend(...); their stages overlap in time, so the shares of the
+run's wall time can add up to more than 100%.
+"""
+
+
+def _status_kb(field):
+    """A field of /proc/self/status in kB (Linux), or None."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter for this process; False where not supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rss_mb():
+    kb = _status_kb("VmRSS")
+    if kb is not None:
+        return kb / 1e3
+    return _max_rss_mb()
+
+
+def _max_rss_mb():
+    kb = _status_kb("VmHWM")
+    if kb is not None:
+        return kb / 1e3
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+class PipelineTrace:
+    """Stage records of one pipeline run."""
+
+    def __init__(self, name="alpr_demographics_by_tract"):
+        self.start = time.perf_counter()
+        self.meta = {"pipeline": name, "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid()}
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, county=None, rows_in=None):
+        """Time a stage; the yielded dict takes rows_out, cache_hits and cache_misses."""
+        span = {
+            "stage": name,
+            "county": county,
+            "rows_in": rows_in,
+            "rows_out": None,
+            "cache_hits": 0,
+            "cache_misses": 0,
+        }
+        rss_before = _rss_mb()
+        _reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield span
+            span["status"] = "ok"
+        except Exception as e:
+            span["status"] = f"error: {type(e).__name__}: {e}"
+            raise
+        finally:
+            span["seconds"] = round(time.perf_counter() - start, 4)
+            span["peak_rss_delta_mb"] = round(max(_max_rss_mb() - rss_before, 0.0), 2)
+            span["rss_after_mb"] = round(_rss_mb(), 2)
+            self.records.append(span)
+
+    def summary(self):
+        """One row per stage: counties traced, total/max seconds, max memory delta, rows and cache hits."""
+        if not self.records:
+            return pd.DataFrame()
+        df = pd.DataFrame(self.records).astype({"rows_in": "Int64", "rows_out": "Int64"})
+        summary = df.groupby("stage", sort=False).agg(
+            runs=("stage", "size"),
+            seconds=("seconds", "sum"),
+            max_seconds=("seconds", "max"),
+            peak_rss_delta_mb=("peak_rss_delta_mb", "max"),
+            rows_in=("rows_in", "sum"),
+            rows_out=("rows_out", "sum"),
+            cache_hits=("cache_hits", "sum"),
+            cache_misses=("cache_misses", "sum"),
+        )
+        total = time.perf_counter() - self.start
+        summary["share"] = (summary["seconds"] / total * 100).round(1).astype(str) + "%"
+        return summary.round(3)
+
+    def to_dict(self):
+        return {**self.meta, "total_seconds": round(time.perf_counter() - self.start, 4), "stages": self.records}
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
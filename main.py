@@ -4,31 +4,22 @@ import json
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
-import os
-from census import Census
-
-# Load API Key
-CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
-
-# Validate API key
-if not CENSUS_API_KEY:
-    raise ValueError("Census API key is missing! Set it as an environment variable.")
-
-c = Census(CENSUS_API_KEY)
+from api_endpoints import get_census_client, overpass_url
+from tract_schema import census_frame, conform, to_csv, tract_geoids
 
 
 def fetch_census_income():
     """Fetch median income data for SF Census Tracts from the Census API."""
     tracts = "*"  # Get all tracts
     try:
-        data = c.acs5.state_county_tract(
+        data = get_census_client().acs5.state_county_tract(
             fields=["B19013_001E"],  # Median household income
             state_fips="06",  # California
             county_fips="075",  # San Francisco
             tract=tracts,
             year=2021
         )
-        return pd.DataFrame(data).rename(columns={"B19013_001E": "median_income"})
+        return census_frame(pd.DataFrame(data).rename(columns={"B19013_001E": "median_income"}))
     except Exception as e:
         print(f"Error fetching Census data: {e}")
         return pd.DataFrame()
@@ -42,8 +33,7 @@ def fetch_alpr_locations():
     out body;
     """
     
-    overpass_url = "http://overpass-api.de/api/interpreter"
-    response = requests.get(overpass_url, params={"data": query})
+    response = requests.get(overpass_url(), params={"data": query})
     
     if response.status_code != 200:
         print(f"Overpass API request failed: {response.status_code}")
@@ -81,23 +71,19 @@ def process_alpr_data(alpr_df, census_gdf, census_income_df):
         crs="EPSG:4326"
     )
 
-    # Spatial join: Assign each ALPR camera to a Census Tract
-    alpr_with_tracts = gpd.sjoin(alpr_gdf, census_gdf, how="left", predicate="within")
-    alpr_with_tracts = alpr_with_tracts.rename(columns={"tractce": "tract"})
+    # Spatial join: Assign each ALPR camera to a Census Tract (cameras outside every tract are dropped)
+    alpr_with_tracts = gpd.sjoin(alpr_gdf, census_gdf, how="inner", predicate="within")
 
-    # Ensure tract column matches Census income data format
-    alpr_with_tracts["tract"] = alpr_with_tracts["tract"].astype(str).str.zfill(6)
+    # Integer tract GEOIDs, the join key of the Census data
+    geoids = tract_geoids(alpr_with_tracts, state="06", county="075")
 
     # Count ALPR cameras per Census Tract
-    alpr_counts = (
-        alpr_with_tracts.groupby("tract").size()
-        .reset_index(name="num_alpr_cameras")
-    )
+    alpr_counts = geoids.value_counts(sort=False).rename_axis("GEOID").reset_index(name="num_alpr_cameras")
 
     # Merge ALPR camera counts with Census income data
-    merged_df = pd.merge(alpr_counts, census_income_df, on="tract", how="left")
+    merged_df = pd.merge(alpr_counts, census_income_df, on="GEOID", how="left")
 
-    return merged_df
+    return conform(merged_df)
 
 
 def main():
@@ -124,7 +110,7 @@ def main():
     result_df = process_alpr_data(alpr_df, census_gdf, census_income_df)
 
     # Save results
-    result_df.to_csv("alpr_by_income.csv", index=False)
+    to_csv(result_df, "alpr_by_income.csv")
     print("Analysis complete! Results saved to 'alpr_by_income.csv'.")
 
     # Display results
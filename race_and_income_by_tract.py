@@ -11,16 +11,11 @@ Specifically, it:
 Useful for analyzing spatial patterns of racial demographics and income.
 """
 
-from census import Census
+from api_endpoints import get_census_client
 import pandas as pd
-import os
-
-# Load Census API key from environment
-CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
-c = Census(CENSUS_API_KEY)
 
 def fetch_race_income_data(state_fips, county_fips, county_name):
-    data = c.acs5.state_county_tract(
+    data = get_census_client().acs5.state_county_tract(
         fields=[
             "B03002_001E",  # Total Population
             "B03002_003E",  # White (Non-Hispanic)
@@ -59,7 +54,12 @@ def fetch_race_income_data(state_fips, county_fips, county_name):
 
     return df
 
-# Run for each county
-sf_df = fetch_race_income_data("06", "075", "San Francisco")
-alameda_df = fetch_race_income_data("06", "001", "Alameda")
-san_mateo_df = fetch_race_income_data("06", "081", "San Mateo")
+COUNTIES = [("06", "075", "San Francisco"), ("06", "001", "Alameda"), ("06", "081", "San Mateo")]
+
+def main():
+    # Run for each county
+    for state_fips, county_fips, county_name in COUNTIES:
+        fetch_race_income_data(state_fips, county_fips, county_name)
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,14 @@ import json
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
-import os
-from census import Census
+from api_endpoints import get_census_client, overpass_url
 
-# Load API Key
-CENSUS_API_KEY = os.getenv("CENSUS_API_KEY")
-
-# Validate API key
-if not CENSUS_API_KEY:
-    raise ValueError("Census API key is missing! Set it as an environment variable.")
-
-c = Census(CENSUS_API_KEY)
 
 
 def fetch_census_race_data():
     """Fetch racial demographics for Census Tracts in Santa Clara County."""
     try:
-        data = c.acs5.state_county_tract(
+        data = get_census_client().acs5.state_county_tract(
             fields=[
                 "B02001_001E",  # Total Population
                 "B02001_002E",  # White
@@ -73,8 +64,7 @@ def fetch_alpr_locations_sj():
     out body;
     """
     
-    overpass_url = "http://overpass-api.de/api/interpreter"
-    response = requests.get(overpass_url, params={"data": query})
+    response = requests.get(overpass_url(), params={"data": query})
     
     if response.status_code != 200:
         print(f"Overpass API request failed: {response.status_code}")
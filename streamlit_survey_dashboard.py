@@ -1,68 +1,67 @@
 # run this app locally by running this in your terminal:
 # streamlit run streamlit_survey_dashboard.py
+import uuid
+from collections import deque
 import pandas as pd
 import numpy as np
 import streamlit as st
 import altair as alt
+from city_presets import load_city_zip_map
+from dashboard_columns import ColumnStore, ZIP_FALLBACK_COL, ZIP_NORM_COL, prepare_columnar
+from dashboard_counts import CountStore
+from dashboard_downloads import FORMATS, deferred_export, file_name, mime_type
+from dashboard_geometry import geometry_url, level_for_height, load_manifest
+from dashboard_index import RowIndex
+from dashboard_timing import MAX_RECORDS, RerunTimer, cache_summary, note_miss, stage_summary, to_jsonl
 
 st.set_page_config(page_title="ALPR Survey Explorer", layout="wide")
+
+# ---------- Diagnostics ----------
+# One timer per rerun; the last MAX_RECORDS records are kept per session (see the Diagnostics panel)
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+    st.session_state.timings = deque(maxlen=MAX_RECORDS)
+    st.session_state.reruns = 0
+timer = RerunTimer(st.session_state.session_id, st.session_state.reruns)
+st.session_state.reruns += 1
+
 # ---------- Load data ----------
 CSV_PATH = "ALPR General Survey Results v2.csv"  # change if needed
-@st.cache_data
+@st.cache_resource
 def load_data(path):
-    df = pd.read_csv(path)
-    # Standardize column names (strip whitespace)
-    df.columns = [c.strip() for c in df.columns]
-    # Add a canonical ZIP column alias
-    zip_col_candidates = [
-        "What is your ZIP code? (7bepp7b)",
-        "ZIP",
-        "Zip",
-        "Zip Code",
-        "ZIP Code",
-    ]
-    zip_col = next((c for c in zip_col_candidates if c in df.columns), None)
-    if zip_col is None:
-        st.warning("ZIP column not found. Expected 'What is your ZIP code? (7bepp7b)'.")
-        # Create an empty placeholder to avoid downstream errors
-        df["_ZIP_FALLBACK_"] = np.nan
-        zip_col = "_ZIP_FALLBACK_"
-    # Normalize ZIP values as strings, keep original for display if needed
-    df["_ZIP_NORM_"] = (
-        df[zip_col]
-        .astype(str)
-        .str.strip()
-        .str.replace(r"[^0-9A-Za-z\- ]", "", regex=True)
-        .replace({"nan": np.nan})
-    )
-    return df, zip_col
+    """Memory-mapped survey table, opened once per process and shared read-only by all sessions."""
+    note_miss("load_data")
+    return ColumnStore(prepare_columnar(path))
 
-df, real_zip_col = load_data(CSV_PATH)
+with timer.stage("load_data"):
+    store = timer.cached("load_data", load_data, CSV_PATH)
+real_zip_col = store.zip_col
+if real_zip_col == ZIP_FALLBACK_COL:
+    st.warning("ZIP column not found. Expected 'What is your ZIP code? (7bepp7b)'.")
 
 st.title("ALPR Survey Explorer")
-st.caption("Filter by **City (Oakland preset)** or **ZIP code**, then visualize responses for any question.")
+st.caption("Filter by **City** or **ZIP code**, then visualize responses for any question.")
 
-# ---------- Define city ZIP presets ----------
-OAKLAND_ZIPS = [
-    "94552", "94546", "94605", "94621", "94619" ,"94577", "94501", 
-    "94607", "94578", "94602", "94516", "94705", "94708", "94611",
-    "94580", "94601", "94579", "94608", "94603", "94502", "94618"
-]
+# ---------- City ZIP presets ----------
+@st.cache_resource
+def load_city_presets():
+    """City -> ZIPs, derived offline from ZIP and city polygons (see city_presets.py)."""
+    note_miss("load_city_presets")
+    return {city: set(zips) for city, zips in load_city_zip_map().items()}
 
-CITY_ZIP_MAP = {
-    "Oakland": set(z.strip() for z in OAKLAND_ZIPS)
-}
+with timer.stage("load_city_presets"):
+    CITY_ZIP_MAP = timer.cached("load_city_presets", load_city_presets)
 
 # ---------- Helper: question columns ----------
 def guess_question_columns(all_cols):
-    excluded = {real_zip_col, "_ZIP_NORM_"}
+    excluded = {real_zip_col, ZIP_NORM_COL}
     q_cols = [c for c in all_cols if c not in excluded and ("?" in c)]
     if not q_cols:
-        q_cols = [c for c in all_cols if c not in excluded and df[c].dtype == "object"]
+        q_cols = [c for c in all_cols if c not in excluded and store.is_text(c)]
     return q_cols
 
 
-question_cols = guess_question_columns(df.columns)
+question_cols = guess_question_columns(store.columns)
 if not question_cols:
     st.error("No likely question columns found. Please verify your CSV.")
     st.stop()
@@ -80,14 +79,25 @@ question_cols.extend([
 
 question_cols.remove('testing question? (8vufenf)')
 
+# ---------- Pre-aggregated counts ----------
+@st.cache_resource
+def load_count_store(path):
+    """Answer counts per question x ZIP, counted on first use and shared by all sessions."""
+    note_miss("load_count_store")
+    column_store = load_data(path)
+    return CountStore(column_store.zip_values, column_loader=column_store.column)
+
+with timer.stage("load_count_store"):
+    count_store = timer.cached("load_count_store", load_count_store, CSV_PATH)
+
 # ---------- Sidebar ----------
 with st.sidebar:
     st.header("Filters")
-    city_choice = st.selectbox("City preset", ["All cities"] + list(CITY_ZIP_MAP.keys()))
+    city_choice = st.selectbox("City preset", ["All cities"] + sorted(CITY_ZIP_MAP))
 
     # Base ZIP options given city choice
     if city_choice == "All cities":
-        allowed_zips = sorted([z for z in df["_ZIP_NORM_"].dropna().unique().tolist() if z != ""],
+        allowed_zips = sorted([z for z in store.zip_values.dropna().unique().tolist() if z != ""],
                               key=lambda x: (len(str(x)), str(x)))
     else:
         allowed_zips = sorted(CITY_ZIP_MAP[city_choice])
@@ -104,35 +114,36 @@ with st.sidebar:
     top_n = st.slider("Limit to top N responses (0 = show all)", min_value=0, max_value=50, value=0, step=1)
 
 # ---------- Apply filters ----------
-filtered = df.copy()
+@st.cache_resource
+def load_row_index(path):
+    """Row positions per ZIP and city preset, built once per process and shared by all sessions."""
+    note_miss("load_row_index")
+    return RowIndex(load_data(path).zip_values, load_city_presets())
 
-if city_choice != "All cities":
-    filtered = filtered[filtered["_ZIP_NORM_"].isin(CITY_ZIP_MAP[city_choice])]
+with timer.stage("load_row_index"):
+    row_index = timer.cached("load_row_index", load_row_index, CSV_PATH)
+city_filter = None if city_choice == "All cities" else city_choice
+zip_filter = None if selected_zip == "All ZIP codes" else selected_zip
+with timer.stage("filter"):
+    filtered_rows = row_index.rows(city_filter, zip_filter)
 
-if selected_zip != "All ZIP codes":
-    filtered = filtered[filtered["_ZIP_NORM_"] == selected_zip]
-
-if filtered.empty:
+if filtered_rows is not None and len(filtered_rows) == 0:
     st.warning("No rows match the current City/ZIP filter. Try expanding your filters.")
 
 # ---------- Question selection ----------
 question = st.selectbox("Select question", question_cols)
 
 # ---------- Prepare counts ----------
-series = filtered[question].dropna().astype(str).str.strip()
-
-if split_multi:
-    split_seps = r";|\||,"
-    exploded = (
-        series.str.split(split_seps)
-        .explode()
-        .str.strip()
-        .replace("", np.nan)
-        .dropna()
-    )
-    counts = exploded.value_counts(dropna=False)
+# Summed from the pre-aggregated ZIP counts instead of re-splitting the rows
+if selected_zip != "All ZIP codes":
+    selected_zips = [selected_zip]
+elif city_choice != "All cities":
+    selected_zips = CITY_ZIP_MAP[city_choice]
 else:
-    counts = series.value_counts(dropna=False)
+    selected_zips = None
+
+with timer.stage("counts"):
+    counts = count_store.counts(question, selected_zips, split=split_multi)
 
 if top_n and top_n > 0:
     counts = counts.head(top_n)
@@ -162,52 +173,149 @@ data = pd.DataFrame({
     "Percent": pct.values
 })
 
+chart_tab, map_tab, compare_tab = st.tabs(["Chart", "Map (San Francisco ZIPs)", "Compare"])
+
 y_field = "Percent" if show_pct else "Count"
 title_suffix = " (%)" if show_pct else " (count)"
-chart = (
-    alt.Chart(data)
-    .mark_bar()
-    .encode(
-        x=alt.X("Response:N", sort=list(data["Response"])),
-        y=alt.Y(f"{y_field}:Q"),
-        tooltip=["Response:N", "Count:Q", "Percent:Q"]
+with chart_tab, timer.stage("render"):
+    chart = (
+        alt.Chart(data)
+        .mark_bar()
+        .encode(
+            x=alt.X("Response:N", sort=list(data["Response"])),
+            y=alt.Y(f"{y_field}:Q"),
+            tooltip=["Response:N", "Count:Q", "Percent:Q"]
+        )
+        .properties(height=420, title=f"{question}{title_suffix}")
     )
-    .properties(height=420, title=f"{question}{title_suffix}")
-)
-st.altair_chart(chart, use_container_width=True)
+    st.altair_chart(chart, use_container_width=True)
+
+# ---------- Map ----------
+MAP_HEIGHTS = {"Small": 300, "Medium": 550, "Large": 850}
+
+@st.cache_data
+def load_geometry_manifest():
+    note_miss("load_geometry_manifest")
+    return load_manifest()
+
+with map_tab:
+    manifest = timer.cached("load_geometry_manifest", load_geometry_manifest)
+    with timer.stage("counts"):
+        all_answers = count_store.counts(question, split=split_multi).index.astype(str).tolist()
+    if manifest is None:
+        st.info("Map geometry not built yet. Run `python dashboard_geometry.py` once.")
+    elif not all_answers:
+        st.info("This question has no answers to map.")
+    else:
+        m1, m2 = st.columns([3, 1])
+        with m1:
+            map_answer = st.selectbox("Answer to map", all_answers,
+                                      help="Each ZIP is colored by the share of its answers that are this one.")
+        with m2:
+            map_size = st.select_slider("Map size", list(MAP_HEIGHTS), value="Medium")
+        map_height = MAP_HEIGHTS[map_size]
+        # Bigger map -> finer geometry; the file itself is fetched once and cached by the browser
+        level = level_for_height(manifest, map_height)
+        with timer.stage("counts"):
+            shares = count_store.zip_shares(question, map_answer, split=split_multi)
+
+        zip_map = (
+            alt.Chart(alt.Data(url=geometry_url(manifest, level), format=alt.DataFormat(property="features")))
+            .mark_geoshape(stroke="white", strokeWidth=0.5)
+            .transform_lookup(
+                lookup="properties.zip",
+                from_=alt.LookupData(shares, "zip", ["share", "count", "answered"])
+            )
+            .encode(
+                color=alt.condition(
+                    "isValid(datum.share)",
+                    alt.Color("share:Q", title="% of answers", scale=alt.Scale(scheme="blues")),
+                    alt.value("lightgray")
+                ),
+                tooltip=[
+                    alt.Tooltip("properties.zip:N", title="ZIP"),
+                    alt.Tooltip("share:Q", title="% of answers"),
+                    alt.Tooltip("count:Q", title="Count"),
+                    alt.Tooltip("answered:Q", title="Answers"),
+                ]
+            )
+            .project("mercator")
+            .properties(height=map_height, title=f"{map_answer} — share of answers by ZIP")
+        )
+        with timer.stage("render"):
+            st.altair_chart(zip_map, use_container_width=True)
+        st.caption(f"Gray ZIPs have no responses. Geometry detail: {level}.")
+
+# ---------- Compare ----------
+with compare_tab:
+    compare_zips = sorted((z for z in count_store.zip_keys if z != ""), key=lambda x: (len(str(x)), str(x)))
+    compare_options = sorted(CITY_ZIP_MAP) + [f"ZIP {z}" for z in compare_zips]
+    default_compare = [c for c in ["Oakland", "San Francisco"] if c in CITY_ZIP_MAP]
+    compared = st.multiselect("Compare cities / ZIP codes", compare_options, default=default_compare,
+                              help="Every selection is computed in the same pass, so adding more is cheap.")
+    if compared:
+        groups = {
+            label: [label[len("ZIP "):]] if label.startswith("ZIP ") else CITY_ZIP_MAP[label]
+            for label in compared
+        }
+        with timer.stage("counts"):
+            comparison = count_store.group_counts(question, groups, split=split_multi)
+        response_order = (
+            comparison.groupby("Response")["Count"].sum().sort_values(ascending=False).index.tolist()
+        )
+        if top_n and top_n > 0:
+            response_order = response_order[:top_n]
+            comparison = comparison[comparison["Response"].isin(response_order)]
+        compare_chart = (
+            alt.Chart(comparison)
+            .mark_bar()
+            .encode(
+                x=alt.X("Response:N", sort=response_order),
+                y=alt.Y("Percent:Q", title="% of answers"),
+                color=alt.Color("Group:N", legend=None),
+                tooltip=["Group:N", "Response:N", "Count:Q", "Percent:Q"]
+            )
+            .properties(height=260, width=260)
+            .facet(facet=alt.Facet("Group:N", sort=compared, title=None), columns=3)
+            .properties(title=f"{question} (% of each group's answers)")
+        )
+        with timer.stage("render"):
+            st.altair_chart(compare_chart)
+    else:
+        st.info("Pick at least one city or ZIP code to compare.")
 
 # ---------- Table & downloads ----------
 st.markdown("#### Data table")
 st.dataframe(data, use_container_width=True, hide_index=True)
 
-@st.cache_data
-def to_csv_bytes(df_in: pd.DataFrame) -> bytes:
-    return df_in.to_csv(index=False).encode("utf-8")
+# Exports are built only when a button is clicked, streamed into a temporary file
+download_format = st.radio("Download format", list(FORMATS), horizontal=True)
+
+cols = [question]
+if real_zip_col in store.columns:
+    cols.append(real_zip_col)
 
 c1, c2, c3 = st.columns(3)
 with c1:
     st.download_button(
-        "Download counts (CSV)",
-        data=to_csv_bytes(data),
-        file_name="counts.csv",
-        mime="text/csv"
+        f"Download counts ({download_format})",
+        data=deferred_export(lambda: data, download_format),
+        file_name=file_name("counts", download_format),
+        mime=mime_type(download_format)
     )
 with c2:
-    cols = [question]
-    if real_zip_col in filtered.columns:
-        cols.append(real_zip_col)
     st.download_button(
-        "Download filtered rows (CSV)",
-        data=to_csv_bytes(filtered[cols]),
-        file_name="filtered_rows.csv",
-        mime="text/csv"
+        f"Download filtered rows ({download_format})",
+        data=deferred_export(lambda: store.select(cols, filtered_rows), download_format),
+        file_name=file_name("filtered_rows", download_format),
+        mime=mime_type(download_format)
     )
 with c3:
     st.download_button(
-        "Download full filtered dataset (CSV)",
-        data=to_csv_bytes(filtered),
-        file_name="filtered_dataset.csv",
-        mime="text/csv"
+        f"Download full filtered dataset ({download_format})",
+        data=deferred_export(lambda: store.select(rows=filtered_rows), download_format),
+        file_name=file_name("filtered_dataset", download_format),
+        mime=mime_type(download_format)
     )
 
 with st.expander("Notes & Tips"):
@@ -215,5 +323,30 @@ with st.expander("Notes & Tips"):
         f"""
 - **Filter precedence:** *City* filters the dataset first. *ZIP* (if chosen) further narrows within that city.
 - **Multi-select answers:** Enable *Split multi-select answers* to count each selected option separately.
+- **Compare:** Shows the same question side by side for any set of cities and ZIPs, as percentages.
+- **Map:** Colors every San Francisco ZIP by one answer's share, regardless of the City/ZIP filter.
 """
     )
+
+# ---------- Diagnostics panel ----------
+st.session_state.timings.append(timer.finish())
+with st.expander("Diagnostics"):
+    records = list(st.session_state.timings)
+    record = records[-1]
+    st.caption(
+        f"Session {record['session']} · rerun {record['rerun']} · {record['total_ms']:.1f} ms total. "
+        "Render time is the server-side chart serialization, not the browser's drawing time."
+    )
+    d1, d2 = st.columns(2)
+    with d1:
+        st.markdown(f"**Stage timings, last {len(records)} reruns (ms)**")
+        st.dataframe(stage_summary(records), use_container_width=True)
+    with d2:
+        st.markdown(f"**Cache hits / misses, last {len(records)} reruns**")
+        st.dataframe(cache_summary(records), use_container_width=True)
+    st.download_button(
+        "Download session timings (JSON lines)",
+        data=lambda: to_jsonl(records),
+        file_name=f"timings_{record['session']}.jsonl",
+        mime="application/x-ndjson"
+    )
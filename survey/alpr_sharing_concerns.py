@@ -1,13 +1,17 @@
 from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
-import textwrap
-import numpy as np
+from crosstab_cube import CrosstabCube
+from raking import survey_weights
+from chart_templates import FigurePool, grouped_bar, wrap_title
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
 df = pd.read_csv(file_path)
 
+# Set to True to weight respondents to the census race/income marginals
+WEIGHTED = False
+weights = survey_weights(df) if WEIGHTED else None
+
 # Map long column names to descriptive short names
 rename_map = {
     "In some Bay Area cities, Automatic License Plate Reader (ALPR) cameras store an image of your license plate, vehicle make and model, and location in a searchable database for up to 12 months every time you drive past one. Before today, how aware were you of that fact? (6s6r3ex)": "ALPR_storage_12mo",
@@ -36,8 +40,10 @@ def recode_awareness(val):
     else:
         return None
 
+# Count every awareness x support combination in one pass
+cube = CrosstabCube.from_frame(df, awareness_cols + support_cols, weights=weights)
 for col in awareness_cols:
-    df[col + "_num"] = df[col].apply(recode_awareness)
+    cube = cube.relabel(col, recode_awareness)
 
 # Recode support
 def recode_support(val):
@@ -60,9 +66,6 @@ def recode_support(val):
         except:
             return None
 
-for col in support_cols:
-    df[col + "_num"] = df[col].apply(recode_support)
-
 # X-axis labels and all possible levels
 all_levels = [0, 1, 2]
 labels_map = {0: "Not aware", 1: "Somewhat aware", 2: "Very aware"}
@@ -79,29 +82,21 @@ title_map = {
 output_dir = Path(__file__).parent / "plots"
 output_dir.mkdir(exist_ok=True)
 
-# Plot support by awareness and save each plot
+# Plot support by awareness and save each plot (one reused figure for all of them)
+pool = FigurePool()
 for aware_col in awareness_cols:
-    grouped = df.groupby(aware_col + "_num")[[c + "_num" for c in support_cols]].mean()
-    
+    grouped = cube.grouped_means(support_cols, by=aware_col, scores=recode_support)
+
     # Reindex to include all levels even if missing
     grouped = grouped.reindex(all_levels)
-    
-    x = np.array(all_levels)
-    width = 0.35
-
-    plt.figure(figsize=(8,5))
-    plt.bar(x - width/2, grouped["support_govt_num"], width, label="Govt ALPR Support", color='skyblue')
-    plt.bar(x + width/2, grouped["support_private_num"], width, label="Private ALPR Support", color='salmon')
 
-    plt.xticks(x, labels_all)
-    plt.ylabel("Average Support (0=Strongly Oppose, 4=Strongly Support)")
-    plt.title("\n".join(textwrap.wrap(f"Support by awareness: {title_map[aware_col]}", 60)))
-    plt.legend()
-    plt.tight_layout()
+    ax = pool.axes(figsize=(8,5))
+    grouped_bar(ax, grouped[support_cols], labels_all, ["Govt ALPR Support", "Private ALPR Support"],
+                colors=['skyblue', 'salmon'])
+    ax.set_ylabel("Average Support (0=Strongly Oppose, 4=Strongly Support)")
+    ax.set_title(wrap_title(f"Support by awareness: {title_map[aware_col]}", 60))
 
     # Save the figure
-    filename = output_dir / f"{aware_col}_support.png"
-    plt.savefig(filename)
-    plt.close()
+    pool.save(ax, output_dir / f"{aware_col}_support.png")
 
 print(f"Plots saved in folder: {output_dir}")
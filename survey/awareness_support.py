@@ -2,11 +2,18 @@ from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
 import textwrap
+from crosstab_cube import CrosstabCube
+from raking import survey_weights
+from bootstrap import bootstrap_group_means, error_bars, recode_column
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
 df = pd.read_csv(file_path)
 
+# Set to True to weight respondents to the census race/income marginals
+WEIGHTED = False
+weights = survey_weights(df) if WEIGHTED else None
+
 # Awareness columns (ALPR facts)
 awareness_cols = [
     "In some Bay Area cities, Automatic License Plate Reader (ALPR) cameras store an image of your license plate, vehicle make and model, and location in a searchable database for up to 12 months every time you drive past one. Before today, how aware were you of that fact? (6s6r3ex)",
@@ -34,8 +41,10 @@ def recode_awareness(val):
     else:
         return None
 
+# Count every awareness x support combination in one pass
+cube = CrosstabCube.from_frame(df, awareness_cols + support_cols, weights=weights)
 for col in awareness_cols:
-    df[col + "_num"] = df[col].apply(recode_awareness)
+    cube = cube.relabel(col, recode_awareness)
 
 # Recode support to numeric if needed
 def recode_support(val):
@@ -58,19 +67,21 @@ def recode_support(val):
         except:
             return None
 
-for col in support_cols:
-    df[col + "_num"] = df[col].apply(recode_support)
+# Support scores per respondent, for the bootstrap confidence intervals
+scores = pd.concat([recode_column(df[c], recode_support) for c in support_cols], axis=1)
 
 # Calculate average support by awareness for each awareness column
 for aware_col in awareness_cols:
+    ci = bootstrap_group_means(recode_column(df[aware_col], recode_awareness), scores, weights=weights)
     for support_col in support_cols:
-        grouped = df.groupby(aware_col + "_num")[support_col + "_num"].mean()
+        grouped = cube.grouped_mean(support_col, by=aware_col, scores=recode_support)
 
         # Wrap the long title
         wrapped_title = "\n".join(textwrap.wrap(f"{support_col} by awareness of ALPR fact", 50))
 
         # Plot
-        grouped.plot(kind='bar', figsize=(6,4), title=wrapped_title)
+        grouped.plot(kind='bar', figsize=(6,4), title=wrapped_title,
+                     yerr=error_bars(ci, support_col, grouped.index), capsize=4)
         plt.xlabel("Awareness Level (0=Not aware, 2=Very aware)")
         plt.ylabel("Average Support")
         plt.tight_layout()
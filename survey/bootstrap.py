@@ -0,0 +1,131 @@
+"""
+Vectorized bootstrap confidence intervals for grouped survey means.
+
+Resamples are drawn as a (replicates x respondents) index matrix per batch, and
+the means of every group and every value column of all replicates in the batch
+come out of a single weighted bincount. Batches are spread over a process pool,
+so 10,000 replicates for a chart take seconds.
+
+Example:
+    groups = recode_column(df[frequency_col], recode_frequency)
+    values = pd.concat([recode_column(df[c], recode_support) for c in support_cols], axis=1)
+    ci = bootstrap_group_means(groups, values)
+    ci.mean, ci.lower, ci.upper      # DataFrames: groups x value columns
+"""
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Cap on (replicates x respondents x columns) cells per batch, to bound memory
+BATCH_CELLS = 4_000_000
+
+BootstrapResult = namedtuple("BootstrapResult", ["mean", "lower", "upper", "replicates"])
+
+
+def recode_column(series, recode):
+    """Apply a recode function to each distinct answer once, instead of to every row."""
+    uniques = series.dropna().unique()
+    return series.map(dict(zip(uniques, (recode(u) for u in uniques))))
+
+
+def _group_means(idx, group_codes, values, valid_weights, n_groups):
+    """Weighted means per (replicate, group, column) for a batch of resample indices."""
+    n_rep, n = idx.shape
+    n_cols = values.shape[1]
+    cells = n_rep * n_groups * n_cols
+
+    rep_group = np.arange(n_rep)[:, None] * n_groups + group_codes[idx]   # (reps, n)
+    flat = (rep_group[:, :, None] * n_cols + np.arange(n_cols)).ravel()   # (reps, n, cols)
+    totals = np.bincount(flat, weights=values[idx].ravel(), minlength=cells)
+    counts = np.bincount(flat, weights=valid_weights[idx].ravel(), minlength=cells)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / counts
+    return means.reshape(n_rep, n_groups, n_cols)
+
+
+def _run_batch(args):
+    seed, n_rep, group_codes, values, valid_weights, n_groups = args
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(group_codes), size=(n_rep, len(group_codes)), dtype=np.int32)
+    return _group_means(idx, group_codes, values, valid_weights, n_groups)
+
+
+def _pool_context():
+    """Process start method for the pool.
+
+    The survey scripts run their analysis at import time, so child processes
+    must be forked rather than spawned (a spawned child would re-run the
+    script). Without fork (Windows) batches run in this process instead.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def bootstrap_group_means(groups, values, weights=None, n_boot=10_000, ci=0.95,
+                          seed=0, n_jobs=None, batch_size=None):
+    """Bootstrap percentile intervals of the mean of each value column per group.
+
+    groups: one group label per respondent (NaN = left out)
+    values: Series / DataFrame of numeric values per respondent (NaN = left out)
+    weights: optional respondent weights, e.g. from raking.survey_weights
+    n_jobs: worker processes (None = $SURVEY_BOOTSTRAP_JOBS or all CPUs, 1 = run in this process)
+
+    Returns BootstrapResult(mean, lower, upper, replicates) where mean/lower/upper
+    are DataFrames (groups x columns) and replicates is the raw
+    (n_boot x groups x columns) array.
+    """
+    values = values.to_frame() if isinstance(values, pd.Series) else pd.DataFrame(values)
+    groups = pd.Series(groups, index=values.index)
+    keep = groups.notna().to_numpy()
+
+    group_codes, group_levels = pd.factorize(groups[keep], sort=True)
+    group_codes = group_codes.astype(np.intp)
+    vals = values[keep].to_numpy(dtype=np.float64)
+    w = np.ones(len(vals)) if weights is None else np.asarray(weights, dtype=np.float64)[keep]
+
+    valid = ~np.isnan(vals)
+    valid_weights = valid * w[:, None]
+    weighted_values = np.where(valid, vals, 0.0) * w[:, None]
+    n_groups, n_cols = len(group_levels), vals.shape[1]
+
+    if batch_size is None:
+        batch_size = max(1, BATCH_CELLS // max(1, len(vals) * n_cols))
+    batch_sizes = [min(batch_size, n_boot - start) for start in range(0, n_boot, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    tasks = [(s, b, group_codes, weighted_values, valid_weights, n_groups) for s, b in zip(seeds, batch_sizes)]
+
+    n_jobs = n_jobs or int(os.environ.get("SURVEY_BOOTSTRAP_JOBS", 0)) or os.cpu_count() or 1
+    context = _pool_context()
+    if n_jobs > 1 and len(tasks) > 1 and context is not None:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)), mp_context=context) as pool:
+            batches = list(pool.map(_run_batch, tasks))
+    else:
+        batches = [_run_batch(task) for task in tasks]
+    replicates = np.concatenate(batches, axis=0)
+
+    full = np.arange(len(vals))[None, :]
+    point = _group_means(full, group_codes, weighted_values, valid_weights, n_groups)[0]
+    alpha = (1 - ci) / 2
+    lower, upper = np.nanquantile(replicates, [alpha, 1 - alpha], axis=0)
+
+    index = pd.Index(group_levels, name=groups.name)
+    frames = [pd.DataFrame(a, index=index, columns=values.columns) for a in (point, lower, upper)]
+    return BootstrapResult(*frames, replicates)
+
+
+def error_bars(result, column, index=None):
+    """Asymmetric (2 x groups) yerr array for plt.bar from a BootstrapResult column.
+
+    Pass `index` to line the bars up with a chart's group order.
+    """
+    mean, lower, upper = (frame[column] for frame in result[:3])
+    if index is not None:
+        mean, lower, upper = mean.reindex(index), lower.reindex(index), upper.reindex(index)
+    return np.vstack([mean - lower, upper - mean])
@@ -0,0 +1,130 @@
+"""
+Chart templates for the survey scripts.
+
+Each template draws one chart type onto an existing Axes from aggregates that
+were already computed (e.g. by CrosstabCube), with a single bar/barh call for
+all series instead of one call per series:
+
+    grouped_bar(ax, values, groups, series)      vertical bars side by side
+    stacked_barh(ax, values, rows, segments)     horizontal stacked bars
+    ranked_barh(ax, values, labels)              horizontal bars, largest on top
+
+For batches (one chart per city, per question, ...) FigurePool hands out
+cleared Figure/Axes pairs by size and saves them, so a figure is created once
+per size instead of once per chart. Pool figures are not registered with
+pyplot, so nothing piles up in plt's figure manager.
+"""
+
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+
+
+def wrap_title(text, width=60):
+    return "\n".join(textwrap.wrap(text, width))
+
+
+def _series_colors(n, colors=None, colormap=None):
+    if colors is not None:
+        return list(colors)
+    if colormap is not None:
+        # Spread over the colormap, as pandas' plot(colormap=...) does
+        cmap = plt.get_cmap(colormap)
+        return [cmap(x) for x in np.linspace(0, 1, n)]
+    cycle = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+    return [cycle[i % len(cycle)] for i in range(n)]
+
+
+def _legend(ax, labels, colors, **kwargs):
+    ax.legend(handles=[Patch(color=c, label=l) for l, c in zip(labels, colors)], **kwargs)
+
+
+def grouped_bar(ax, values, groups, series, errors=None, colors=None, width=0.7,
+                capsize=4, legend_title=None, legend_loc="best"):
+    """Side-by-side bars: one cluster per group, one bar per series.
+
+    values: (groups x series) array
+    errors: optional per-series yerr, each (2 x groups) as from bootstrap.error_bars
+    width: total width of a cluster
+    """
+    values = np.asarray(values, dtype=float)
+    n_groups, n_series = values.shape
+    bar_width = width / n_series
+    offsets = (np.arange(n_series) - (n_series - 1) / 2) * bar_width
+    colors = _series_colors(n_series, colors)
+
+    # Series-major order: all bars of series 0, then series 1, ...
+    x = (np.arange(n_groups)[None, :] + offsets[:, None]).ravel()
+    yerr = None
+    if errors is not None:
+        yerr = np.hstack([np.asarray(e, dtype=float).reshape(2, n_groups) for e in errors])
+    bar_colors = [colors[j] for j in range(n_series) for _ in range(n_groups)]
+    ax.bar(x, values.T.ravel(), bar_width, yerr=yerr, capsize=capsize if yerr is not None else 0, color=bar_colors)
+    ax.set_xticks(np.arange(n_groups), [str(g) for g in groups])
+    _legend(ax, series, colors, title=legend_title, loc=legend_loc)
+    return ax
+
+
+def stacked_barh(ax, values, rows, segments, colors=None, colormap="tab20",
+                 legend_title=None, legend_kwargs=None):
+    """Horizontal stacked bars: one bar per row, one segment per column of values.
+
+    values: (rows x segments) array
+    """
+    values = np.asarray(values, dtype=float)
+    n_rows, n_segments = values.shape
+    lefts = np.hstack([np.zeros((n_rows, 1)), np.cumsum(values, axis=1)[:, :-1]])
+    colors = _series_colors(n_segments, colors, colormap)
+
+    y = np.tile(np.arange(n_rows), n_segments)
+    segment_colors = [colors[j] for j in range(n_segments) for _ in range(n_rows)]
+    ax.barh(y, values.T.ravel(), left=lefts.T.ravel(), color=segment_colors)
+    ax.set_yticks(np.arange(n_rows), [str(r) for r in rows])
+    _legend(ax, segments, colors, title=legend_title, **(legend_kwargs or {}))
+    return ax
+
+
+def ranked_barh(ax, values, labels, color=None, top=None):
+    """Horizontal bars sorted by value, largest at the top."""
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(-values, kind="stable")
+    if top:
+        order = order[:top]
+    ax.barh(np.arange(len(order)), values[order], color=color or _series_colors(1)[0])
+    ax.set_yticks(np.arange(len(order)), [str(labels[i]) for i in order])
+    ax.invert_yaxis()
+    return ax
+
+
+class FigurePool:
+    """Reusable Figure/Axes pairs keyed by figure size, for rendering many charts."""
+
+    def __init__(self, dpi=100):
+        self.dpi = dpi
+        self._figures = {}
+
+    def axes(self, figsize=(8, 6)):
+        """A cleared Axes on a figure of this size (the same one every time)."""
+        key = tuple(figsize)
+        if key not in self._figures:
+            fig = Figure(figsize=figsize, dpi=self.dpi)
+            self._figures[key] = (fig, fig.add_subplot())
+        fig, ax = self._figures[key]
+        for extra in fig.axes[1:]:
+            extra.remove()
+        fig.legends.clear()
+        ax.clear()
+        return ax
+
+    def save(self, ax, path, **kwargs):
+        """Lay out and save the figure holding this Axes."""
+        fig = ax.figure
+        fig.tight_layout()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fig.savefig(path, **kwargs)
+        return path
@@ -0,0 +1,279 @@
+"""
+Precomputed crosstab cube for the survey scripts.
+
+Instead of recoding and grouping the respondent rows for every chart, the cube
+walks the survey once and stores the count of respondents in every combination
+of the chosen dimensions (question answers, race, income, education, political
+views, ZIP, ...) as a dense N-d integer array.
+
+Slices, marginals and grouped means are then answered by summing the cube, so
+recoding an answer or collapsing a group only touches the (few) answer levels,
+never the respondent rows.
+
+Each axis has one extra trailing slot that holds respondents with a missing
+answer, so counts always add up to the number of respondents.
+
+New survey waves are added with cube.update(new_rows), scanning only those rows.
+
+Example:
+    cube = CrosstabCube.from_frame(df, {"frequency": frequency_col, "support": support_col})
+    cube = cube.relabel("frequency", recode_frequency)
+    mean_support = cube.grouped_mean("support", by="frequency", scores=recode_support)
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Demographic columns most of the analyses break results down by
+RACE_COL = "What is your race or ethnicity? (Select all that apply) (d8morv7)"
+ZIP_COL = "What is your ZIP code? (7bepp7b)"
+
+DEMOGRAPHIC_COLUMNS = {
+    "race": RACE_COL,
+    "income": "householdIncome",
+    "education": "education",
+    "political_views": "politicalViews",
+    "zip": ZIP_COL,
+}
+
+# Refuse to allocate absurdly large dense cubes (cells, not bytes)
+MAX_CELLS = 50_000_000
+
+
+def likert_score(level):
+    """Score a Likert answer such as '3 = Neutral / Not sure' by its leading number."""
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", str(level))
+    return float(match.group(1)) if match else np.nan
+
+
+def _normalize(series):
+    """Normalize raw answers into the strings used as cube levels (NaN stays NaN)."""
+    values = series.astype("string").str.strip()
+    return values.mask(values == "")
+
+
+class CrosstabCube:
+    """Dense N-d count array over named, categorical survey dimensions."""
+
+    def __init__(self, dims, levels, counts, columns=None):
+        self.dims = list(dims)
+        self.levels = {dim: list(lv) for dim, lv in zip(self.dims, levels)}
+        self.counts = counts
+        # {dim: source column}, kept only while the levels are the raw answers
+        self.columns = columns
+
+        expected = tuple(len(lv) + 1 for lv in levels)
+        if counts.shape != expected:
+            raise ValueError(f"Count array shape {counts.shape} does not match levels {expected}")
+
+    # === CONSTRUCTION ===
+
+    @classmethod
+    def from_frame(cls, df, columns, weights=None, max_cells=MAX_CELLS):
+        """Build a cube from a survey frame in one pass over the rows.
+
+        `columns` is either a list of column names or a {dimension name: column}
+        dict. If `weights` is given (one weight per row), the cube stores
+        weighted counts instead of respondent counts.
+        """
+        if not isinstance(columns, dict):
+            columns = {col: col for col in columns}
+
+        dims, levels, codes = [], [], []
+        for dim, col in columns.items():
+            if col not in df.columns:
+                raise KeyError(f"Column not found in survey data: {col}")
+            level_codes, uniques = pd.factorize(_normalize(df[col]), sort=True)
+            # Missing answers go to the trailing slot of the axis
+            level_codes = np.where(level_codes < 0, len(uniques), level_codes)
+            dims.append(dim)
+            levels.append(list(uniques))
+            codes.append(level_codes)
+
+        shape = tuple(len(lv) + 1 for lv in levels)
+        size = int(np.prod(shape, dtype=np.int64))
+        if size > max_cells:
+            raise ValueError(
+                f"Cube would have {size:,} cells (shape {shape}); "
+                f"build it over fewer dimensions or raise max_cells."
+            )
+
+        flat = np.ravel_multi_index(codes, shape) if codes else np.zeros(len(df), dtype=np.intp)
+        if weights is None:
+            counts = np.bincount(flat, minlength=size)
+            # Sized by the row count so merged levels can never overflow
+            counts = counts.astype(np.min_scalar_type(max(len(df), 1)))
+        else:
+            weights = np.asarray(weights, dtype=np.float64)
+            if weights.shape != (len(df),):
+                raise ValueError("weights must have one entry per survey row")
+            counts = np.bincount(flat, weights=weights, minlength=size)
+
+        return cls(dims, levels, counts.reshape(shape), columns=dict(columns))
+
+    def update(self, df, weights=None):
+        """Add the rows of `df` (e.g. a new survey wave) to the counts in place.
+
+        Only the new rows are scanned; answer levels that were not seen before
+        are added to the axes. Works on cubes straight from from_frame, before
+        relabel/select.
+        """
+        if self.columns is None:
+            raise ValueError("Only cubes built by from_frame can be updated (update before relabel/select).")
+        if df.empty:
+            return self
+        weighted = np.issubdtype(self.counts.dtype, np.floating)
+        if weighted != (weights is not None):
+            raise ValueError("Pass weights to update() exactly when the cube was built with weights.")
+        delta = CrosstabCube.from_frame(df, self.columns, weights=weights, max_cells=np.inf)
+
+        merged_levels = [sorted(set(self.levels[d]) | set(delta.levels[d])) for d in self.dims]
+        total = self.total + delta.total
+        dtype = np.float64 if weighted else np.min_scalar_type(max(int(total), 1))
+        merged = np.zeros(tuple(len(lv) + 1 for lv in merged_levels), dtype=dtype)
+        for cube in (self, delta):
+            positions = []
+            for dim, levels in zip(self.dims, merged_levels):
+                where = {lv: i for i, lv in enumerate(levels)}
+                positions.append([where[lv] for lv in cube.levels[dim]] + [len(levels)])
+            merged[np.ix_(*positions)] += cube.counts
+
+        self.levels = dict(zip(self.dims, merged_levels))
+        self.counts = merged
+        return self
+
+    # === HELPERS ===
+
+    def axis(self, dim):
+        """Return the array axis of a dimension."""
+        try:
+            return self.dims.index(dim)
+        except ValueError:
+            raise KeyError(f"Unknown cube dimension: {dim}") from None
+
+    @property
+    def total(self):
+        return self.counts.sum()
+
+    def _with_axis(self, dim, counts, levels):
+        new_levels = [levels if d == dim else self.levels[d] for d in self.dims]
+        return CrosstabCube(self.dims, new_levels, counts)
+
+    # === SLICING ===
+
+    def select(self, dim, keep):
+        """Keep only some levels of a dimension.
+
+        `keep` is a list of levels or a predicate called once per level.
+        Use it for "contains" style filters on multi-select answers, e.g.
+        `cube.select("race", lambda lv: "Asian" in lv)`.
+        """
+        axis = self.axis(dim)
+        levels = self.levels[dim]
+        if callable(keep):
+            idx = [i for i, lv in enumerate(levels) if keep(lv)]
+        else:
+            wanted = set(keep)
+            idx = [i for i, lv in enumerate(levels) if lv in wanted]
+
+        # Respondents in the other levels (and missing answers) are dropped,
+        # so the missing slot of the new axis is empty.
+        picked = self.counts.take(idx, axis=axis)
+        kept_levels = [levels[i] for i in idx]
+        empty_shape = list(picked.shape)
+        empty_shape[axis] = 1
+        missing = np.zeros(empty_shape, dtype=picked.dtype)
+        return self._with_axis(dim, np.concatenate([picked, missing], axis=axis), kept_levels)
+
+    def relabel(self, dim, mapping, order=None):
+        """Merge the levels of a dimension by a recode function or dict.
+
+        Levels mapped to None (or NaN) are moved to the missing slot. `order`
+        fixes the order of the resulting levels; by default they are sorted.
+        """
+        axis = self.axis(dim)
+        fn = mapping.get if isinstance(mapping, dict) else mapping
+        new_of_old = [fn(lv) for lv in self.levels[dim]]
+
+        labels = [lb for lb in new_of_old if lb is not None and not pd.isna(lb)]
+        new_levels = list(order) if order is not None else sorted(set(labels), key=str)
+        position = {lb: i for i, lb in enumerate(new_levels)}
+        missing_slot = len(new_levels)
+
+        target = [position.get(lb, missing_slot) if lb is not None and not pd.isna(lb) else missing_slot
+                  for lb in new_of_old]
+        target.append(missing_slot)  # existing missing answers stay missing
+
+        shape = list(self.counts.shape)
+        shape[axis] = len(new_levels) + 1
+        merged = np.zeros(shape, dtype=self.counts.dtype)
+        moved = np.moveaxis(merged, axis, 0)
+        np.add.at(moved, np.asarray(target), np.moveaxis(self.counts, axis, 0))
+        return self._with_axis(dim, merged, new_levels)
+
+    # === AGGREGATES ===
+
+    def table(self, *dims, dropna=True):
+        """Return the N-d count array over `dims`, summing out every other dimension."""
+        axes = [self.axis(d) for d in dims]
+        others = tuple(i for i in range(len(self.dims)) if i not in axes)
+        summed = self.counts.sum(axis=others)
+        # sum() keeps the remaining axes in cube order; reorder to match `dims`
+        remaining = sorted(axes)
+        summed = np.transpose(summed, [remaining.index(a) for a in axes])
+        if dropna:
+            summed = summed[tuple(slice(0, -1) for _ in dims)]
+        return summed
+
+    def marginal(self, *dims, dropna=True):
+        """Counts over one or more dimensions as a pandas Series / DataFrame."""
+        counts = self.table(*dims, dropna=dropna)
+        index_levels = [self.levels[d] + ([] if dropna else [np.nan]) for d in dims]
+
+        if len(dims) == 1:
+            return pd.Series(counts, index=pd.Index(index_levels[0], name=dims[0]), name="count")
+        if len(dims) == 2:
+            return pd.DataFrame(
+                counts,
+                index=pd.Index(index_levels[0], name=dims[0]),
+                columns=pd.Index(index_levels[1], name=dims[1]),
+            )
+        index = pd.MultiIndex.from_product(index_levels, names=dims)
+        return pd.Series(counts.ravel(), index=index, name="count")
+
+    def mean(self, value_dim, scores=likert_score):
+        """Overall mean score of `value_dim` (see grouped_mean for `scores`)."""
+        fn = scores.get if isinstance(scores, dict) else scores
+        values = np.array([fn(lv) for lv in self.levels[value_dim]], dtype=np.float64)
+        valid = ~np.isnan(values)
+        counts = self.table(value_dim).astype(np.float64)[valid]
+        n = counts.sum()
+        return float(counts @ values[valid] / n) if n else np.nan
+
+    def grouped_mean(self, value_dim, by, scores=likert_score):
+        """Mean score of `value_dim` for each level of `by` (a dim or list of dims).
+
+        `scores` maps a level of `value_dim` to a number (callable or dict);
+        levels without a numeric score are left out, like NaN in pandas.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        fn = scores.get if isinstance(scores, dict) else scores
+        values = np.array([fn(lv) for lv in self.levels[value_dim]], dtype=np.float64)
+        valid = ~np.isnan(values)
+
+        table = self.table(*by, value_dim).astype(np.float64)[..., valid]
+        n = table.sum(axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (table @ values[valid]) / n
+        means[n == 0] = np.nan
+
+        if len(by) == 1:
+            return pd.Series(means, index=pd.Index(self.levels[by[0]], name=by[0]), name=value_dim)
+        index = pd.MultiIndex.from_product([self.levels[d] for d in by], names=by)
+        return pd.Series(means.ravel(), index=index, name=value_dim)
+
+    def grouped_means(self, value_dims, by, scores=likert_score):
+        """grouped_mean for several value dimensions, one column each."""
+        return pd.concat([self.grouped_mean(v, by, scores) for v in value_dims], axis=1)
@@ -2,6 +2,7 @@ from pathlib import Path
 import pandas as pd
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
+from text_index import TextIndex, group_indicators
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
@@ -14,16 +15,21 @@ race_col = "What is your race or ethnicity? (Select all that apply) (d8morv7)"
 # Optional: pick main racial groups to analyze
 groups = ["Asian", "Black or African American", "White", "Hispanic or Latino"]
 
+# Tokenize the answers once (cached on disk) and mark which rows mention each group
+index = TextIndex.cached(df[text_col])
+group_rows = group_indicators(df[race_col], groups)
+
 for group in groups:
-    # Filter rows where race contains the group
-    group_text = df[df[race_col].str.contains(group, na=False)][text_col].dropna()
-    combined_text = " ".join(group_text)
+    # Term counts for rows where race contains the group
+    frequencies = index.frequencies(group_rows[group])
 
-    if combined_text.strip() == "":
+    if not frequencies:
         continue
 
+    print(f"Most distinctive words for {group}:", ", ".join(index.log_odds(group_rows[group]).head(10).index))
+
     # Generate word cloud
-    wc = WordCloud(width=800, height=400, background_color="white").generate(combined_text)
+    wc = WordCloud(width=800, height=400, background_color="white").generate_from_frequencies(frequencies)
 
     plt.figure(figsize=(10,5))
     plt.imshow(wc, interpolation="bilinear")
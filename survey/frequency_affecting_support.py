@@ -1,13 +1,19 @@
 from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
-import textwrap
-import numpy as np
+from crosstab_cube import CrosstabCube
+from raking import survey_weights
+from bootstrap import bootstrap_group_means, error_bars, recode_column
+from chart_templates import grouped_bar, wrap_title
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
 df = pd.read_csv(file_path)
 
+# Set to True to weight respondents to the census race/income marginals
+WEIGHTED = False
+weights = survey_weights(df) if WEIGHTED else None
+
 # Column for noticing surveillance frequency
 frequency_col = "How often do you notice surveillance cameras or sensors in your neighborhood or daily routine? (6itkmu)"
 
@@ -38,7 +44,9 @@ def recode_frequency(val):
     else:
         return "Other"
 
-df['frequency_group'] = df[frequency_col].apply(recode_frequency)
+# Count every (frequency, gov support, private support) combination once
+cube = CrosstabCube.from_frame(df, [frequency_col] + support_cols, weights=weights)
+cube = cube.relabel(frequency_col, recode_frequency)
 
 # Recode support to numeric
 def recode_support(val):
@@ -61,29 +69,25 @@ def recode_support(val):
         except:
             return None
 
-for col in support_cols:
-    df[col + "_num"] = df[col].apply(recode_support)
-
-# Group by frequency and calculate mean support
-mean_support = df.groupby('frequency_group')[[c + "_num" for c in support_cols]].mean()
+# Group by frequency and calculate mean support (recoding only touches the answer levels)
+mean_support = cube.grouped_means(support_cols, by=frequency_col, scores=recode_support)
 mean_support = mean_support.reindex(["Never","Rarely","Sometimes","Often","Always"])  # optional ordering
 mean_support.columns = short_labels
 
+# Bootstrap 95% confidence intervals for each bar
+group_labels = recode_column(df[frequency_col], recode_frequency)
+scores = pd.concat([recode_column(df[c], recode_support) for c in support_cols], axis=1)
+ci = bootstrap_group_means(group_labels, scores, weights=weights)
+
 # Plot vertical side-by-side bars
 groups = mean_support.index.tolist()
-x = np.arange(len(groups))
-width = 0.35
-
-plt.figure(figsize=(10,6))
-plt.bar(x - width/2, mean_support[short_labels[0]], width, label=short_labels[0])
-plt.bar(x + width/2, mean_support[short_labels[1]], width, label=short_labels[1])
-
-plt.xticks(x, groups, rotation=0)
-plt.ylabel("Average Support")
-plt.title("\n".join(textwrap.wrap(
+fig, ax = plt.subplots(figsize=(10,6))
+grouped_bar(ax, mean_support[short_labels], groups, short_labels,
+            errors=[error_bars(ci, col, groups) for col in support_cols],
+            legend_title="Support Question", legend_loc='upper right')
+ax.set_ylabel("Average Support")
+ax.set_title(wrap_title(
     "Average Support for ALPR Cameras by How Often Respondents Notice Surveillance in Daily Life", 60
-)))
-
-plt.legend(title="Support Question", loc='upper right')
+))
 plt.tight_layout()
 plt.show()
@@ -1,11 +1,17 @@
 from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
+from crosstab_cube import CrosstabCube
+from raking import survey_weights
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
 df = pd.read_csv(file_path)
 
+# Set to True to weight respondents to the census race/income marginals
+WEIGHTED = False
+weights = survey_weights(df) if WEIGHTED else None
+
 # Columns for ALPR awareness facts
 awareness_cols = {
     "Storage of plate & vehicle info up to 12 months": 
@@ -35,17 +41,16 @@ def recode_awareness(val):
     else:
         return None
 
-# Apply recoding
-for col in awareness_cols.values():
-    df[col + "_num"] = df[col].apply(recode_awareness)
+# Count every race x awareness combination in one pass
+cube = CrosstabCube.from_frame(df, [race_col] + list(awareness_cols.values()), weights=weights)
 
 # Plot each fact by racial background
 for title, col in awareness_cols.items():
     avg_by_race = {}
     for race in main_races:
         # Include all rows that mention this race, even in combinations
-        group_rows = df[df[race_col].str.contains(race, case=False, na=False)]
-        avg_support = group_rows[col + "_num"].mean()
+        group_cube = cube.select(race_col, lambda level: race.lower() in level.lower())
+        avg_support = group_cube.mean(col, scores=recode_awareness)
         avg_by_race[race] = avg_support
 
     # Plot
@@ -1,31 +1,29 @@
 from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
+from chart_templates import ranked_barh
 
 # Relative path to CSV (same folder as script)
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
+df = pd.read_csv(file_path)
 
 # Update the column name exactly as in your CSV
 col = 'Which of the following surveillance tools have you heard of or seen in your city? (Select all that apply) (8dl9hmt)'
 
 # Process survey responses
-tools_data = df[col].dropna()
-tools_split = tools_data.str.split(',')
-all_tools = [tool.strip() for sublist in tools_split for tool in sublist]
+tools_split = df[col].dropna().str.split(',').explode().str.strip()
 
 # Count occurrences
-tools_counts = pd.Series(all_tools).value_counts()
+tools_counts = tools_split.value_counts()
 
-# Plot horizontal bar chart
-plt.figure(figsize=(14, 8))  # make bigger so labels fit
-tools_counts.plot(kind='barh')
+# Plot horizontal bar chart, biggest at top
+fig, ax = plt.subplots(figsize=(14, 8))  # make bigger so labels fit
+ranked_barh(ax, tools_counts.to_numpy(), tools_counts.index)
 
-plt.xlabel("Number of Respondents")
-plt.ylabel("Surveillance Tool")
-plt.title("Most Recognized Surveillance Tools in the Community")
-
-plt.gca().invert_yaxis()  # biggest at top
-plt.yticks(fontsize=9)    # smaller font for long labels
+ax.set_xlabel("Number of Respondents")
+ax.set_ylabel("Surveillance Tool")
+ax.set_title("Most Recognized Surveillance Tools in the Community")
+ax.tick_params(axis="y", labelsize=9)  # smaller font for long labels
 
 plt.tight_layout()        # auto-adjust so nothing is cut off
 plt.show()
@@ -1,13 +1,19 @@
 from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
-import textwrap
-import numpy as np
+from crosstab_cube import CrosstabCube
+from raking import survey_weights
+from bootstrap import bootstrap_group_means, error_bars, recode_column
+from chart_templates import grouped_bar, wrap_title
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
 df = pd.read_csv(file_path)
 
+# Set to True to weight respondents to the census race/income marginals
+WEIGHTED = False
+weights = survey_weights(df) if WEIGHTED else None
+
 # Columns
 perception_col = "Do you believe surveillance is being used more for public safety or social control? (cfu4j56)"
 support_cols = [
@@ -35,7 +41,9 @@ def recode_perception(val):
     else:
         return None
 
-df['perception'] = df[perception_col].apply(recode_perception)
+# Count every (perception, gov support, private support) combination once
+cube = CrosstabCube.from_frame(df, [perception_col] + support_cols, weights=weights)
+cube = cube.relabel(perception_col, recode_perception)
 
 # Recode support to numeric
 def recode_support(val):
@@ -58,28 +66,24 @@ def recode_support(val):
         except:
             return None
 
-for col in support_cols:
-    df[col + "_num"] = df[col].apply(recode_support)
-
 # Group by perception and calculate mean support
-mean_support = df.groupby('perception')[[c + "_num" for c in support_cols]].mean()
+mean_support = cube.grouped_means(support_cols, by=perception_col, scores=recode_support)
 mean_support.columns = short_labels
 
+# Bootstrap 95% confidence intervals for each bar
+group_labels = recode_column(df[perception_col], recode_perception)
+scores = pd.concat([recode_column(df[c], recode_support) for c in support_cols], axis=1)
+ci = bootstrap_group_means(group_labels, scores, weights=weights)
+
 # Plot vertical side-by-side bars
 perceptions = mean_support.index.tolist()
-x = np.arange(len(perceptions))
-width = 0.35  # bar width
-
-plt.figure(figsize=(8,6))
-plt.bar(x - width/2, mean_support[short_labels[0]], width, label=short_labels[0])
-plt.bar(x + width/2, mean_support[short_labels[1]], width, label=short_labels[1])
-
-plt.xticks(x, perceptions, rotation=0)
-plt.ylabel("Average Support")
-plt.title("\n".join(textwrap.wrap(
+fig, ax = plt.subplots(figsize=(8,6))
+grouped_bar(ax, mean_support[short_labels], perceptions, short_labels,
+            errors=[error_bars(ci, col, perceptions) for col in support_cols],
+            legend_title="Support Question", legend_loc='upper right')
+ax.set_ylabel("Average Support")
+ax.set_title(wrap_title(
     "Average Support for ALPR Cameras by Perception of Surveillance (Public Safety vs. Social Control)", 60
-)))
-
-plt.legend(title="Support Question", loc='upper right')
+))
 plt.tight_layout()
 plt.show()
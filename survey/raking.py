@@ -0,0 +1,287 @@
+"""
+Survey weighting by raking (iterative proportional fitting).
+
+The survey sample is not representative of the Bay Area, so respondents are
+weighted until the weighted race and income mix matches the census tract
+marginals in data/census/*_race_income_by_tract5.csv.
+
+Tract marginals are summed to an area level first: the whole region, each
+county (San Francisco county is the city), or ZIP codes through a tract->ZIP
+crosswalk. Respondents are matched to an area through their ZIP code and every
+area is raked at the same time, so each sweep is a handful of bincounts over the
+respondent arrays no matter how many areas there are.
+
+Weights are cached in memory and on disk (keyed by a hash of the inputs), and
+are meant to be passed once to CrosstabCube.from_frame(..., weights=...), after
+which every grouped mean is weighted at no extra cost.
+
+Income note: the census files only carry each tract's *median* household
+income, so the income target is the share of residents living in tracts whose
+median falls in each income bracket. It is a proxy, not a household income
+distribution.
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CENSUS_DIR = Path(__file__).resolve().parent.parent / "data" / "census"
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+TRACT_FILES = sorted(CENSUS_DIR.glob("*_race_income_by_tract5.csv"))
+
+RACE_COL = "What is your race or ethnicity? (Select all that apply) (d8morv7)"
+ZIP_COL = "What is your ZIP code? (7bepp7b)"
+INCOME_COL = "householdIncomeEstimate"
+
+# Raking categories, in the order used for the target arrays
+RACE_LEVELS = ["white", "black", "asian", "hispanic", "other"]
+INCOME_EDGES = [0, 60_000, 100_000, 150_000, np.inf]
+INCOME_LEVELS = ["<60k", "60k-100k", "100k-150k", "150k+"]
+
+# Census "no data" sentinel values such as -666666666
+CENSUS_MISSING = -100_000_000
+
+_weights_cache = {}
+
+
+# === CENSUS TARGETS ===
+
+def load_tract_marginals(paths=TRACT_FILES):
+    """Load the tract race/income files into one frame with a zero-padded GEOID."""
+    frames = [pd.read_csv(p, dtype={"state": str, "county": str, "tract": str, "GEOID": str}) for p in paths]
+    tracts = pd.concat(frames, ignore_index=True)
+    tracts["GEOID"] = tracts["GEOID"].str.zfill(11)
+    tracts["county"] = tracts["county"].str.zfill(3)
+    tracts["median_income"] = tracts["median_income"].where(tracts["median_income"] > CENSUS_MISSING)
+    return tracts
+
+
+def tract_category_counts(tracts):
+    """Population per raking category for each tract, as {variable: (n_tracts x n_levels) array}."""
+    pop = tracts["total_pop"].fillna(0).to_numpy(dtype=np.float64)
+    race = tracts[["white_pop", "black_pop", "asian_pop", "hispanic_pop"]].fillna(0).to_numpy(dtype=np.float64)
+    other = np.clip(pop - race.sum(axis=1), 0, None)
+    race = np.column_stack([race, other])
+
+    # Everyone in a tract is assigned to the bracket of the tract's median income
+    bracket = pd.cut(tracts["median_income"], INCOME_EDGES, labels=False, right=False)
+    income = np.zeros((len(tracts), len(INCOME_LEVELS)))
+    known = bracket.notna().to_numpy()
+    income[np.flatnonzero(known), bracket[known].astype(int).to_numpy()] = pop[known]
+
+    return {"race": race, "income": income}
+
+
+def area_targets(tracts, tract_area, ratio=None):
+    """Sum tract category counts to areas and normalize to proportions.
+
+    `tract_area` gives the area label of each tract (a Series aligned with
+    `tracts`, or one label for all). With a crosswalk, tracts can appear once
+    per overlapping area with `ratio` as the share of residents in that area.
+    Returns (area labels, {variable: (n_areas x n_levels) proportions}).
+    """
+    if np.isscalar(tract_area):
+        tract_area = pd.Series(tract_area, index=tracts.index)
+    area_codes, areas = pd.factorize(tract_area, sort=True)
+    share = np.ones(len(tracts)) if ratio is None else np.asarray(ratio, dtype=np.float64)
+
+    targets = {}
+    for var, counts in tract_category_counts(tracts).items():
+        totals = np.zeros((len(areas), counts.shape[1]))
+        keep = area_codes >= 0
+        np.add.at(totals, area_codes[keep], counts[keep] * share[keep, None])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            targets[var] = totals / totals.sum(axis=1, keepdims=True)
+    return list(areas), targets
+
+
+def zip_crosswalk_targets(tracts, crosswalk_path, zip_to_area=None):
+    """Targets per ZIP (or per area of ZIPs, e.g. city) from a HUD-style TRACT,ZIP,RES_RATIO crosswalk."""
+    xwalk = pd.read_csv(crosswalk_path, dtype={"TRACT": str, "ZIP": str})
+    xwalk["TRACT"] = xwalk["TRACT"].str.zfill(11)
+    joined = tracts.merge(xwalk, left_on="GEOID", right_on="TRACT", how="inner")
+    labels = joined["ZIP"].str.zfill(5)
+    if zip_to_area is not None:
+        labels = labels.map(zip_to_area)
+    return area_targets(joined, labels, ratio=joined["RES_RATIO"])
+
+
+# === RESPONDENT CATEGORIES ===
+
+def recode_race(val):
+    """Collapse the multi-select race answer into one census raking category."""
+    if pd.isna(val):
+        return None
+    options = [o.strip() for o in str(val).split(",")]
+    if "Prefer not to say" in options:
+        return None
+    if "Hispanic or Latino" in options:
+        return "hispanic"
+    if len(options) == 1:
+        return {
+            "White": "white",
+            "Black or African American": "black",
+            "Asian or Pacific Islander": "asian",
+        }.get(options[0], "other")
+    return "other"
+
+
+def respondent_codes(df):
+    """Integer category codes per raking variable (-1 = unknown, not raked on)."""
+    race = pd.Categorical(df[RACE_COL].map(recode_race), categories=RACE_LEVELS).codes
+    income = pd.to_numeric(df[INCOME_COL], errors="coerce")
+    bracket = pd.cut(income, INCOME_EDGES, labels=False, right=False)
+    return {
+        "race": race.astype(np.int64),
+        "income": bracket.fillna(-1).astype(np.int64).to_numpy(),
+    }
+
+
+def normalize_zip(series):
+    """Five-digit string ZIP codes (NaN where the answer is not a ZIP)."""
+    return series.astype(str).str.extract(r"(\d{5})", expand=False)
+
+
+# === RAKING ===
+
+def rake(codes, area, targets, max_iter=100, tol=1e-6, trim=None):
+    """Iterative proportional fitting, vectorized over respondents and areas.
+
+    codes: {variable: int array per respondent, -1 = unknown}
+    area: int array with the area index of each respondent (-1 = no area)
+    targets: {variable: (n_areas x n_levels) target proportions}
+    trim: optional (low, high) bounds on weights relative to the area mean,
+          applied before each rescale (so the returned weights can end up
+          slightly outside them)
+
+    Returns the weights (0 for respondents outside every area), scaled so the
+    weights in each area add up to its number of respondents.
+    """
+    area = np.asarray(area)
+    n_areas = next(iter(targets.values())).shape[0]
+    in_area = area >= 0
+    weights = in_area.astype(np.float64)
+    area_n = np.bincount(area[in_area], minlength=n_areas).astype(np.float64)
+
+    # Targets can only be matched over categories that have respondents, so
+    # renormalize each area's targets to the categories that are present.
+    prepared = {}
+    for var, target in targets.items():
+        n_levels = target.shape[1]
+        known = in_area & (codes[var] >= 0)
+        cell = area[known] * n_levels + codes[var][known]
+        present = np.bincount(cell, minlength=n_areas * n_levels).reshape(n_areas, n_levels) > 0
+        target = np.where(present, np.nan_to_num(target), 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            target = target / target.sum(axis=1, keepdims=True)
+        prepared[var] = (known, cell, np.nan_to_num(target).ravel(), n_levels)
+
+    def margin_error():
+        errors = [0.0]
+        for known, cell, target, n_levels in prepared.values():
+            cell_w = np.bincount(cell, weights=weights[known], minlength=n_areas * n_levels)
+            area_w = np.bincount(area[known], weights=weights[known], minlength=n_areas)
+            current = cell_w / np.repeat(np.where(area_w > 0, area_w, 1.0), n_levels)
+            errors.append(float(np.abs(current - target)[target > 0].max(initial=0.0)))
+        return max(errors)
+
+    for iteration in range(1, max_iter + 1):
+        for var, (known, cell, target, n_levels) in prepared.items():
+            cell_w = np.bincount(cell, weights=weights[known], minlength=n_areas * n_levels)
+            area_w = np.bincount(area[known], weights=weights[known], minlength=n_areas)
+            current = cell_w / np.repeat(np.where(area_w > 0, area_w, 1.0), n_levels)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                factor = np.where(current > 0, target / current, 1.0)
+            weights[known] *= factor[cell]
+
+        # Trim if asked (relative to the area mean), then rescale so each
+        # area's weights add up to its number of respondents
+        area_w = np.bincount(area[in_area], weights=weights[in_area], minlength=n_areas)
+        if trim is not None:
+            area_mean = np.divide(area_w, area_n, out=np.ones(n_areas), where=area_n > 0)
+            relative = weights[in_area] / area_mean[area[in_area]]
+            weights[in_area] = np.clip(relative, trim[0], trim[1])
+            area_w = np.bincount(area[in_area], weights=weights[in_area], minlength=n_areas)
+        scale = np.divide(area_n, area_w, out=np.ones(n_areas), where=area_w > 0)
+        weights[in_area] *= scale[area[in_area]]
+
+        # Convergence is judged on the weights that are returned
+        max_diff = margin_error()
+        if max_diff < tol:
+            break
+    else:
+        print(f"Raking did not converge after {max_iter} iterations (max margin error {max_diff:.2e}).")
+
+    return weights
+
+
+def _cache_key(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(np.ascontiguousarray(part).tobytes() if isinstance(part, np.ndarray) else repr(part).encode())
+    return digest.hexdigest()[:16]
+
+
+def survey_weights(df, geography="region", zip_to_area=None, crosswalk_path=None,
+                   tract_files=TRACT_FILES, max_iter=100, tol=1e-6, trim=None, use_cache=True):
+    """Raking weights for the respondents in `df`, one per row.
+
+    geography:
+        "region" - one pool: all respondents raked to the sum of every tract
+        "county" - one area per county; `zip_to_area` maps respondent ZIPs to
+                   the county FIPS code ("075", "001", ...). San Francisco
+                   county is also the city.
+        "zip"    - one area per ZIP, using the tract->ZIP `crosswalk_path`.
+                   With `zip_to_area` (e.g. ZIP -> city) the ZIPs are summed
+                   to those areas instead.
+    Respondents whose ZIP falls outside every area get weight 0.
+    """
+    if geography not in ("region", "county", "zip"):
+        raise ValueError(f"Unknown geography: {geography}")
+    if geography == "county" and zip_to_area is None:
+        raise ValueError("geography='county' needs a zip_to_area mapping")
+    if geography == "zip" and crosswalk_path is None:
+        raise ValueError("geography='zip' needs a tract->ZIP crosswalk_path")
+
+    zips = normalize_zip(df[ZIP_COL])
+    if geography == "region":
+        resp_area = pd.Series("region", index=df.index)
+    elif geography == "county" or zip_to_area is not None:
+        resp_area = zips.map(zip_to_area)
+    else:
+        resp_area = zips
+    codes = respondent_codes(df)
+
+    # Keyed on the census files' paths and modification times, so a cache hit
+    # does not read them
+    sources = [Path(p) for p in tract_files] + ([Path(crosswalk_path)] if geography == "zip" else [])
+    key = _cache_key(geography, codes["race"], codes["income"], resp_area.astype(str).to_numpy(dtype="U"),
+                     [(str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in sources],
+                     sorted(zip_to_area.items()) if zip_to_area else None, max_iter, tol, trim)
+    if use_cache and key in _weights_cache:
+        return _weights_cache[key]
+    cache_file = CACHE_DIR / f"weights_{key}.npy"
+    if use_cache and cache_file.exists():
+        weights = np.load(cache_file)
+    else:
+        tracts = load_tract_marginals(tract_files)
+        if geography == "region":
+            areas, targets = area_targets(tracts, "region")
+        elif geography == "county":
+            areas, targets = area_targets(tracts, tracts["county"])
+        else:
+            areas, targets = zip_crosswalk_targets(tracts, crosswalk_path, zip_to_area)
+        area = pd.Categorical(resp_area, categories=areas).codes.astype(np.int64)
+        weights = rake(codes, area, targets, max_iter=max_iter, tol=tol, trim=trim)
+        if use_cache:
+            CACHE_DIR.mkdir(exist_ok=True)
+            np.save(cache_file, weights)
+
+        outside = int((area < 0).sum())
+        if outside:
+            print(f"{outside} respondents are outside the weighting areas and get weight 0.")
+    _weights_cache[key] = weights
+    return weights
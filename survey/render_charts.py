@@ -0,0 +1,230 @@
+"""
+Batch renderer for the survey charts.
+
+Every script in this folder that reads the survey CSV and plots (with
+matplotlib or chart_templates) is a chart definition, except report.py. They are run headless
+(Agg backend) across a process pool: figures a script would show are saved to
+plots/<script>_<n>.png instead, and files a script saves itself are kept where
+it puts them.
+
+Each chart is fingerprinted from its source (plus the local modules it
+imports), its upper-case module-level parameters (e.g. WEIGHTED) and the
+values of the survey columns it names. A chart whose fingerprint matches its
+last render is skipped, so after a small data update only the charts reading
+the changed columns are redrawn.
+
+    python survey/render_charts.py            # render what changed
+    python survey/render_charts.py --force    # render everything
+    python survey/render_charts.py --list     # list charts and whether they are stale
+"""
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import io
+import json
+import os
+import runpy
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+SURVEY_DIR = Path(__file__).parent
+# The survey export checked into the repository (same data the chart scripts read)
+DATA_PATH = SURVEY_DIR.parent / "survey_analysis" / "alpr_survey_results.csv"
+PLOTS_DIR = SURVEY_DIR / "plots"
+MANIFEST_PATH = PLOTS_DIR / ".render_manifest.json"
+# Read by bootstrap.py: charts already run in parallel, so no nested pools
+BOOTSTRAP_JOBS_ENV = "SURVEY_BOOTSTRAP_JOBS"
+
+# Scripts that read the survey and plot but are not charts (report.py builds the HTML reports)
+NOT_CHARTS = {"report", Path(__file__).stem}
+
+Chart = namedtuple("Chart", ["name", "path", "columns", "params", "modules"])
+
+
+def _local_modules(tree, seen=None):
+    """Sibling modules imported by a script, followed recursively."""
+    seen = set() if seen is None else seen
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            path = SURVEY_DIR / f"{name}.py"
+            if name not in seen and path.exists():
+                seen.add(name)
+                _local_modules(ast.parse(path.read_text()), seen)
+    return seen
+
+
+def _params(tree):
+    """Upper-case module-level constants with literal values."""
+    params = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name.isupper():
+                try:
+                    params[name] = ast.literal_eval(node.value)
+                except ValueError:
+                    pass
+    return params
+
+
+def discover(header):
+    """Chart definitions in this folder, with the survey columns each one names."""
+    charts = []
+    for path in sorted(SURVEY_DIR.glob("*.py")):
+        source = path.read_text()
+        plots = "matplotlib" in source or "chart_templates" in source
+        if path.stem in NOT_CHARTS or not plots or DATA_PATH.name not in source:
+            continue
+        tree = ast.parse(source)
+        strings = {node.value for node in ast.walk(tree) if isinstance(node, ast.Constant) and isinstance(node.value, str)}
+        charts.append(Chart(
+            name=path.stem,
+            path=path,
+            columns=sorted(strings & set(header)),
+            params=_params(tree),
+            modules=sorted(_local_modules(tree)),
+        ))
+    return charts
+
+
+def column_digests(df, columns):
+    """Short content hash of each column's values."""
+    return {
+        col: hashlib.sha256(pd.util.hash_pandas_object(df[col], index=True).values.tobytes()).hexdigest()[:16]
+        for col in columns
+    }
+
+
+def fingerprint(chart, digests):
+    sources = {name: hashlib.sha256((SURVEY_DIR / f"{name}.py").read_bytes()).hexdigest()
+               for name in [chart.name] + chart.modules}
+    payload = {
+        "sources": sources,
+        "params": repr(sorted(chart.params.items())),
+        "columns": {col: digests[col] for col in chart.columns},
+    }
+    if "raking" in chart.modules and chart.params.get("WEIGHTED"):
+        # Weighted charts also depend on the census marginals
+        from raking import TRACT_FILES
+        payload["census"] = [(p.name, p.stat().st_size, p.stat().st_mtime) for p in TRACT_FILES]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _render(name, path):
+    """Run one chart script on Agg, saving shown figures. Runs in a worker process."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+
+    os.environ[BOOTSTRAP_JOBS_ENV] = "1"
+    if str(SURVEY_DIR) not in sys.path:
+        sys.path.insert(0, str(SURVEY_DIR))
+    PLOTS_DIR.mkdir(exist_ok=True)
+
+    outputs = []
+    original_savefig = Figure.savefig
+
+    def record_savefig(fig, fname, *args, **kwargs):
+        outputs.append(str(fname))
+        return original_savefig(fig, fname, *args, **kwargs)
+
+    def save_shown(*args, **kwargs):
+        for num in plt.get_fignums():
+            out = PLOTS_DIR / f"{name}_{len(outputs) + 1}.png"
+            plt.figure(num).savefig(out, bbox_inches="tight")
+        plt.close("all")
+
+    Figure.savefig = record_savefig
+    plt.show = save_shown
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            runpy.run_path(str(path), run_name="__main__")
+        save_shown()  # figures left open without a show()
+    except KeyboardInterrupt:
+        raise
+    except BaseException as e:
+        # Scripts that sys.exit() (e.g. on a missing column) fail like any other error
+        return {"name": name, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        plt.close("all")
+        Figure.savefig = original_savefig
+    return {"name": name, "outputs": outputs, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def load_manifest():
+    if MANIFEST_PATH.exists():
+        return json.loads(MANIFEST_PATH.read_text())
+    return {}
+
+
+def is_stale(entry, fp):
+    if entry is None or entry.get("fingerprint") != fp:
+        return True
+    return not all(Path(out).exists() for out in entry.get("outputs", []))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every survey chart that changed.")
+    parser.add_argument("--force", action="store_true", help="render every chart")
+    parser.add_argument("--list", action="store_true", help="only list charts and whether they are stale")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("charts", nargs="*", help="only these charts (script names without .py)")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(DATA_PATH)
+    charts = discover(df.columns)
+    if args.charts:
+        charts = [c for c in charts if c.name in args.charts]
+    digests = column_digests(df, sorted({col for c in charts for col in c.columns}))
+    manifest = load_manifest()
+    fingerprints = {c.name: fingerprint(c, digests) for c in charts}
+    stale = [c for c in charts if args.force or is_stale(manifest.get(c.name), fingerprints[c.name])]
+
+    if args.list:
+        for c in charts:
+            status = "stale" if c in stale else "up to date"
+            print(f"{c.name:35s} {status:10s} {len(c.columns)} columns, params {c.params}")
+        return
+
+    print(f"{len(charts)} charts, {len(stale)} to render, {len(charts) - len(stale)} unchanged")
+    failed = 0
+    if stale:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(_render, c.name, c.path) for c in stale]
+            for future in as_completed(futures):
+                result = future.result()
+                name = result["name"]
+                if "error" in result:
+                    failed += 1
+                    print(f"  {name}: FAILED ({result['error']})")
+                    continue
+                manifest[name] = {
+                    "fingerprint": fingerprints[name],
+                    "outputs": result["outputs"],
+                    "rendered": time.strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                print(f"  {name}: {len(result['outputs'])} figures in {result['seconds']}s")
+
+    PLOTS_DIR.mkdir(exist_ok=True)
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2))
+    if failed:
+        sys.exit(f"{failed} charts failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Self-contained HTML survey reports, overall and per city.
+
+A report is a list of sections (a table plus a chart) computed on the
+respondents of one scope: everyone, or the respondents whose ZIP belongs to a
+city preset (see city_presets.py). Each section result is cached under a key
+made of the code it runs (this file, chart_templates.py and crosstab_cube.py)
+and a hash of the answers it reads, so rebuilding only recomputes sections
+whose inputs changed. Charts are stored once as
+content-addressed blobs (sha256 of the rendered SVG/PNG) in .cache/artifacts/
+and shared by every report that shows the same figure. A full build drops the
+cached sections (and blobs) it no longer uses.
+
+Each report is a single HTML file with its charts embedded, written to
+reports/<scope>.html together with an index.html.
+
+    python survey/report.py                          # overall + every city with enough respondents
+    python survey/report.py Oakland "San Francisco"  # overall + these cities
+    python survey/report.py --format png
+"""
+
+import argparse
+import base64
+import hashlib
+import html
+import io
+import json
+import re
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from chart_templates import FigurePool, grouped_bar, ranked_barh, stacked_barh, wrap_title
+from crosstab_cube import CrosstabCube, likert_score
+from raking import ZIP_COL, normalize_zip
+
+# city_presets.py lives in the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from city_presets import load_city_zip_map
+
+SURVEY_DIR = Path(__file__).parent
+DATA_PATH = SURVEY_DIR.parent / "survey_analysis" / "alpr_survey_results.csv"
+REPORT_DIR = SURVEY_DIR / "reports"
+CACHE_DIR = SURVEY_DIR / ".cache"
+ARTIFACT_DIR = CACHE_DIR / "artifacts"
+SECTION_INDEX = CACHE_DIR / "report_sections.json"
+# The code a section's table and chart depend on; editing any of it invalidates every section
+CODE_FILES = [Path(__file__).resolve(), SURVEY_DIR / "chart_templates.py", SURVEY_DIR / "crosstab_cube.py"]
+
+# Cities with fewer respondents than this get no report of their own
+MIN_RESPONDENTS = 10
+
+# Fixed SVG ids, so the same figure always renders to the same bytes (and blob)
+plt.rcParams["svg.hashsalt"] = "alpr-survey-report"
+
+AWARENESS_COLS = {
+    "12-month storage": "In some Bay Area cities, Automatic License Plate Reader (ALPR) cameras store an image of your license plate, vehicle make and model, and location in a searchable database for up to 12 months every time you drive past one. Before today, how aware were you of that fact? (6s6r3ex)",
+    "Warrantless search": "Police can search the Automatic License Plate Reader (ALPR) database for your data without a warrant or approval from any other organization. Before today, how aware were you of that fact? (zke2ete)",
+    "Sharing with other agencies": "Police can legally share your license plate Automatic License Plate Reader (ALPR) data with other local governments/police departments within California at any time without a warrant. Before today, how aware were you of that fact? (skzr4a8)",
+}
+SUPPORT_COLS = {
+    "Gov ALPR Support": "How supportive are you of Automatic License Plate Reader (ALPR) cameras installed by local governments and used by law enforcement? (y7ka0mc)",
+    "Private ALPR Support": "How supportive are you of private individuals or businesses installing Automatic License Plate Reader (ALPR) cameras and sharing the data voluntarily with police? (uktyzgu)",
+}
+TOOLS_COL = "Which of the following surveillance tools have you heard of or seen in your city? (Select all that apply) (8dl9hmt)"
+
+# build(df) -> (table, draw); draw(ax) renders the chart from the table
+Section = namedtuple("Section", ["title", "columns", "build", "figsize"])
+
+
+def _percent_table(df, columns):
+    """Share of each answer level (columns) per question (rows), in percent."""
+    cube = CrosstabCube.from_frame(df, columns)
+    counts = pd.DataFrame({label: cube.marginal(label) for label in columns}).T.fillna(0)
+    counts = counts[sorted(counts.columns, key=likert_score)]
+    return (counts.div(counts.sum(axis=1).where(lambda s: s > 0), axis=0) * 100).round(1)
+
+
+def awareness_levels(df):
+    table = _percent_table(df, AWARENESS_COLS)
+
+    def draw(ax):
+        stacked_barh(ax, table.to_numpy(), table.index, table.columns, colormap="RdYlGn",
+                     legend_title="Awareness", legend_kwargs=dict(bbox_to_anchor=(1.02, 1), loc="upper left"))
+        ax.invert_yaxis()
+        ax.set_xlabel("% of respondents")
+        ax.set_title("Awareness of ALPR facts before the survey")
+    return table, draw
+
+
+def support_levels(df):
+    table = _percent_table(df, SUPPORT_COLS)
+
+    def draw(ax):
+        grouped_bar(ax, table.T.to_numpy(), [wrap_title(c, 14) for c in table.columns], table.index,
+                    legend_loc="upper right")
+        ax.set_ylabel("% of respondents")
+        ax.set_title("Support for ALPR cameras")
+    return table, draw
+
+
+def support_by_awareness(df):
+    cube = CrosstabCube.from_frame(df, {"awareness": AWARENESS_COLS["12-month storage"], **SUPPORT_COLS})
+    table = cube.grouped_means(list(SUPPORT_COLS), by="awareness", scores=likert_score).round(2)
+    table.index = [str(level) for level in table.index]
+
+    def draw(ax):
+        grouped_bar(ax, table.to_numpy(), [wrap_title(i, 14) for i in table.index], table.columns,
+                    legend_loc="upper left")
+        ax.set_ylabel("Average support (1=Strongly oppose, 5=Strongly support)")
+        ax.set_title(wrap_title("Average support by awareness of 12-month ALPR data storage", 60))
+    return table, draw
+
+
+def recognized_tools(df):
+    tools = df[TOOLS_COL].dropna().str.split(",").explode().str.strip()
+    table = tools[tools != ""].value_counts().rename("Respondents").to_frame()
+
+    def draw(ax):
+        ranked_barh(ax, table["Respondents"].to_numpy(), table.index)
+        ax.set_xlabel("Number of Respondents")
+        ax.set_title("Most Recognized Surveillance Tools")
+    return table, draw
+
+
+SECTIONS = [
+    Section("Awareness of ALPR facts", list(AWARENESS_COLS.values()), awareness_levels, (10, 4)),
+    Section("Support for ALPR cameras", list(SUPPORT_COLS.values()), support_levels, (9, 5)),
+    Section("Support by awareness", [AWARENESS_COLS["12-month storage"]] + list(SUPPORT_COLS.values()),
+            support_by_awareness, (9, 5)),
+    Section("Recognized surveillance tools", [TOOLS_COL], recognized_tools, (10, 5)),
+]
+
+
+class ArtifactStore:
+    """Content-addressed files: the name of a blob is the sha256 of its bytes."""
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, data, ext):
+        key = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+        path = self.root / key
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        return key
+
+    def put_figure(self, fig, fmt="svg"):
+        buf = io.BytesIO()
+        # No timestamps in the file, so an unchanged figure keeps its key
+        metadata = {"Date": None} if fmt == "svg" else {"Software": None}
+        fig.savefig(buf, format=fmt, metadata=metadata, bbox_inches="tight")
+        return self.put(buf.getvalue(), fmt)
+
+    def prune(self, keep):
+        """Delete the blobs whose keys are not in `keep`; returns how many were deleted."""
+        stale = [path for path in self.root.iterdir() if path.is_file() and path.name not in keep]
+        for path in stale:
+            path.unlink()
+        return len(stale)
+
+    def data_uri(self, key):
+        mime = "image/svg+xml" if key.endswith(".svg") else "image/png"
+        return f"data:{mime};base64,{base64.b64encode((self.root / key).read_bytes()).decode()}"
+
+
+def code_digest(files=None):
+    """Hash of the source files sections run, plus the matplotlib version that draws them."""
+    digest = hashlib.sha256(matplotlib.__version__.encode())
+    for path in files or CODE_FILES:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+def section_key(section, df, fmt, code):
+    """Cache key: the code (code_digest()), the section, its chart format and the answers it reads."""
+    digest = hashlib.sha256(code.encode())
+    digest.update(f"{section.build.__name__}|{section.title}|{section.figsize}|{fmt}".encode())
+    digest.update(pd.util.hash_pandas_object(df[section.columns], index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+class ReportBuilder:
+    """Builds report HTML from cached section results, computing only what changed."""
+
+    def __init__(self, fmt="svg", store=None, index_path=SECTION_INDEX):
+        self.fmt = fmt
+        self.store = store or ArtifactStore()
+        self.index_path = Path(index_path)
+        self.index = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+        self.code = code_digest()
+        self.pool = FigurePool()
+        self.computed = self.reused = 0
+        # Index keys of the sections this build showed
+        self.used = set()
+
+    def section(self, section, df):
+        key = section_key(section, df, self.fmt, self.code)
+        self.used.add(key)
+        entry = self.index.get(key)
+        if entry is not None and (self.store.root / entry["figure"]).exists():
+            self.reused += 1
+            return entry
+        table, draw = section.build(df)
+        ax = self.pool.axes(section.figsize)
+        draw(ax)
+        ax.figure.tight_layout()
+        entry = {
+            "table": table.to_html(classes="table", border=0, na_rep=""),
+            "figure": self.store.put_figure(ax.figure, self.fmt),
+        }
+        self.index[key] = entry
+        self.computed += 1
+        return entry
+
+    def report(self, title, df):
+        parts = [f"<h1>{html.escape(title)}</h1>", f"<p>{len(df):,} respondents</p>"]
+        for section in SECTIONS:
+            entry = self.section(section, df)
+            parts.append(f"<h2>{html.escape(section.title)}</h2>")
+            parts.append(f'<img src="{self.store.data_uri(entry["figure"])}" alt="{html.escape(section.title)}">')
+            parts.append(entry["table"])
+        return _page(title, "\n".join(parts))
+
+    def save_index(self, prune=True):
+        """Write the section index; with prune, keep only the sections this build used.
+
+        Blobs no kept section refers to are deleted, so the cache does not grow
+        with every code or data change.
+        """
+        if prune:
+            self.index = {key: entry for key, entry in self.index.items() if key in self.used}
+            self.store.prune({entry["figure"] for entry in self.index.values()})
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path.write_text(json.dumps(self.index))
+
+
+def _page(title, body):
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 1000px; margin: 2em auto; color: #222; }}
+img {{ max-width: 100%; }}
+.table {{ border-collapse: collapse; font-size: 0.85em; margin-bottom: 2em; }}
+.table th, .table td {{ padding: 4px 8px; border-bottom: 1px solid #ddd; text-align: right; }}
+</style></head>
+<body>
+{body}
+</body></html>
+"""
+
+
+def slug(name):
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def scopes(df, cities=None):
+    """(title, respondents) for the overall report and each city report."""
+    yield "ALPR survey: all respondents", df
+    zips = normalize_zip(df[ZIP_COL])
+    city_zip_map = load_city_zip_map()
+    for city in cities or sorted(city_zip_map):
+        if city not in city_zip_map:
+            print(f"Unknown city: {city}")
+            continue
+        city_df = df[zips.isin(city_zip_map[city])]
+        if len(city_df) < MIN_RESPONDENTS:
+            continue
+        yield f"ALPR survey: {city}", city_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build self-contained HTML survey reports.")
+    parser.add_argument("cities", nargs="*", help="cities to report on (default: every city preset)")
+    parser.add_argument("--format", choices=["svg", "png"], default="svg", help="chart format")
+    parser.add_argument("--out", default=str(REPORT_DIR))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = pd.read_csv(DATA_PATH)
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    builder = ReportBuilder(fmt=args.format)
+    links = []
+    for title, scope_df in scopes(df, args.cities):
+        name = slug(title.split(": ", 1)[1]) + ".html"
+        (out_dir / name).write_text(builder.report(title, scope_df))
+        links.append(f'<li><a href="{name}">{html.escape(title)}</a> ({len(scope_df):,} respondents)</li>')
+    # A build of only some cities keeps the cached sections of the others
+    builder.save_index(prune=not args.cities)
+    (out_dir / "index.html").write_text(_page("ALPR survey reports", "<h1>ALPR survey reports</h1>\n<ul>\n" + "\n".join(links) + "\n</ul>"))
+
+    print(f"{len(links)} reports in {out_dir}: {builder.computed} sections computed, "
+          f"{builder.reused} reused ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Incremental store for the survey exports.
+
+The survey platform gives us overlapping exports ("ALPR General Survey
+Results.csv", "... v2.csv", "... Bay Area.csv"). Instead of picking one file by
+hand, every export is ingested into one store:
+
+- each respondent is keyed by participantID (assignmentID when missing) and the
+  keys are kept in a sorted hash index, so overlapping rows are skipped
+- only the new rows of an export are appended, as their own wave file
+- exports that were already ingested (same file contents) are skipped entirely
+
+ingest() returns just the new rows, so aggregates can be updated from the delta
+instead of re-reading every export, e.g. cube.update(store.ingest(path)).
+
+Usage:
+    python survey/survey_store.py ingest "data/survey_responses/ALPR General Survey Results.csv" --wave v1
+    python survey/survey_store.py status
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = Path(__file__).resolve().parent.parent / "data" / "survey_store"
+KEY_COLUMNS = ["participantID", "assignmentID"]
+WAVE_COL = "wave"
+
+
+def file_digest(path):
+    """sha256 of a file, to recognize exports that were already ingested."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def respondent_keys(df):
+    """64-bit hash per row of participantID, falling back to assignmentID."""
+    key = None
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            values = df[col].astype("string").str.strip()
+            key = values if key is None else key.fillna(values)
+    if key is None:
+        raise KeyError(f"Export has none of the key columns {KEY_COLUMNS}")
+    if key.isna().any():
+        raise ValueError(f"{int(key.isna().sum())} rows have no {' or '.join(KEY_COLUMNS)}")
+    return pd.util.hash_array(key.to_numpy(dtype=object))
+
+
+class SurveyStore:
+    """Append-only, deduplicated store of survey responses split into waves."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+        self.index_path = self.root / "key_index.npy"
+        self.waves_dir = self.root / "waves"
+
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text())
+        else:
+            self.manifest = {"exports": []}
+        self.index = np.load(self.index_path) if self.index_path.exists() else np.array([], dtype=np.uint64)
+
+    # === INGEST ===
+
+    def ingest(self, path, wave=None):
+        """Add the rows of an export that are not in the store yet.
+
+        Returns the new rows (with a `wave` column); empty if the export was
+        already ingested or only holds known respondents.
+        """
+        path = Path(path)
+        wave = wave or path.stem
+        digest = file_digest(path)
+        if any(e["sha256"] == digest for e in self.manifest["exports"]):
+            print(f"Already ingested: {path.name}")
+            return pd.DataFrame()
+        if any(e["wave"] == wave for e in self.manifest["exports"]):
+            raise ValueError(f"Wave '{wave}' already exists in the store; pick another name.")
+
+        df = pd.read_csv(path)
+        df.columns = [c.strip() for c in df.columns]
+        keys = respondent_keys(df)
+
+        # New = not in the index and first occurrence within this export
+        _, first = np.unique(keys, return_index=True)
+        is_first = np.zeros(len(df), dtype=bool)
+        is_first[first] = True
+        is_new = is_first & ~np.isin(keys, self.index, assume_unique=False)
+
+        delta = df[is_new].copy()
+        delta[WAVE_COL] = wave
+        if not delta.empty:
+            self.waves_dir.mkdir(parents=True, exist_ok=True)
+            delta.to_csv(self._wave_path(wave), index=False)
+
+        self.index = np.union1d(self.index, keys[is_new])
+        self.manifest["exports"].append({
+            "wave": wave,
+            "file": path.name,
+            "sha256": digest,
+            "rows_in_export": len(df),
+            "rows_added": int(is_new.sum()),
+            "ingested_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+        self._save()
+        print(f"Ingested {path.name} as wave '{wave}': {int(is_new.sum())} new of {len(df)} rows.")
+        return delta
+
+    def _wave_path(self, wave):
+        return self.waves_dir / f"{wave}.csv"
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        np.save(self.index_path, self.index)
+        self.manifest_path.write_text(json.dumps(self.manifest, indent=2))
+
+    # === READ ===
+
+    @property
+    def waves(self):
+        return [e["wave"] for e in self.manifest["exports"] if e["rows_added"]]
+
+    def load(self, waves=None):
+        """All stored responses (or only the given waves) as one frame."""
+        waves = self.waves if waves is None else waves
+        frames = [pd.read_csv(self._wave_path(w)) for w in waves]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def __len__(self):
+        return len(self.index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest survey exports into the deduplicated survey store.")
+    parser.add_argument("--store", default=STORE_DIR, help="store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="ingest one or more exports, in order")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--wave", help="wave name (only with a single export; default: file name)")
+    sub.add_parser("status", help="list ingested exports")
+    args = parser.parse_args()
+
+    store = SurveyStore(args.store)
+    if args.command == "ingest":
+        if args.wave and len(args.paths) > 1:
+            parser.error("--wave can only be used with a single export")
+        for path in args.paths:
+            store.ingest(path, wave=args.wave)
+    for export in store.manifest["exports"]:
+        print(f"{export['wave']:<40} {export['rows_added']:>6} new / {export['rows_in_export']:>6} rows  ({export['file']})")
+    print(f"Total respondents: {len(store)}")
+
+
+if __name__ == "__main__":
+    main()
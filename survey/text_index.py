@@ -0,0 +1,160 @@
+"""
+Tokenize-once term-frequency index for free-text survey answers.
+
+The free-text answers are tokenized a single time into a sparse document-term
+matrix (CSR arrays: indptr / indices / data) that is cached on disk next to
+the other survey caches. Per-group term counts, word-cloud frequencies and
+distinctive-term scores are then row sums over that matrix for the rows a group
+selects, without touching the raw text again.
+
+Example:
+    index = TextIndex.cached(df[text_col])
+    races = group_indicators(df[race_col], ["Asian", "White"])
+    freqs = index.frequencies(races["Asian"])        # for WordCloud.generate_from_frequencies
+    index.log_odds(races["Asian"]).head(10)          # words most distinctive for the group
+"""
+
+import hashlib
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+TOKEN_RE = re.compile(r"[a-z][a-z']*[a-z]")
+# Part of the cache key with TOKEN_RE and STOPWORDS; bump when tokenize() changes
+TOKENIZER_VERSION = 1
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing don't down during each even ever every few
+for from further get got had has have having he her here hers herself him himself his how i i'm
+if in into is it it's its itself just like me more most much my myself no nor not now of off on
+once only or other our ours ourselves out over own really same she should so some such than that
+the their theirs them themselves then there these they they're this those through to too under
+until up very was we were what when where which while who whom why will with would you your
+yours yourself yourselves
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased word tokens of an answer, without stop words."""
+    text = str(text).lower().replace("\u2019", "'")
+    return [t for t in TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+def group_indicators(series, groups, sep=","):
+    """Boolean (respondents x groups) frame for a multi-select answer.
+
+    A respondent is in a group when any selected option contains the group
+    name, e.g. "Asian" matches "Asian or Pacific Islander".
+    """
+    options = series.str.get_dummies(sep=sep)
+    options.columns = options.columns.str.strip()
+    return pd.DataFrame(
+        {g: options.loc[:, options.columns.str.contains(g, regex=False)].any(axis=1) for g in groups},
+        index=series.index,
+    )
+
+
+class TextIndex:
+    """Sparse document-term count matrix over a column of free-text answers."""
+
+    def __init__(self, vocab, indptr, indices, data):
+        self.vocab = np.asarray(vocab, dtype=object)
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        # Document of each stored entry, for masked row sums
+        self.entry_doc = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+    @property
+    def n_docs(self):
+        return len(self.indptr) - 1
+
+    # === BUILD / CACHE ===
+
+    @classmethod
+    def from_series(cls, texts):
+        """Tokenize every answer once (missing answers become empty documents)."""
+        doc_ids, tokens = [], []
+        for doc, text in enumerate(texts):
+            if pd.isna(text):
+                continue
+            words = tokenize(text)
+            doc_ids.extend([doc] * len(words))
+            tokens.extend(words)
+
+        term_ids, vocab = pd.factorize(pd.Series(tokens, dtype=object), sort=True)
+        pairs = np.asarray(doc_ids, dtype=np.int64) * max(len(vocab), 1) + term_ids
+        pairs, counts = np.unique(pairs, return_counts=True)
+        docs, terms = np.divmod(pairs, max(len(vocab), 1))
+
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(docs, minlength=len(texts)), out=indptr[1:])
+        return cls(list(vocab), indptr, terms.astype(np.int32), counts.astype(np.int32))
+
+    @classmethod
+    def cached(cls, texts, cache_dir=CACHE_DIR):
+        """Load the index for these answers from disk, building it on first use.
+
+        The cache key covers the answers and the tokenizer (version, pattern and
+        stop words), so changing either builds a new index.
+        """
+        key = hashlib.sha1(pd.util.hash_pandas_object(texts.astype(str), index=False).values.tobytes())
+        key.update(f"{TOKENIZER_VERSION}|{TOKEN_RE.pattern}|{' '.join(sorted(STOPWORDS))}".encode())
+        path = Path(cache_dir) / f"text_index_{key.hexdigest()[:16]}.npz"
+        if path.exists():
+            return cls.load(path)
+        index = cls.from_series(texts)
+        index.save(path)
+        return index
+
+    def save(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, vocab=self.vocab.astype(str), indptr=self.indptr,
+                            indices=self.indices, data=self.data)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f["vocab"].tolist(), f["indptr"], f["indices"], f["data"])
+
+    # === QUERIES ===
+
+    def term_counts(self, rows=None):
+        """Total count of each term over the selected documents (bool mask or None for all)."""
+        weights = self.data if rows is None else self.data * np.asarray(rows, dtype=bool)[self.entry_doc]
+        return np.bincount(self.indices, weights=weights, minlength=len(self.vocab))
+
+    def group_term_counts(self, indicators):
+        """(groups x terms) count frame for a boolean (respondents x groups) frame."""
+        counts = np.vstack([self.term_counts(indicators[g].to_numpy()) for g in indicators.columns])
+        return pd.DataFrame(counts, index=indicators.columns, columns=self.vocab)
+
+    def frequencies(self, rows=None, top=200):
+        """{term: count} of the most frequent terms, for WordCloud.generate_from_frequencies."""
+        counts = self.term_counts(rows)
+        order = np.argsort(counts)[::-1][:top]
+        return {self.vocab[i]: float(counts[i]) for i in order if counts[i] > 0}
+
+    def log_odds(self, rows, prior_scale=1.0):
+        """Distinctive terms of the selected documents versus the rest.
+
+        Log-odds ratio with an informative Dirichlet prior (Monroe et al.,
+        "Fightin' Words"), returned as z-scores sorted high to low.
+        """
+        rows = np.asarray(rows, dtype=bool)
+        group = self.term_counts(rows)
+        rest = self.term_counts(~rows)
+        prior = (group + rest) * prior_scale
+        prior = np.where(prior > 0, prior, 0.01)
+
+        n_g, n_r, a0 = group.sum(), rest.sum(), prior.sum()
+        delta = (np.log((group + prior) / (n_g + a0 - group - prior))
+                 - np.log((rest + prior) / (n_r + a0 - rest - prior)))
+        variance = 1 / (group + prior) + 1 / (rest + prior)
+        z = pd.Series(delta / np.sqrt(variance), index=self.vocab, name="z")
+        return z[(group + rest) > 0].sort_values(ascending=False)
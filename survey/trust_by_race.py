@@ -1,7 +1,7 @@
 from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
-import textwrap
+from chart_templates import stacked_barh, wrap_title
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
@@ -32,28 +32,23 @@ df_exploded[race_col] = df_exploded[race_col].str.strip()
 trust_counts = df_exploded.groupby(race_col)[trust_col].value_counts().unstack(fill_value=0)
 
 # Plot horizontal stacked bar chart
-plt.figure(figsize=(14,8), constrained_layout=True)
-ax = trust_counts.plot(
-    kind='barh', 
-    stacked=True, 
-    colormap='tab20', 
-    ax=plt.gca()
+fig, ax = plt.subplots(figsize=(14,8), constrained_layout=True)
+stacked_barh(
+    ax,
+    trust_counts.to_numpy(),
+    trust_counts.index,
+    trust_counts.columns,
+    colormap='tab20',
+    legend_title="Decision-Maker",
+    # Move legend far enough outside to show all labels
+    legend_kwargs=dict(bbox_to_anchor=(1.3, 1), loc='upper left', fontsize=10)
 )
 
-plt.xlabel("Number of Respondents")
-plt.ylabel("Racial Background")
-plt.title("\n".join(textwrap.wrap(
+ax.set_xlabel("Number of Respondents")
+ax.set_ylabel("Racial Background")
+ax.set_title(wrap_title(
     "Who Do People Trust Most to Make Surveillance Decisions? by Racial Background", 60
-)))
-
-# Move legend far enough outside to show all labels
-plt.legend(
-    title="Decision-Maker", 
-    bbox_to_anchor=(1.3, 1),  # move further right
-    loc='upper left',
-    fontsize=10
-)
-plt.yticks(rotation=0)
+))
 
 # Save figure
 output_dir = Path(__file__).parent / "plots"
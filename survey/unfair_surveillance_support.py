@@ -1,12 +1,19 @@
 from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
-import textwrap
+from crosstab_cube import CrosstabCube
+from raking import survey_weights
+from bootstrap import bootstrap_group_means, error_bars, recode_column
+from chart_templates import grouped_bar, wrap_title
 
 # Load CSV
 file_path = Path(__file__).parent / "alpr_survey_results.csv"
 df = pd.read_csv(file_path)
 
+# Set to True to weight respondents to the census race/income marginals
+WEIGHTED = False
+weights = survey_weights(df) if WEIGHTED else None
+
 # Column indicating if someone felt unfairly treated
 unfair_col = "Have you ever felt uncomfortable or treated unfairly due to surveillance technology? (5bdjc2c)"
 
@@ -31,7 +38,9 @@ def recode_unfair(val):
     else:
         return None
 
-df['unfair_group'] = df[unfair_col].apply(recode_unfair)
+# Count every (unfair treatment, gov support, private support) combination once
+cube = CrosstabCube.from_frame(df, [unfair_col] + support_cols, weights=weights)
+cube = cube.relabel(unfair_col, recode_unfair)
 
 # Recode support to numeric
 def recode_support(val):
@@ -54,28 +63,24 @@ def recode_support(val):
         except:
             return None
 
-for col in support_cols:
-    df[col + "_num"] = df[col].apply(recode_support)
-
 # Group by unfair treatment and calculate mean support
-mean_support = df.groupby('unfair_group')[[c + "_num" for c in support_cols]].mean()
+mean_support = cube.grouped_means(support_cols, by=unfair_col, scores=recode_support)
 mean_support.columns = short_labels
 
+# Bootstrap 95% confidence intervals for each bar
+group_labels = recode_column(df[unfair_col], recode_unfair)
+scores = pd.concat([recode_column(df[c], recode_support) for c in support_cols], axis=1)
+ci = bootstrap_group_means(group_labels, scores, weights=weights)
+
 # Plot vertical side-by-side bars
 groups = mean_support.index.tolist()
-x = range(len(groups))
-width = 0.35
-
-plt.figure(figsize=(8,6))
-plt.bar([i - width/2 for i in x], mean_support[short_labels[0]], width, label=short_labels[0])
-plt.bar([i + width/2 for i in x], mean_support[short_labels[1]], width, label=short_labels[1])
-
-plt.xticks(x, groups)
-plt.ylabel("Average Support")
-plt.title("\n".join(textwrap.wrap(
+fig, ax = plt.subplots(figsize=(8,6))
+grouped_bar(ax, mean_support[short_labels], groups, short_labels,
+            errors=[error_bars(ci, col, groups) for col in support_cols],
+            legend_title="Support Question", legend_loc='upper right')
+ax.set_ylabel("Average Support")
+ax.set_title(wrap_title(
     "Average Support for ALPR Cameras by Whether Respondents Felt Unfairly Treated by Surveillance", 60
-)))
-
-plt.legend(title="Support Question", loc='upper right')
+))
 plt.tight_layout()
 plt.show()
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# The scripts import their siblings by name, as when they are run directly
+for folder in [REPO_DIR, REPO_DIR / "survey", REPO_DIR / "data" / "census", REPO_DIR / "benchmarks"]:
+    if str(folder) not in sys.path:
+        sys.path.insert(0, str(folder))
@@ -0,0 +1,363 @@
+"""
+Checks for the cached and incremental code paths, whose bugs show up as stale
+or wrong numbers rather than errors. They run on the sample data checked into
+the repository.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+SURVEY_CSV = REPO_DIR / "survey_analysis" / "alpr_survey_results.csv"
+
+
+# === render_charts.py ===
+
+def test_weighted_chart_fingerprint_includes_census_files():
+    import render_charts
+
+    df = pd.read_csv(SURVEY_CSV)
+    chart = next(c for c in render_charts.discover(df.columns) if "raking" in c.modules)
+    digests = render_charts.column_digests(df, chart.columns)
+    weighted = chart._replace(params={**chart.params, "WEIGHTED": True})
+    unweighted = chart._replace(params={**chart.params, "WEIGHTED": False})
+
+    assert render_charts.fingerprint(weighted, digests) != render_charts.fingerprint(unweighted, digests)
+
+
+def test_report_is_not_discovered_as_a_chart():
+    import render_charts
+
+    names = [c.name for c in render_charts.discover(pd.read_csv(SURVEY_CSV, nrows=0).columns)]
+    assert names and "report" not in names
+
+
+def test_chart_that_exits_is_reported_as_failed(tmp_path, monkeypatch):
+    import render_charts
+
+    monkeypatch.setenv(render_charts.BOOTSTRAP_JOBS_ENV, "1")
+    monkeypatch.setattr(render_charts, "PLOTS_DIR", tmp_path / "plots")
+    script = tmp_path / "exits.py"
+    script.write_text("import sys\nsys.exit('column not found')\n")
+
+    result = render_charts._render("exits", script)
+    assert result == {"name": "exits", "error": "SystemExit: column not found"}
+
+
+# === report.py ===
+
+def test_report_sections_recompute_when_code_they_use_changes(tmp_path, monkeypatch):
+    import report
+
+    code_files = []
+    for path in report.CODE_FILES:
+        copy = tmp_path / path.name
+        copy.write_bytes(path.read_bytes())
+        code_files.append(copy)
+    monkeypatch.setattr(report, "CODE_FILES", code_files)
+    df = pd.read_csv(SURVEY_CSV)
+
+    def build():
+        builder = report.ReportBuilder(store=report.ArtifactStore(tmp_path / "artifacts"),
+                                       index_path=tmp_path / "sections.json")
+        builder.report("All", df)
+        builder.save_index()
+        return builder.computed, builder.reused
+
+    sections = len(report.SECTIONS)
+    assert build() == (sections, 0)
+    assert build() == (0, sections)
+    # A helper outside the sections' own functions (e.g. chart_templates.py) changes
+    templates = tmp_path / "chart_templates.py"
+    templates.write_text(templates.read_text() + "\n# changed\n")
+    assert build() == (sections, 0)
+
+
+def test_report_index_drops_sections_the_build_no_longer_uses(tmp_path):
+    import json
+
+    import report
+
+    df = pd.read_csv(SURVEY_CSV)
+    artifacts = tmp_path / "artifacts"
+
+    def build(fmt):
+        builder = report.ReportBuilder(fmt=fmt, store=report.ArtifactStore(artifacts),
+                                       index_path=tmp_path / "sections.json")
+        builder.report("All", df)
+        builder.save_index()
+
+    build("svg")
+    build("png")
+    index = json.loads((tmp_path / "sections.json").read_text())
+    assert len(index) == len(report.SECTIONS)
+    assert sorted(p.name for p in artifacts.iterdir()) == sorted({e["figure"] for e in index.values()})
+    assert all(entry["figure"].endswith(".png") for entry in index.values())
+
+
+# === tract_schema.py ===
+
+def test_tract_csv_keys_are_zero_padded(tmp_path):
+    from tract_schema import census_frame, to_csv
+
+    frame = census_frame(pd.DataFrame({
+        "median_income": ["78661", "-666666666"], "state": ["06", "06"], "county": ["075", "075"],
+        "tract": ["010101", "060100"],
+    }))
+    assert frame["GEOID"].tolist() == [6075010101, 6075060100]
+
+    to_csv(frame, tmp_path / "tracts.csv")
+    saved = pd.read_csv(tmp_path / "tracts.csv", dtype=str)
+    assert saved["GEOID"].tolist() == ["06075010101", "06075060100"]
+    assert saved[["state", "county", "tract"]].iloc[1].tolist() == ["06", "075", "060100"]
+    assert saved["median_income"].isna().tolist() == [False, True]
+
+
+# === crosstab_cube.py ===
+
+SUPPORT_COL = ("How supportive are you of Automatic License Plate Reader (ALPR) cameras installed by local "
+               "governments and used by law enforcement? (y7ka0mc)")
+
+
+def _assert_same_cube(a, b):
+    import numpy as np
+
+    assert a.levels == b.levels
+    np.testing.assert_array_equal(a.counts, b.counts)
+
+
+def test_cube_grouped_mean_matches_pandas():
+    from crosstab_cube import RACE_COL, CrosstabCube, _normalize, likert_score
+
+    df = pd.read_csv(SURVEY_CSV)
+    cube = CrosstabCube.from_frame(df, {"race": RACE_COL, "support": SUPPORT_COL})
+    scores = df[SUPPORT_COL].map(likert_score)
+    expected = scores.groupby(_normalize(df[RACE_COL]).astype(object)).mean()
+
+    means = cube.grouped_mean("support", by="race")
+    pd.testing.assert_series_equal(means.dropna(), expected.dropna(), check_names=False, check_index_type=False)
+
+
+def test_cube_update_matches_full_rebuild():
+    from crosstab_cube import DEMOGRAPHIC_COLUMNS, CrosstabCube
+
+    df = pd.read_csv(SURVEY_CSV)
+    columns = {dim: col for dim, col in DEMOGRAPHIC_COLUMNS.items() if dim != "zip"}
+    first, rest = df.iloc[:100], df.iloc[100:]
+
+    updated = CrosstabCube.from_frame(first, columns).update(rest)
+    _assert_same_cube(updated, CrosstabCube.from_frame(df, columns))
+
+
+# === raking.py ===
+
+def test_raking_matches_census_margins():
+    import numpy as np
+    from raking import area_targets, load_tract_marginals, rake, respondent_codes
+
+    df = pd.read_csv(SURVEY_CSV)
+    _, targets = area_targets(load_tract_marginals(), "region")
+    codes = respondent_codes(df)
+    area = np.zeros(len(df), dtype=np.int64)
+    weights = rake(codes, area, targets, max_iter=500, tol=1e-9)
+
+    assert np.isclose(weights.sum(), len(df))
+    for var, target in targets.items():
+        known = codes[var] >= 0
+        present = np.bincount(codes[var][known], minlength=target.shape[1]) > 0
+        expected = np.where(present, target[0], 0.0)
+        expected /= expected.sum()
+        achieved = np.bincount(codes[var][known], weights=weights[known], minlength=target.shape[1])
+        np.testing.assert_allclose(achieved / achieved.sum(), expected, atol=1e-6)
+
+
+def test_trimmed_raking_keeps_area_totals():
+    import numpy as np
+    from raking import survey_weights
+
+    df = pd.read_csv(SURVEY_CSV)
+    weights = survey_weights(df, trim=(0.5, 2.0), max_iter=200, use_cache=False)
+    assert np.isclose(weights.sum(), len(df))
+    assert weights.min() > 0
+
+
+def test_cached_weights_do_not_reread_census_files(tmp_path, monkeypatch):
+    import numpy as np
+    import raking
+
+    df = pd.read_csv(SURVEY_CSV)
+    monkeypatch.setattr(raking, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(raking, "_weights_cache", {})
+    weights = raking.survey_weights(df)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("census files read on a cache hit")
+    monkeypatch.setattr(raking, "load_tract_marginals", fail)
+    monkeypatch.setattr(raking, "_weights_cache", {})
+    np.testing.assert_array_equal(raking.survey_weights(df), weights)
+
+
+
+# === survey_store.py ===
+
+def test_store_deltas_update_cube_like_a_rebuild(tmp_path):
+    from crosstab_cube import DEMOGRAPHIC_COLUMNS, CrosstabCube
+    from survey_store import SurveyStore
+
+    exports = sorted((REPO_DIR / "data" / "survey_responses").glob("*.csv"))
+    columns = {"race": DEMOGRAPHIC_COLUMNS["race"], "zip": DEMOGRAPHIC_COLUMNS["zip"]}
+    store = SurveyStore(tmp_path / "store")
+    cube = CrosstabCube.from_frame(store.ingest(exports[0]), columns)
+    for path in exports[1:]:
+        cube.update(store.ingest(path))
+    assert store.ingest(exports[0]).empty
+
+    stored = store.load()
+    assert len(stored) == len(store)
+    _assert_same_cube(cube, CrosstabCube.from_frame(stored, columns))
+
+
+# === text_index.py ===
+
+def test_text_index_cache_follows_stopwords(tmp_path, monkeypatch):
+    import text_index
+
+    texts = pd.Series(["Privacy and the police", "Police privacy"])
+    assert "the" not in text_index.TextIndex.cached(texts, tmp_path).vocab
+
+    monkeypatch.setattr(text_index, "STOPWORDS", text_index.STOPWORDS - {"the"})
+    assert "the" in text_index.TextIndex.cached(texts, tmp_path).vocab
+    assert len(list(tmp_path.glob("text_index_*.npz"))) == 2
+
+
+# === dashboard_downloads.py ===
+
+def test_exports_round_trip_as_bytes():
+    import gzip
+    import io
+
+    import pyarrow.parquet as pq
+
+    import dashboard_downloads
+
+    df = pd.read_csv(SURVEY_CSV).iloc[:, :5]
+    exports = {fmt: dashboard_downloads.write_export(df, fmt) for fmt in dashboard_downloads.FORMATS}
+    assert all(isinstance(data, bytes) for data in exports.values())
+
+    expected = pd.read_csv(io.BytesIO(df.to_csv(index=False).encode()))
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(exports["CSV"])), expected)
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(gzip.decompress(exports["CSV (gzip)"]))), expected)
+    pd.testing.assert_frame_equal(pq.read_table(io.BytesIO(exports["Parquet"])).to_pandas(), df)
+
+
+# === city_presets.py ===
+
+def test_city_presets_only_move_old_zips_to_their_own_city():
+    import city_presets
+
+    presets = city_presets.load_city_zip_map()
+    table = pd.read_csv(city_presets.ZIP_CITY_CSV, dtype={"zip": str})
+    survey_zips = set(pd.read_csv(city_presets.CROSSWALK_CSV, dtype=str)["zip"].dropna())
+
+    for city, old_zips in city_presets._fallback_city_zip_map().items():
+        for zip_code in set(old_zips) - set(presets[city]):
+            # Dropped ZIPs belong to another city, or no respondent gave them
+            assert (table.loc[table["zip"] == zip_code, "city"] != city).all()
+            assert zip_code in set(table["zip"]) or zip_code not in survey_zips
+    assert set(city_presets._sf_polygon_zips()) <= set(presets["San Francisco"])
+
+
+# === dashboard_timing.py ===
+
+def test_cached_sizes_are_measured_once_per_miss(monkeypatch):
+    import dashboard_timing
+
+    measured = []
+    monkeypatch.setattr(dashboard_timing, "CACHE_SIZES", {})
+    monkeypatch.setattr(dashboard_timing, "deep_size", lambda obj: measured.append(obj) or 1)
+    cache = {}
+
+    def load():
+        if "frame" not in cache:
+            dashboard_timing.note_miss("load")
+            cache["frame"] = pd.DataFrame({"a": range(3)})
+        return cache["frame"]
+
+    for rerun in range(3):
+        timer = dashboard_timing.RerunTimer("session", rerun)
+        timer.cached("load", load)
+        record = timer.finish()
+    assert len(measured) == 1
+    assert record["cache"] == {"load": "hit"} and record["cache_bytes"] == {"load": 1}
+
+
+# === alpr_map.py ===
+
+def test_tract_tiles_are_strict_json(tmp_path):
+    import json
+
+    import alpr_map
+
+    tracts = alpr_map.load_tracts(REPO_DIR / "data" / "shapefiles" / "San_Francisco_Census_Tracts.zip")
+    demographics = pd.read_csv(REPO_DIR / "data" / "census" / "san_francisco_race_income_by_tract5.csv",
+                               dtype={"GEOID": str, "state": str, "county": str, "tract": str})
+    points = tracts.geometry.representative_point()
+    cameras = pd.DataFrame({"longitude": points.x, "latitude": points.y}).iloc[::5]
+    choropleth = alpr_map.tract_choropleth(tracts, demographics, cameras)
+    assert choropleth[list(alpr_map.METRICS)].isna().any().any()  # tracts without data must still load
+
+    def reject(constant):
+        raise ValueError(f"{constant} is not JSON")
+
+    assert alpr_map.tract_tiles(choropleth, tmp_path, max_zoom=11) > 0
+    for tile in (tmp_path / "tracts").rglob("*.geojson"):
+        json.loads(tile.read_text(), parse_constant=reject)
+
+
+# === alpr_demographics_by_tract.py ===
+
+def test_statewide_run_resumes_and_combines(tmp_path, monkeypatch):
+    import geopandas as gpd
+    import alpr_demographics_by_tract as pipeline
+    from fake_apis import serve
+    from pipeline_trace import PipelineTrace
+
+    # A statewide-style shapefile (TIGER column names) from two committed counties
+    parts = []
+    for name in ["San_Francisco", "San_Mateo"]:
+        gdf = gpd.read_file(REPO_DIR / "data" / "shapefiles" / f"{name}_Census_Tracts.zip").to_crs(4326)
+        parts.append(gdf.rename(columns=str.upper).rename(columns={"GEOMETRY": "geometry"}).set_geometry("geometry"))
+    shapefile = tmp_path / "tracts.gpkg"
+    pd.concat(parts)[["STATEFP", "COUNTYFP", "TRACTCE", "GEOID", "geometry"]].to_file(shapefile)
+
+    server = serve(port=0, cameras=2000)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("OVERPASS_URL", f"{base}/api/interpreter")
+    monkeypatch.setenv("CENSUS_API_URL", base)
+    monkeypatch.setenv("CENSUS_API_KEY", "test")
+    out_dir = tmp_path / "statewide"
+    counties = ["075", "081"]
+    try:
+        pipeline.run_statewide(PipelineTrace(), shapefile, out_dir, jobs=2, county_fips=counties)
+        partitions = [pipeline.partition_path(out_dir, fips) for fips in counties]
+        combined = out_dir / pipeline.STATEWIDE_FILE
+        first = combined.read_text()
+
+        # Partitions are streamed into one file with a single header
+        frames = [pd.read_csv(p, dtype={"GEOID": str}) for p in partitions]
+        whole = pd.read_csv(combined, dtype={"GEOID": str})
+        assert len(whole) == sum(map(len, frames)) > 0
+        assert list(whole.columns) == list(frames[0].columns)
+        assert whole["GEOID"].str.len().eq(11).all()
+
+        # A rerun only redoes the missing county
+        partitions[1].unlink()
+        trace = PipelineTrace()
+        pipeline.run_statewide(trace, shapefile, out_dir, jobs=2, county_fips=counties)
+        resumed = [r["county"] for r in trace.records if r["stage"] == "resume"]
+        processed = {r["county"] for r in trace.records if r["stage"] == "write"}
+        assert resumed == ["San_Francisco"] and processed == {"San_Mateo"}
+        assert combined.read_text() == first
+    finally:
+        server.shutdown()
@@ -0,0 +1,109 @@
+"""
+Canonical schema for census tract tables (census API results and the merged
+ALPR + census outputs).
+
+- GEOID is the join key, as an int64 (state * 10^9 + county * 10^6 + tract),
+  built arithmetically instead of zero-padding strings on every row.
+- state, county and tract appear once, as small unsigned ints derived from
+  GEOID, so repeated merges never leave state_x/state_y duplicates.
+- Person and camera counts are nullable UInt32 (a left merge can leave a tract
+  without a match), median income and *_pct columns are float32.
+- Census "not available" sentinels (-666666666, ...) become missing values.
+
+The integer keys are for memory only. to_csv() writes them zero-padded
+(GEOID 06075060100, state 06, county 075, tract 060100) as TIGER/Line and the
+ACS publish them, so saved outputs join on the standard string GEOIDs.
+
+    income = census_frame(pd.DataFrame(c.acs5.state_county_tract(...)))
+    merged = conform(counts.merge(income, on="GEOID", how="left"))
+    to_csv(merged, "alpr_by_income.csv")
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Census API sentinels for estimates that are not available
+CENSUS_MISSING = [-666666666, -999999999, -888888888, -222222222, -555555555]
+
+KEY_DTYPES = {"GEOID": "int64", "state": "uint8", "county": "uint16", "tract": "uint32"}
+# Digits of each key in its standard (zero-padded string) form
+KEY_WIDTHS = {"GEOID": 11, "state": 2, "county": 3, "tract": 6}
+COUNT_COLUMNS = ["num_alpr_cameras", "total_pop", "white_pop", "white_non_hispanic",
+                 "black_pop", "asian_pop", "hispanic_pop"]
+COUNT_DTYPE = "UInt32"
+FLOAT_COLUMNS = ["median_income"]
+FLOAT_DTYPE = "float32"
+
+# Columns that conform() rebuilds from GEOID, including merge duplicates
+_KEY_PARTS = re.compile(r"(state|county|tract)(_x|_y)?")
+# Shapefile columns holding a full tract GEOID, most common first
+GEOID_COLUMNS = ["GEOID", "geoid", "GEOID20", "GEOID10"]
+TRACT_COLUMNS = ["tractce", "TRACTCE", "TRACTCE20", "TRACTCE10", "TRACT", "tract"]
+
+
+def make_geoid(state, county, tract):
+    """Integer GEOIDs from state, county and tract codes (strings or numbers)."""
+    parts = [pd.to_numeric(pd.Series(p) if np.ndim(p) else p) for p in (state, county, tract)]
+    return parts[0].astype("int64") * 10**9 + parts[1].astype("int64") * 10**6 + parts[2].astype("int64")
+
+
+def tract_geoids(frame, state=None, county=None):
+    """Integer GEOIDs of the tracts in a shapefile (or sjoin result); <NA> where there is none.
+
+    Uses a GEOID column if there is one, else statefp/countyfp + the tract
+    code, else the tract code with the given state and county FIPS.
+    """
+    columns = {c.lower(): c for c in frame.columns}
+    for col in GEOID_COLUMNS:
+        if col in frame.columns:
+            return pd.to_numeric(frame[col]).astype("Int64")
+    tract_col = next((c for c in TRACT_COLUMNS if c in frame.columns), None)
+    if tract_col is None:
+        raise KeyError("No valid 'tract' column found in the Census shapefile!")
+    state = frame[columns["statefp"]] if "statefp" in columns else state
+    county = frame[columns["countyfp"]] if "countyfp" in columns else county
+    if state is None or county is None:
+        raise KeyError("No state/county FIPS for the tracts in the Census shapefile!")
+    tract = pd.to_numeric(frame[tract_col])
+    state = pd.to_numeric(pd.Series(state, index=frame.index) if np.ndim(state) == 0 else state)
+    county = pd.to_numeric(pd.Series(county, index=frame.index) if np.ndim(county) == 0 else county)
+    return (state * 10**9 + county * 10**6 + tract).astype("Int64")
+
+
+def _numbers(series):
+    values = pd.to_numeric(series, errors="coerce")
+    return values.mask(values.isin(CENSUS_MISSING))
+
+
+def conform(df):
+    """Cast a tract frame to the canonical schema (keys first, known columns typed)."""
+    geoid = df["GEOID"].astype("int64")
+    out = df.drop(columns=[c for c in df.columns if _KEY_PARTS.fullmatch(c)])
+    out = out.drop(columns="GEOID")
+    for col in out.columns:
+        if col in COUNT_COLUMNS:
+            out[col] = _numbers(out[col]).round().astype(COUNT_DTYPE)
+        elif col in FLOAT_COLUMNS or col.endswith("_pct"):
+            out[col] = _numbers(out[col]).astype(FLOAT_DTYPE)
+    keys = pd.DataFrame({
+        "GEOID": geoid.to_numpy(),
+        "state": (geoid // 10**9).to_numpy().astype(KEY_DTYPES["state"]),
+        "county": (geoid // 10**6 % 1000).to_numpy().astype(KEY_DTYPES["county"]),
+        "tract": (geoid % 10**6).to_numpy().astype(KEY_DTYPES["tract"]),
+    }, index=out.index)
+    return pd.concat([keys, out], axis=1)
+
+
+def census_frame(df):
+    """A census API result (string state/county/tract columns) in the canonical schema."""
+    if df.empty:
+        return df
+    return conform(df.assign(GEOID=make_geoid(df["state"], df["county"], df["tract"]).to_numpy()))
+
+
+def to_csv(df, path, **kwargs):
+    """Save a tract frame as CSV with the keys zero-padded to their standard widths."""
+    keys = {col: df[col].astype(str).str.zfill(width) for col, width in KEY_WIDTHS.items() if col in df.columns}
+    df.assign(**keys).to_csv(path, index=False, **kwargs)